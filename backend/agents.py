@@ -1,7 +1,10 @@
-﻿import re, math, os, logging
-import builtins as py_builtins
+﻿import re, math, os, asyncio, logging
 from typing import Dict, Any, List, Optional
 from templates import CodeTemplates
+from stl_io import read_stl
+from mesh_ops import weld_vertices, cluster_decimate, MESH_PREVIEW_MAX_TRIANGLES
+from exec_pool import ExecPool
+from exec_worker import run_job, new_exec_file, prune_runs
 
 log = logging.getLogger("cadamx.agents")
 
@@ -74,6 +77,9 @@ class AnalystAgent:
             'corner_fillet': self._find_number(prompt, r'corner\s+fillet\s*:?\s*(\d+(?:\.\d+)?)\s*mm', 0.0),
             'full_depth': 'full depth' in prompt.lower() or 'through' in prompt.lower(),
         }
+        # STL seul demandé: maillage NumPy direct (sans congé d'angle, qui demande le B-Rep)
+        params['mesh_only'] = (any(k in prompt.lower() for k in ('stl only', 'mesh only', 'no step'))
+                               and params['corner_fillet'] == 0)
         
         log.info(f"✅ HONEYCOMB: {params['panel_width']}×{params['panel_height']}mm, cell={params['cell_size']}mm")
         
@@ -571,17 +577,17 @@ class ValidatorAgent:
         except Exception:
             self.cq_ok = False
 
-    def _safe_builtins(self):
-        allowed = [
-            "abs", "min", "max", "range", "len", "float", "int", "pow", "sum",
-            "zip", "enumerate", "print", "list", "dict", "set", "tuple", "round",
-            "__import__", "Exception", "BaseException", "ValueError", "any",
-            "str", "open", "bytes", "bool", "isinstance", "type", "iter",
-            "next", "hasattr", "getattr", "setattr", "dir", "format",
-            "ord", "chr", "hex", "bin", "oct", "sorted", "reversed",
-            "map", "filter", "all", "repr", "hash", "id", "callable"
-        ]
-        return {k: getattr(py_builtins, k) for k in allowed}
+        # Exécution dans des sous-processus pré-chauffés (EXEC_POOL_SIZE=0 → en process)
+        self.pool = ExecPool()
+
+    async def start(self):
+        """Pré-chauffe le pool d'exécution (appelé au démarrage du serveur)"""
+        if self.pool.enabled:
+            await self.pool.start()
+
+    async def close(self):
+        if self.pool.enabled:
+            await self.pool.close()
 
     async def validate_and_execute(self, code: str, app_type: str = "model") -> Dict[str, Any]:
         try:
@@ -589,47 +595,28 @@ class ValidatorAgent:
         except SyntaxError as e:
             return {"success": False, "errors": [f"Syntax: {e.msg}"]}
 
-        import numpy as np
-        from pathlib import Path
-        import time
-
-        # Fonction no-op pour show_object (utilisée par CQ-Editor)
-        def show_object(obj, name=None, options=None):
-            """Dummy function - show_object is only for CQ-Editor"""
-            pass
-
-        ns = {
-            "__builtins__": self._safe_builtins(),
-            "math": math,
-            "np": np,
-            "numpy": np,
-            "struct": __import__('struct'),
-            "Path": Path,
-            "show_object": show_object,
-            "__file__": str(Path(__file__).parent / "temp_exec.py"),
-        }
-
-        try:
-            exec(compile(code, "<cad>", "exec"), ns)
-
-            backend_dir = Path(__file__).parent
-            output_dir = backend_dir / "output"
+        # Répertoire propre à ce job: les templates écrivent des noms fixes (generated_facade.stl)
+        await asyncio.to_thread(prune_runs)
+        exec_file = new_exec_file()
+        if self.pool.enabled:
+            run = await self.pool.run(code, exec_file=exec_file)
+        else:
+            run = await asyncio.to_thread(run_job, {"code": code, "file": exec_file})
 
-            time.sleep(0.1)
+        if not run.get("success"):
+            log.error(f"Execution failed: {run.get('errors')}")
+            if run.get("traceback"):
+                log.error(run["traceback"])
+            return {"success": False, "errors": run.get("errors", ["Execution: unknown error"])}
 
-            # TOUJOURS chercher le fichier .stl le plus récent (pas seulement generated_*.stl)
-            # Cela corrige le bug où un vieux fichier était retourné au lieu du nouveau
-            stl_files = sorted(output_dir.glob("*.stl"), key=lambda p: p.stat().st_mtime, reverse=True)
-            stl_path = str(stl_files[0].absolute()) if stl_files else None
-            
-        except Exception as e:
-            log.error(f"Execution failed: {e}", exc_info=True)
-            # Include exception type in error message so ErrorHandlerAgent can categorize it
-            error_type = type(e).__name__
-            return {"success": False, "errors": [f"Execution: {error_type}: {e}"]}
+        # Le worker renvoie exactement les fichiers exportés par ce script
+        stl_path = run.get("stl_path")
+        step_path = run.get("step_path")
+        if not stl_path:
+            log.warning("⚠️ Code executed but no STL export was recorded")
 
         if stl_path and os.path.exists(stl_path):
-            mesh = self._create_mesh_from_stl(stl_path)
+            mesh = await asyncio.to_thread(self._create_mesh_from_stl, stl_path)
         else:
             mesh = self._create_mesh()
 
@@ -638,51 +625,25 @@ class ValidatorAgent:
             "mesh": mesh,
             "analysis": {"dimensions": {}, "features": {}, "validation": {}},
             "stl_path": stl_path,
-            "step_path": None,
+            "step_path": step_path,
         }
 
     def _create_mesh_from_stl(self, stl_path: str) -> Dict[str, Any]:
         try:
-            import struct
-            
-            with open(stl_path, 'rb') as f:
-                f.read(80)
-                num_triangles = struct.unpack('<I', f.read(4))[0]
-                
-                vertices = []
-                faces = []
-                
-                for i in range(num_triangles):
-                    f.read(12)
-                    v1 = struct.unpack('<3f', f.read(12))
-                    v2 = struct.unpack('<3f', f.read(12))
-                    v3 = struct.unpack('<3f', f.read(12))
-                    
-                    base_idx = len(vertices) // 3
-                    vertices.extend(v1)
-                    vertices.extend(v2)
-                    vertices.extend(v3)
-                    
-                    faces.extend([base_idx, base_idx+1, base_idx+2])
-                    f.read(2)
-                
-                if num_triangles > 10000:
-                    step = num_triangles // 5000
-                    vertices_decimated = []
-                    faces_decimated = []
-                    for i in range(0, len(faces), step*3):
-                        if i+2 < len(faces):
-                            base = len(vertices_decimated) // 3
-                            for j in range(3):
-                                idx = faces[i+j] * 3
-                                vertices_decimated.extend(vertices[idx:idx+3])
-                            faces_decimated.extend([base, base+1, base+2])
-                    
-                    vertices = vertices_decimated
-                    faces = faces_decimated
-                
-                return {"vertices": vertices, "faces": faces, "normals": []}
-                
+            triangles, _ = read_stl(stl_path)
+
+            # Sommets partagés + index: payload ~3x plus petit, normales lissées côté viewer
+            vertices, faces = weld_vertices(triangles)
+
+            # Au-delà du budget: simplification par clustering (pas de trous dans l'aperçu)
+            if len(faces) > MESH_PREVIEW_MAX_TRIANGLES:
+                vertices, faces = cluster_decimate(vertices, faces, MESH_PREVIEW_MAX_TRIANGLES)
+
+            log.info(f"🔗 Preview mesh: {len(triangles):,} → {len(faces):,} triangles, {len(vertices):,} vertices")
+
+            # Tableaux NumPy: sérialisés en binaire (mesh.bin) par l'API
+            return {"vertices": vertices, "faces": faces, "normals": []}
+
         except Exception as e:
             log.warning(f"Failed to load STL: {e}")
             return self._create_mesh()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Opérations CadQuery groupées pour les templates.
+bulk_fuse fusionne N solides en UN seul appel BRepAlgoAPI_Fuse (arguments
+multiples) au lieu d'une chaîne solid.union(s) qui recalcule tout le solide
+à chaque ajout (coût O(n²)).
+
+Utilisé par le code généré (template stent):
+    from cad_ops import bulk_fuse
+"""
+
+import os
+import logging
+from typing import Iterable, List, Optional
+
+import cadquery as cq
+
+log = logging.getLogger("cadamx.cad_ops")
+
+# Booléens OCCT multi-thread (SetRunParallel)
+CAD_FUSE_PARALLEL = os.getenv("CAD_FUSE_PARALLEL", "1") == "1"
+# Tolérance floue (mm): recolle les faces quasi coïncidentes entre poutres. 0 = désactivée
+CAD_FUSE_FUZZY = float(os.getenv("CAD_FUSE_FUZZY", "0"))
+
+
+def _shapes(items: Iterable) -> List[cq.Shape]:
+    """Aplati Workplanes / Shapes en liste de cq.Shape (None ignorés)"""
+    shapes = []
+    for item in items:
+        if item is None:
+            continue
+        if isinstance(item, cq.Workplane):
+            shapes.extend(v for v in item.vals() if isinstance(v, cq.Shape))
+        elif isinstance(item, cq.Shape):
+            shapes.append(item)
+        else:
+            raise TypeError(f"bulk_fuse: unsupported object {type(item).__name__}")
+    return shapes
+
+
+def _fuse(shapes: List[cq.Shape], parallel: bool, fuzzy: float, glue: bool = False) -> cq.Shape:
+    """Un seul BRepAlgoAPI_Fuse: premier solide en argument, tous les autres en outils"""
+    from OCP.BOPAlgo import BOPAlgo_GlueEnum
+    from OCP.BRepAlgoAPI import BRepAlgoAPI_Fuse
+    from OCP.TopTools import TopTools_ListOfShape
+
+    arguments = TopTools_ListOfShape()
+    arguments.Append(shapes[0].wrapped)
+    tools = TopTools_ListOfShape()
+    for shape in shapes[1:]:
+        tools.Append(shape.wrapped)
+
+    op = BRepAlgoAPI_Fuse()
+    op.SetArguments(arguments)
+    op.SetTools(tools)
+    op.SetRunParallel(parallel)
+    if fuzzy > 0:
+        op.SetFuzzyValue(fuzzy)
+    if glue:
+        # Solides qui se touchent par des faces coïncidentes (cellules pavées)
+        op.SetGlue(BOPAlgo_GlueEnum.BOPAlgo_GlueShift)
+    op.Build()
+
+    if not op.IsDone():
+        raise ValueError("BRepAlgoAPI_Fuse failed")
+    return cq.Shape.cast(op.Shape())
+
+
+def _tree_fuse(shapes: List[cq.Shape], parallel: bool, fuzzy: float, glue: bool = False) -> cq.Shape:
+    """Repli: arbre binaire équilibré (log n niveaux au lieu de n unions en chaîne)"""
+    while len(shapes) > 1:
+        shapes = [
+            _fuse(shapes[i:i + 2], parallel, fuzzy, glue) if i + 1 < len(shapes) else shapes[i]
+            for i in range(0, len(shapes), 2)
+        ]
+    return shapes[0]
+
+
+def bulk_fuse(items: Iterable, parallel: Optional[bool] = None, fuzzy: Optional[float] = None,
+              clean: bool = True, glue: bool = False) -> Optional[cq.Workplane]:
+    """
+    Fusionne tous les solides en une opération booléenne.
+
+    Args:
+        items: Workplanes et/ou cq.Shape (None ignorés)
+        parallel: booléen OCCT multi-thread (défaut CAD_FUSE_PARALLEL)
+        fuzzy: tolérance floue en mm (défaut CAD_FUSE_FUZZY)
+        clean: fusionne les faces coplanaires du résultat
+        glue: mode "glue" OCCT, pour des solides qui ne font que se toucher
+
+    Returns:
+        Un Workplane contenant le solide fusionné (None si rien à fusionner)
+    """
+    parallel = CAD_FUSE_PARALLEL if parallel is None else parallel
+    fuzzy = CAD_FUSE_FUZZY if fuzzy is None else fuzzy
+
+    shapes = _shapes(items)
+    if not shapes:
+        return None
+
+    if len(shapes) == 1:
+        result = shapes[0]
+    else:
+        try:
+            result = _fuse(shapes, parallel, fuzzy, glue)
+        except Exception as e:
+            log.warning(f"⚠️ Bulk fuse of {len(shapes)} shapes failed ({e}), retrying as a balanced tree")
+            result = _tree_fuse(shapes, parallel, fuzzy, glue)
+
+    if clean:
+        result = result.clean()
+    return cq.Workplane("XY").newObject([result])
+
+
+__all__ = ["bulk_fuse"]
@@ -10,15 +10,18 @@ import os
 import json
 import re
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Awaitable
 from dataclasses import dataclass
 
+from llm_pool import JsonClosed, FenceClosed, collect
+from fast_path import match_fast_path, FAST_PATH_ENABLED, FAST_PATH_MIN_CONFIDENCE
+from few_shot_index import shared_few_shot_index
+
 # Import improved system prompts
 from cot_prompts import (
     ARCHITECT_SYSTEM_PROMPT,
     PLANNER_SYSTEM_PROMPT,
-    SYNTHESIZER_SYSTEM_PROMPT,
-    FEW_SHOT_EXAMPLES
+    SYNTHESIZER_SYSTEM_PROMPT
 )
 
 log = logging.getLogger("cadamx.cot_agents")
@@ -66,8 +69,9 @@ class OllamaCoTClient:
         self.use_fallback = False
 
         try:
-            import ollama
-            self.client = ollama.AsyncClient(host=self.base_url)
+            from llm_pool import get_pool
+            # Client partagé (keep-alive + limites par modèle) entre tous les agents
+            self.pool = get_pool(self.base_url)
             log.info(f"✅ Ollama CoT Client initialized: {model} @ {self.base_url}")
         except ImportError:
             log.error("⚠️ Ollama package not installed, using fallback mode")
@@ -76,37 +80,63 @@ class OllamaCoTClient:
             log.warning(f"⚠️ Ollama connection failed: {e}, using fallback mode")
             self.use_fallback = True
 
-    async def generate(self, messages: List[Dict[str, str]], temperature: float = 0.7, max_tokens: int = 2000) -> str:
-        """Génère une réponse via Ollama (format chat compatible OpenAI)"""
+    async def generate(self, messages: List[Dict[str, str]], temperature: float = 0.7, max_tokens: int = 2000,
+                       on_token: Optional[Callable[[str], Awaitable[None]]] = None,
+                       stop: Optional[Callable[[str], bool]] = None,
+                       cache: Optional[bool] = None) -> str:
+        """
+        Génère une réponse via Ollama (format chat compatible OpenAI).
+        Avec on_token ou stop, la réponse est streamée: chaque fragment est transmis dès son
+        arrivée et la génération est interrompue dès que stop (JsonClosed, FenceClosed) est atteint.
+        cache: None = cache LLM selon la température, True/False pour forcer.
+        """
 
         if self.use_fallback:
             return await self._fallback_generate(messages)
 
+        options = {
+            "num_predict": max_tokens,
+            "temperature": temperature,
+            "top_p": 0.9,
+        }
+        request = {"messages": messages, "stop": type(stop).__name__ if stop else None}
+
         try:
-            import ollama
-
-            # Ollama supporte le format messages (chat)
-            response = await self.client.chat(
-                model=self.model,
-                messages=messages,
-                options={
-                    "num_predict": max_tokens,
-                    "temperature": temperature,
-                    "top_p": 0.9,
-                }
+            return await self.pool.cached(
+                self.model, request, options,
+                lambda: self._complete(messages, options, on_token, stop),
+                on_token=on_token, cache=cache,
             )
 
-            # Ollama retourne un dict avec 'message' -> 'content'
-            if isinstance(response, dict) and "message" in response:
-                return response["message"]["content"].strip()
-
-            return str(response).strip()
-
         except Exception as e:
             log.error(f"Ollama CoT API call failed: {e}")
             log.warning("Falling back to heuristic mode")
             return await self._fallback_generate(messages)
 
+    async def _complete(self, messages: List[Dict[str, str]], options: Dict[str, Any],
+                        on_token: Optional[Callable[[str], Awaitable[None]]],
+                        stop: Optional[Callable[[str], bool]]) -> str:
+        """Appel Ollama effectif (streamé si on_token ou stop)"""
+        if on_token is not None or stop is not None:
+            return await collect(
+                self.pool.stream_chat(self.model, messages, options),
+                lambda chunk: chunk["message"]["content"],
+                on_token=on_token, stop=stop,
+            )
+
+        # Ollama supporte le format messages (chat)
+        response = await self.pool.chat(
+            model=self.model,
+            messages=messages,
+            options=options
+        )
+
+        # Ollama retourne un dict avec 'message' -> 'content'
+        if isinstance(response, dict) and "message" in response:
+            return response["message"]["content"].strip()
+
+        return str(response).strip()
+
     async def _fallback_generate(self, messages: List[Dict[str, str]]) -> str:
         """Fallback basique si Ollama non disponible"""
         # Extraire le message système et utilisateur
@@ -347,7 +377,7 @@ class ArchitectAgent:
         ]
 
         try:
-            response = await self.client.generate(messages, temperature=0.7, max_tokens=1000)
+            response = await self.client.generate(messages, temperature=0.7, max_tokens=1000, stop=JsonClosed())
 
             # Parser la réponse JSON
             # Extraire JSON de la réponse (peut être entouré de markdown)
@@ -493,7 +523,7 @@ Original prompt: {prompt}
         ]
 
         try:
-            response = await self.client.generate(messages, temperature=0.5, max_tokens=1500)
+            response = await self.client.generate(messages, temperature=0.5, max_tokens=1500, stop=JsonClosed())
 
             # Parser JSON
             json_str = response
@@ -626,38 +656,35 @@ class CodeSynthesizerAgent:
     def __init__(self):
         model = os.getenv("COT_SYNTHESIZER_MODEL", "deepseek-coder:33b")
         self.client = OllamaCoTClient(model=model)
+        # Exemples de code (few-shot, patterns, générations réussies) retrouvés par BM25
+        self.examples = shared_few_shot_index()
         log.info("💻 CodeSynthesizerAgent initialized")
 
-    async def generate_code(self, plan: ConstructionPlan, analysis: DesignAnalysis) -> GeneratedCode:
-        """Génère le vrai code CadQuery exécutable"""
+    async def generate_code(self, plan: ConstructionPlan, analysis: DesignAnalysis,
+                            on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> GeneratedCode:
+        """
+        Génère le vrai code CadQuery exécutable.
+        on_token reçoit la réponse du modèle au fil de l'eau (aperçu du code en cours d'écriture).
+        """
 
         log.info(f"💻 Generating code: {analysis.description}")
 
-        # FAST-PATH DÉSACTIVÉ : Forcer l'utilisation des LLMs pour tout
-        # if (analysis.complexity == "simple" and
-        #     len(analysis.primitives_needed) == 1 and
-        #     analysis.primitives_needed[0] in ["cylinder", "sphere", "cone", "torus", "box"]):
-        #
-        #     primitive = analysis.primitives_needed[0]
-        #     params = analysis.parameters
-        #     log.info(f"🚀 Fast-path for simple shape: {primitive}")
-        #
-        #     # Générer directement le code validé
-        #     return self._generate_simple_shape_code(primitive, params)
-
-        log.info(f"🧠 Using full LLM pipeline (Fast-path disabled)")
+        # Les formes simples entièrement cotées ne passent pas ici: voir fast_path()
+        log.info(f"🧠 Using full LLM pipeline")
 
         # Use improved system prompt from cot_prompts.py
         system_prompt = SYNTHESIZER_SYSTEM_PROMPT
 
-        # Add few-shot example if relevant object type detected
-        few_shot_hint = ""
-        object_type = analysis.description.lower()
-        for key in FEW_SHOT_EXAMPLES.keys():
-            if key in object_type:
-                few_shot_hint = f"\n\nREFERENCE PATTERN FOR {key.upper()}:\n```python\n{FEW_SHOT_EXAMPLES[key]}\n```\n"
-                log.info(f"📚 Using few-shot example for: {key}")
-                break
+        # Exemples les plus proches de la description et du plan (top-k sous budget de tokens)
+        query = " ".join([analysis.description, *analysis.primitives_needed, *analysis.operations_sequence,
+                          *(str(step.get("operation", "")) for step in plan.steps if isinstance(step, dict))])
+        examples = self.examples.search(query)
+        few_shot_hint = "".join(
+            f"\n\nREFERENCE PATTERN FOR {example.name.upper()}:\n```python\n{example.code}\n```\n"
+            for example in examples
+        )
+        if examples:
+            log.info(f"📚 Using few-shot examples: {', '.join(f'{e.name} ({e.source})' for e in examples)}")
 
         system_prompt_with_examples = system_prompt + few_shot_hint
 
@@ -685,7 +712,8 @@ Generate the complete working CadQuery code.
         ]
 
         try:
-            response = await self.client.generate(messages, temperature=0.3, max_tokens=2000)
+            response = await self.client.generate(messages, temperature=0.3, max_tokens=2000,
+                                                  on_token=on_token, stop=FenceClosed())
 
             # Extraire le code Python
             code = response
@@ -845,6 +873,26 @@ print(f"✅ STL exported to: {{output_path}}")
                 confidence=0.5
             )
 
+    def fast_path(self, prompt: str) -> Optional[GeneratedCode]:
+        """
+        Code déterministe pour un prompt qui se réduit à une forme simple entièrement cotée
+        (primitives, tuyau, verre, vis, table), sans les trois appels LLM.
+        None si FAST_PATH_ENABLED=0 ou si la confiance est sous FAST_PATH_MIN_CONFIDENCE.
+        """
+        if not FAST_PATH_ENABLED:
+            return None
+
+        match = match_fast_path(prompt)
+        if match is None:
+            return None
+        if match.confidence < FAST_PATH_MIN_CONFIDENCE:
+            log.info(f"🐢 Fast path skipped for {match.primitive} (confidence {match.confidence:.2f}: "
+                     f"{', '.join(match.reasons)})")
+            return None
+
+        log.info(f"🚀 Fast-path for simple shape: {match.primitive} {match.params}")
+        return self._generate_simple_shape_code(match.primitive, match.params)
+
     def _generate_simple_shape_code(self, primitive: str, params: Dict[str, Any]) -> GeneratedCode:
         """Génère du code validé pour les formes simples (fast-path, évite les hallucinations LLM)"""
 
@@ -859,14 +907,11 @@ print(f"✅ STL exported to: {{output_path}}")
             shape_code = f'result = cq.Workplane("XY").sphere({radius})'
 
         elif primitive == "cone":
+            # makeCone accepte un sommet pointu (radius2 = 0), contrairement au loft
             r1 = params.get("radius1", params.get("base_radius", 30))
             r2 = params.get("radius2", params.get("top_radius", 0))
             h = params.get("height", 50)
-            shape_code = f'''result = (cq.Workplane("XY")
-    .circle({r1})
-    .workplane(offset={h})
-    .circle({r2})
-    .loft())'''
+            shape_code = f'result = cq.Workplane("XY").add(cq.Solid.makeCone({r1}, {r2}, {h}))'
 
         elif primitive == "torus":
             # CRITICAL: Utiliser plan XZ pour revolve autour de l'axe Y
@@ -877,6 +922,43 @@ profile = cq.Workplane("XZ").moveTo({major_r}, 0).circle({minor_r})
 # Revolve around Y-axis
 result = profile.revolve(360, (0, 0, 0), (0, 1, 0))'''
 
+        elif primitive == "pipe":
+            ro, ri, length = params["outer_radius"], params["inner_radius"], params["length"]
+            shape_code = f'''outer = cq.Workplane("XY").circle({ro}).extrude({length})
+inner = cq.Workplane("XY").circle({ri}).extrude({length})
+result = outer.cut(inner)'''
+            if params.get("chamfer"):
+                shape_code += f'''\nresult = result.edges("%Circle").chamfer({params["chamfer"]})'''
+
+        elif primitive == "glass":
+            ro, ri, h = params["outer_radius"], params["inner_radius"], params["height"]
+            depth = h - params["bottom"]
+            shape_code = f'''result = cq.Workplane("XY").circle({ro}).extrude({h})
+result = result.faces(">Z").workplane().circle({ri}).cutBlind(-{depth})'''
+            if params.get("fillet"):
+                shape_code += f'''\nresult = result.edges(">Z").fillet({params["fillet"]})'''
+
+        elif primitive == "screw":
+            # Tête hexagonale: polygon prend le diamètre du cercle circonscrit
+            shaft_r, shaft_h = params["shaft_radius"], params["shaft_length"]
+            head_d, head_h = round(2 * params["head_radius"], 3), params["head_height"]
+            shape_code = f'''shaft = cq.Workplane("XY").circle({shaft_r}).extrude({shaft_h})
+head = cq.Workplane("XY").polygon(6, {head_d}).extrude({head_h}).translate((0, 0, {shaft_h}))
+result = shaft.union(head)'''
+            if params.get("chamfer"):
+                shape_code += f'''\nresult = result.edges(">Z").chamfer({params["chamfer"]})'''
+
+        elif primitive == "table":
+            # Plateau posé sur les pieds, pieds en retrait de "inset" depuis chaque coin
+            length, width, t = params["length"], params["width"], params["thickness"]
+            leg_h = params["leg_height"]
+            x, y = length / 2 - params["inset"], width / 2 - params["inset"]
+            shape_code = f'''top = cq.Workplane("XY").box({length}, {width}, {t}).translate((0, 0, {leg_h + t / 2}))
+leg = cq.Workplane("XY").circle({params["leg_radius"]}).extrude({leg_h})
+result = top
+for x, y in [({x}, {y}), (-{x}, {y}), ({x}, -{y}), (-{x}, -{y})]:
+    result = result.union(leg.translate((x, y, 0)))'''
+
         else:  # box
             w = params.get("width", 50)
             h = params.get("height", 50)
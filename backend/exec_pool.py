@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool de workers d'exécution (sous-processus pré-chauffés).
+Le code CadQuery généré ne tourne plus sur le thread de l'event loop :
+chaque job est envoyé à un worker long-vivant (exec_worker.py) via un pipe,
+avec limite de temps, limite mémoire et recyclage des workers.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional, Set
+
+log = logging.getLogger("cadamx.exec_pool")
+
+WORKER_SCRIPT = str(Path(__file__).parent / "exec_worker.py")
+
+# Taille max d'une ligne de réponse (stdout capturé inclus)
+_READ_LIMIT = 16 * 1024 * 1024
+# Attentes (s) entre les tentatives de relance d'un worker
+_RESPAWN_BACKOFF = (0.5, 1.0, 2.0)
+
+
+class _Worker:
+    """Un sous-processus worker et son compteur de jobs"""
+
+    def __init__(self, proc: asyncio.subprocess.Process):
+        self.proc = proc
+        self.jobs_done = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.returncode is None
+
+    def kill(self):
+        if self.alive:
+            try:
+                self.proc.kill()
+            except ProcessLookupError:
+                pass
+
+
+class ExecPool:
+    """
+    Pool de N workers qui exécutent le code généré en parallèle.
+
+    - Les workers importent cadquery / numpy / OCP une fois au démarrage
+    - Timeout par job (wall-clock) : le worker est tué et remplacé
+    - Limite mémoire par worker (RLIMIT_AS, POSIX)
+    - Recyclage après K jobs ou après un crash
+    - Worker impossible à relancer: sa place reste dans la file (None) et le
+      prochain job retente le démarrage au lieu d'attendre indéfiniment
+    """
+
+    def __init__(self, size: Optional[int] = None, max_jobs_per_worker: Optional[int] = None,
+                 timeout: Optional[float] = None, memory_mb: Optional[int] = None):
+        self.size = size if size is not None else int(os.getenv("EXEC_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+        self.max_jobs_per_worker = max_jobs_per_worker or int(os.getenv("EXEC_WORKER_MAX_JOBS", "50"))
+        self.timeout = timeout or float(os.getenv("EXEC_TIMEOUT", "120"))
+        self.memory_mb = memory_mb if memory_mb is not None else int(os.getenv("EXEC_MEMORY_MB", "0"))
+
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: Set[_Worker] = set()
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._started = False
+
+        log.info(f"⚙️ ExecPool configured: {self.size} workers, timeout={self.timeout}s, "
+                 f"recycle after {self.max_jobs_per_worker} jobs, memory={self.memory_mb or 'unlimited'}MB")
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    async def start(self):
+        """Démarre (pré-chauffe) tous les workers"""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+
+        async with self._start_lock:
+            if self._started:
+                return
+            self._idle = asyncio.Queue()
+            spawns = [asyncio.ensure_future(self._spawn()) for _ in range(self.size)]
+            try:
+                workers = await asyncio.gather(*spawns)
+            except BaseException:
+                # Un worker n'a pas démarré: arrêter ceux qui tournent déjà avant de relancer l'erreur
+                for spawn in spawns:
+                    spawn.cancel()
+                await asyncio.gather(*spawns, return_exceptions=True)
+                started = list(self._workers)
+                await asyncio.gather(*(self._retire(w, graceful=False) for w in started), return_exceptions=True)
+                raise
+            for worker in workers:
+                self._idle.put_nowait(worker)
+            self._started = True
+            log.info(f"⚙️ ExecPool started ({self.size} warm workers)")
+
+    async def _spawn(self) -> _Worker:
+        """Lance un worker et attend qu'il ait fini ses imports"""
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, WORKER_SCRIPT, "--memory-mb", str(self.memory_mb),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=_READ_LIMIT,
+        )
+        worker = _Worker(proc)
+        self._workers.add(worker)
+
+        line = await proc.stdout.readline()
+        if not line or not json.loads(line).get("ready"):
+            worker.kill()
+            self._workers.discard(worker)
+            raise RuntimeError("Execution worker failed to start")
+
+        log.info(f"⚙️ Worker {proc.pid} ready")
+        return worker
+
+    async def _retire(self, worker: _Worker, graceful: bool = True):
+        """Arrête un worker (fin de stdin si possible, sinon kill)"""
+        self._workers.discard(worker)
+        if worker.alive and graceful:
+            try:
+                worker.proc.stdin.close()
+                await asyncio.wait_for(worker.proc.wait(), timeout=5)
+            except (asyncio.TimeoutError, ConnectionError, BrokenPipeError):
+                worker.kill()
+        else:
+            worker.kill()
+        if worker.proc.returncode is None:
+            await worker.proc.wait()
+
+    async def _replace(self, worker: _Worker, graceful: bool):
+        """Remplace un worker recyclé ou crashé par un worker neuf (avec backoff)"""
+        await self._retire(worker, graceful)
+        for attempt, delay in enumerate((0,) + _RESPAWN_BACKOFF):
+            if not self._started:
+                return
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                self._idle.put_nowait(await self._spawn())
+                return
+            except Exception as e:
+                log.warning(f"⚠️ Could not respawn execution worker (attempt {attempt + 1}): {e}")
+        log.error("❌ Execution worker slot left empty, next job will retry the start")
+        self._idle.put_nowait(None)
+
+    async def run(self, code: str, exec_file: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Exécute du code dans un worker libre et retourne son résultat"""
+        if not self._started:
+            await self.start()
+
+        timeout = timeout or self.timeout
+        worker = await self._idle.get()
+        if worker is None:
+            try:
+                worker = await self._spawn()
+            except Exception as e:
+                self._idle.put_nowait(None)
+                return {"success": False, "errors": [f"Execution: WorkerUnavailable: {e}"]}
+        recycle, graceful = False, True
+
+        try:
+            job = json.dumps({"code": code, "file": exec_file}) + "\n"
+            worker.proc.stdin.write(job.encode("utf-8"))
+            await worker.proc.stdin.drain()
+
+            line = await asyncio.wait_for(worker.proc.stdout.readline(), timeout=timeout)
+            if not line:
+                await worker.proc.wait()
+                recycle, graceful = True, False
+                log.error(f"❌ Worker {worker.proc.pid} crashed (exit code {worker.proc.returncode})")
+                return {
+                    "success": False,
+                    "errors": [f"Execution: WorkerCrashed: worker exited with code {worker.proc.returncode}"]
+                }
+
+            worker.jobs_done += 1
+            if worker.jobs_done >= self.max_jobs_per_worker:
+                recycle = True
+            return json.loads(line)
+
+        except asyncio.TimeoutError:
+            recycle, graceful = True, False
+            log.error(f"❌ Worker {worker.proc.pid} exceeded {timeout}s, killing it")
+            return {"success": False, "errors": [f"Execution: TimeoutError: execution exceeded {timeout:.0f}s"]}
+
+        except (ConnectionError, BrokenPipeError) as e:
+            recycle, graceful = True, False
+            return {"success": False, "errors": [f"Execution: WorkerCrashed: {e}"]}
+
+        except ValueError as e:
+            # Réponse plus longue que _READ_LIMIT ou illisible: le reste de la ligne
+            # est encore dans le pipe, le worker ne doit pas resservir
+            recycle, graceful = True, False
+            log.error(f"❌ Worker {worker.proc.pid} sent an invalid reply: {e}")
+            return {"success": False, "errors": [f"Execution: WorkerProtocolError: {e}"]}
+
+        except asyncio.CancelledError:
+            # Requête annulée en plein job: le worker est dans un état inconnu
+            recycle, graceful = True, False
+            raise
+
+        finally:
+            if recycle:
+                if not graceful:
+                    worker.kill()
+                asyncio.ensure_future(self._replace(worker, graceful))
+            else:
+                self._idle.put_nowait(worker)
+
+    async def close(self):
+        """Arrête tous les workers"""
+        self._started = False
+        workers = list(self._workers)
+        await asyncio.gather(*(self._retire(w) for w in workers), return_exceptions=True)
+        log.info("⚙️ ExecPool stopped")
+
+
+__all__ = ["ExecPool"]
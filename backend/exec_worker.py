@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Worker d'exécution du code CAD généré.
+Lancé en sous-processus par ExecPool : importe cadquery / numpy / OCP une seule fois,
+puis exécute les jobs reçus sur stdin (une ligne JSON par job) et répond sur stdout.
+
+Utilisable aussi en direct (run_job) quand le pool est désactivé: les jobs sont alors
+exécutés un par un (_RUN_LOCK), car la capture de stdout et l'interception des exports
+modifient un état global du processus.
+
+Protocole de résultat: les fichiers exportés par le script (cq.exporters.export,
+Shape.exportStl/exportStep, stl_io.write_stl, open(..., "wb") d'un .stl/.step,
+ou register_output)
+sont enregistrés pendant l'exécution et renvoyés dans le résultat
+(stl_path / step_path) — plus besoin de deviner le fichier dans output/.
+"""
+
+import gc
+import io
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import shutil
+import struct
+import logging
+import argparse
+import threading
+import traceback
+import contextlib
+import builtins as py_builtins
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+log = logging.getLogger("cadamx.exec_worker")
+
+# Builtins autorisés dans le code généré
+SAFE_BUILTINS = [
+    "abs", "min", "max", "range", "len", "float", "int", "pow", "sum",
+    "zip", "enumerate", "print", "list", "dict", "set", "tuple", "round",
+    "__import__", "Exception", "BaseException", "ValueError", "any",
+    "str", "open", "bytes", "bool", "isinstance", "type", "iter",
+    "next", "hasattr", "getattr", "setattr", "dir", "format",
+    "ord", "chr", "hex", "bin", "oct", "sorted", "reversed",
+    "map", "filter", "all", "repr", "hash", "id", "callable"
+]
+
+# Extension → type d'artefact suivi par le protocole de résultat
+OUTPUT_KINDS = {".stl": "stl", ".step": "step", ".stp": "step"}
+
+# __file__ vu par le code généré: les exports vont dans backend/output
+DEFAULT_EXEC_FILE = str(Path(__file__).parent / "temp_exec.py")
+
+# Un répertoire par exécution: deux jobs du même template (generated_facade.stl...)
+# n'écrivent pas le même fichier avant que job_store ne le copie
+RUNS_DIR = Path(os.getenv("EXEC_RUNS_DIR", str(Path(__file__).parent / "output" / "runs")))
+RUNS_MAX_AGE = float(os.getenv("EXEC_RUNS_MAX_AGE", "3600"))
+
+# sys.stdout et les fonctions d'export sont remplacés le temps d'un job:
+# deux jobs du même processus (asyncio.to_thread) ne doivent pas se chevaucher
+_RUN_LOCK = threading.Lock()
+
+
+def new_exec_file() -> str:
+    """__file__ d'une exécution: RUNS_DIR/<uuid>/temp_exec.py (exports dans <uuid>/output)"""
+    run_dir = RUNS_DIR / uuid.uuid4().hex
+    run_dir.mkdir(parents=True, exist_ok=True)
+    return str(run_dir / "temp_exec.py")
+
+
+def prune_runs(max_age: Optional[float] = None) -> int:
+    """Supprime les répertoires d'exécution plus vieux que max_age secondes"""
+    max_age = RUNS_MAX_AGE if max_age is None else max_age
+    if not RUNS_DIR.is_dir():
+        return 0
+    removed = 0
+    limit = time.time() - max_age
+    for run_dir in RUNS_DIR.iterdir():
+        try:
+            if run_dir.is_dir() and run_dir.stat().st_mtime < limit:
+                shutil.rmtree(run_dir, ignore_errors=True)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def safe_builtins() -> Dict[str, Any]:
+    return {k: getattr(py_builtins, k) for k in SAFE_BUILTINS}
+
+
+class OutputRecorder:
+    """Enregistre les fichiers STL / STEP écrits par un job, dans l'ordre"""
+
+    def __init__(self):
+        self.paths: List[str] = []
+
+    def register(self, path) -> None:
+        try:
+            path = os.path.abspath(os.fspath(path))
+        except TypeError:
+            return  # export vers un flux (BytesIO, ...) : rien à suivre
+        if Path(path).suffix.lower() in OUTPUT_KINDS and path not in self.paths:
+            self.paths.append(path)
+
+    def open(self, file, mode="r", *args, **kwargs):
+        """open() du code généré: note les fichiers ouverts en écriture"""
+        if any(flag in mode for flag in "wax+"):
+            self.register(file)
+        return py_builtins.open(file, mode, *args, **kwargs)
+
+    def outputs(self) -> Dict[str, Optional[str]]:
+        """Dernier fichier existant de chaque type"""
+        found: Dict[str, Optional[str]] = {"stl_path": None, "step_path": None}
+        for path in self.paths:
+            if os.path.exists(path):
+                found[f"{OUTPUT_KINDS[Path(path).suffix.lower()]}_path"] = path
+        return found
+
+
+@contextlib.contextmanager
+def _intercept_exports(recorder: OutputRecorder):
+    """Intercepte les exports (CadQuery, stl_io.write_stl) le temps d'un job"""
+    import stl_io
+
+    patched = []
+
+    def wrap(owner, name, position, keywords):
+        original = getattr(owner, name, None)
+        if original is None:
+            return
+
+        def wrapper(*args, **kwargs):
+            result = original(*args, **kwargs)
+            target = next((kwargs[k] for k in keywords if k in kwargs),
+                          args[position] if len(args) > position else None)
+            if target is not None:
+                recorder.register(target)
+            return result
+
+        setattr(owner, name, wrapper)
+        patched.append((owner, name, original))
+
+    # write_stl(path, ...) des templates NumPy
+    wrap(stl_io, "write_stl", 0, ("path",))
+    try:
+        import cadquery as cq
+        # export(shape, fname, ...) / shape.exportStl(fileName, ...)
+        wrap(cq.exporters, "export", 1, ("fname",))
+        wrap(cq.Shape, "exportStl", 1, ("fileName",))
+        wrap(cq.Shape, "exportStep", 1, ("fileName",))
+    except Exception:
+        pass
+
+    try:
+        yield
+    finally:
+        for owner, name, original in reversed(patched):
+            setattr(owner, name, original)
+
+
+def build_namespace(exec_file: Optional[str] = None,
+                    recorder: Optional[OutputRecorder] = None) -> Dict[str, Any]:
+    """Namespace d'exécution du code généré"""
+    import numpy as np
+
+    recorder = recorder or OutputRecorder()
+    builtins = safe_builtins()
+    builtins["open"] = recorder.open
+
+    # Fonction no-op pour show_object (utilisée par CQ-Editor)
+    def show_object(obj, name=None, options=None):
+        """Dummy function - show_object is only for CQ-Editor"""
+        pass
+
+    return {
+        "__builtins__": builtins,
+        "math": math,
+        "np": np,
+        "numpy": np,
+        "struct": struct,
+        "Path": Path,
+        "show_object": show_object,
+        "register_output": recorder.register,
+        "__file__": exec_file or DEFAULT_EXEC_FILE,
+    }
+
+
+def run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Exécute un job {code, file} et retourne un résultat sérialisable en JSON"""
+    out = io.StringIO()
+    recorder = OutputRecorder()
+    ns = build_namespace(job.get("file"), recorder)
+
+    try:
+        with _RUN_LOCK, contextlib.redirect_stdout(out), _intercept_exports(recorder):
+            exec(compile(job["code"], "<cad>", "exec"), ns)
+    except Exception as e:
+        # Inclure le type d'exception pour que l'ErrorHandlerAgent puisse la catégoriser
+        return {
+            "success": False,
+            "errors": [f"Execution: {type(e).__name__}: {e}"],
+            "traceback": traceback.format_exc(),
+            "stdout": out.getvalue(),
+        }
+    finally:
+        ns.clear()
+        gc.collect()
+
+    return {"success": True, "stdout": out.getvalue(), **recorder.outputs()}
+
+
+def _preload():
+    """Import des modules lourds une seule fois au démarrage du worker"""
+    for module in ("numpy", "cadquery", "OCP"):
+        try:
+            __import__(module)
+        except Exception as e:
+            log.warning(f"⚠️ Worker could not preload {module}: {e}")
+
+
+def _limit_memory(memory_mb: int):
+    """Limite l'espace d'adressage du worker (POSIX uniquement)"""
+    if memory_mb <= 0:
+        return
+    try:
+        import resource
+        limit = memory_mb * 1024 * 1024
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ImportError, ValueError, OSError) as e:
+        log.warning(f"⚠️ Memory limit not applied: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CadaMx execution worker")
+    parser.add_argument("--memory-mb", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    # stdout est réservé au protocole: tout print (Python ou C) part sur stderr
+    proto = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    _preload()
+    _limit_memory(args.memory_mb)
+
+    def send(message: Dict[str, Any]):
+        proto.write(json.dumps(message, default=str) + "\n")
+        proto.flush()
+
+    send({"ready": True, "pid": os.getpid()})
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as e:
+            send({"success": False, "errors": [f"Execution: ProtocolError: {e}"]})
+            continue
+        send(run_job(job))
+
+
+if __name__ == "__main__":
+    main()
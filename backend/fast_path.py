@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fast-path déterministe pour les formes simples (sans Architect / Planner / Synthesizer).
+Un prompt est reconnu seulement s'il se décompose entièrement en une forme connue
+avec toutes ses dimensions: primitives (cube/boîte, cylindre, sphère, cône, tore)
+et formes courantes de prompts.json (tuyau, verre, vis, table).
+
+La confiance baisse pour chaque élément du prompt que l'émetteur ne sait pas
+construire (trou, filetage, coque...), chaque autre forme mentionnée et chaque
+mot qui reste une fois retirés la forme, ses cotes et les mots vides ('rounded',
+'half', 'cut'...); sous FAST_PATH_MIN_CONFIDENCE, le prompt repart dans la chaîne LLM.
+Une cote nulle ou négative ne donne pas de forme.
+Le code est ensuite émis par CodeSynthesizerAgent._generate_simple_shape_code.
+"""
+
+import os
+import re
+import math
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+log = logging.getLogger("cadamx.fast_path")
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "1") == "1"
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.9"))
+
+_NUM = r"(\d+(?:\.\d+)?)"
+_UNIT = r"\s*(mm|millim(?:e|è)t(?:er|re)s?|cm|centim(?:e|è)t(?:er|re)s?)?"
+_SEP = r"\s*(?:x|×|\*|by)\s*"
+# Texte qui se termine par un mot de dimension: le nombre suivant lui appartient
+_OWNED = re.compile(r"(?:radius|diameter|dia|height|length|width|thickness|depth|inset|wall|bottom)(?:\s+of)?\s*[=:]?\s*$")
+
+# Éléments que l'émetteur d'une forme ne construit pas (sauf s'il les déclare)
+_FEATURES = [
+    "fillet", "chamfer", "wall", "hollow", "shell", "hole", "bore", "thread", "slot", "pocket",
+    "groove", "rib", "fin", "pattern", "array", "grid", "text", "engrave", "emboss", "logo",
+    "sweep", "helix", "helical", "spiral", "loft", "spline", "revolve", "twist", "taper",
+    "handle", "gear", "teeth", "tooth", "bracket", "hook", "hinge", "mesh", "remesh",
+    "inch", "inches",
+]
+_FEATURE_RE = {name: re.compile(rf"\b{name}\w*") for name in _FEATURES}
+
+# Formes reconnues (mots-clés) - une autre forme mentionnée baisse la confiance
+_SHAPES = {
+    "table": r"\btables?\b",
+    "screw": r"\b(?:screws?|bolts?)\b",
+    "glass": r"\b(?:drinking glass|glass|cup|tumbler)\b",
+    "pipe": r"\b(?:pipes?|tubes?|tubing)\b",
+    "torus": r"\b(?:torus|donut|doughnut)\b",
+    "cone": r"\bcones?\b",
+    "sphere": r"\b(?:spheres?|balls?)\b",
+    "cylinder": r"\b(?:cylinders?|cylindrical|rods?|discs?|disks?)\b",
+    "box": r"\b(?:cubes?|box|block|cuboid|brick|plate|rectangular)\b",
+}
+_SHAPE_RE = {name: re.compile(pattern) for name, pattern in _SHAPES.items()}
+
+# Mots sans contenu géométrique: consignes, articles, liaisons
+_STOP_WORDS = {
+    "a", "an", "the", "and", "with", "of", "by", "to", "on", "at", "in", "into", "from", "for",
+    "as", "it", "its", "is", "that", "this", "then", "each", "both", "all", "me", "please",
+    "create", "make", "build", "generate", "model", "design", "draw", "add", "place",
+    "simple", "solid", "optional", "optionally",
+}
+# Mots de cote (les nombres et unités sont retirés avant)
+_DIMENSION_WORDS = {
+    "radius", "circumradius", "r", "diameter", "dia", "ø", "height", "length", "long", "tall",
+    "high", "thick", "thickness", "deep", "depth", "width", "wide", "side", "edge", "size",
+    "outer", "overall", "x", "mm", "cm", "millimeter", "millimeters", "millimetre", "millimetres",
+    "centimeter", "centimeters", "centimetre", "centimetres",
+}
+# Vocabulaire propre à chaque forme (parties, opérations que l'émetteur réalise)
+_VOCABULARY = {
+    "table": {"top", "tabletop", "legs", "leg", "four", "corner", "corners", "under", "inset",
+              "union", "parts", "part", "edges"},
+    "screw": {"shaft", "shank", "head", "hex", "hexagonal", "across", "flats", "af", "top",
+              "union", "edges"},
+    "glass": {"drinking", "inner", "rim", "bottom", "base", "flat", "leave", "subtract",
+              "subtracting", "edges"},
+    "pipe": {"inner", "rim", "edges", "ends", "subtract", "subtracting"},
+    "torus": {"major", "minor", "ring", "tube", "cross", "section"},
+    "cone": {"base", "bottom", "top", "tip", "radius1", "radius2"},
+    "sphere": set(),
+    "cylinder": set(),
+    "box": set(),
+}
+
+
+@dataclass
+class FastPathMatch:
+    """Forme reconnue: primitive (clé de l'émetteur), paramètres en mm, confiance"""
+    primitive: str
+    params: Dict[str, Any]
+    confidence: float
+    reasons: List[str] = field(default_factory=list)
+
+
+# ========== EXTRACTION DES DIMENSIONS ==========
+
+def _mm(value: str, unit: Optional[str]) -> float:
+    number = float(value)
+    return number * 10.0 if unit and unit.startswith("c") else number
+
+
+def _owned(prefix: str) -> bool:
+    """Le nombre qui suit ce texte est-il la valeur du mot de dimension qui le précède ?"""
+    keyword = _OWNED.search(prefix)
+    if not keyword:
+        return False
+    # '50 mm diameter 10 mm thick': le mot a déjà sa valeur devant lui
+    # (sauf si ce nombre appartient lui-même au mot précédent: 'diameter 12 mm height 120 mm inset')
+    value = re.search(rf"{_NUM}{_UNIT}\s*$", prefix[:keyword.start()])
+    return not value or _owned(prefix[:value.start()])
+
+
+def _dim(text: str, names: str) -> Optional[float]:
+    """Valeur d'une dimension: 'radius 20 mm', 'radius of 20', '20 mm radius', '100 mm tall'"""
+    after = re.search(rf"\b(?:{names})\b(?:\s+of)?\s*[=:]?\s*{_NUM}{_UNIT}", text)
+    # '50 mm diameter 10 mm thick': le nombre placé avant le mot l'emporte s'il vient
+    # en premier et n'est pas déjà la valeur d'une autre dimension ('radius 20 mm height')
+    for before in re.finditer(rf"{_NUM}{_UNIT}\s*(?:outer\s+|overall\s+)?(?:{names})\b", text):
+        if after and before.start() > after.start():
+            break
+        if not _owned(text[:before.start()]):
+            return _mm(before.group(1), before.group(2))
+    if after:
+        return _mm(after.group(1), after.group(2))
+    return None
+
+
+def _radius(text: str) -> Optional[float]:
+    """Rayon donné directement ou via le diamètre"""
+    radius = _dim(text, r"circumradius|radius|r")
+    if radius is not None:
+        return radius
+    diameter = _dim(text, r"diameter|dia|ø")
+    return diameter / 2.0 if diameter is not None else None
+
+
+def _length(text: str) -> Optional[float]:
+    return _dim(text, r"height|length|long|tall|high|thick|thickness|deep|depth")
+
+
+def _triple(text: str) -> Optional[List[float]]:
+    """'200 mm × 100 mm × 15 mm', '20x30x40'"""
+    match = re.search(rf"{_NUM}{_UNIT}{_SEP}{_NUM}{_UNIT}{_SEP}{_NUM}{_UNIT}", text)
+    if not match:
+        return None
+    groups = match.groups()
+    return [_mm(groups[i], groups[i + 1]) for i in (0, 2, 4)]
+
+
+def _scope(text: str, word: str, stop_words: str = "", width: int = 80) -> Optional[str]:
+    """Fragment qui suit un mot ('inner', 'head'...), coupé au mot d'une autre partie"""
+    match = re.search(rf"\b{word}\b", text)
+    if not match:
+        return None
+    fragment = text[match.end():match.end() + width]
+    if stop_words:
+        cut = re.search(rf"\b(?:{stop_words})\b", fragment)
+        if cut:
+            fragment = fragment[:cut.start()]
+    return fragment
+
+
+def _edge_size(text: str, operation: str) -> Optional[float]:
+    """'fillet the rim 1 mm', 'chamfer both rim edges 1 mm', '0.5 mm chamfer'"""
+    after = re.search(rf"\b{operation}\w*\b[a-z ]{{0,25}}?\s{_NUM}{_UNIT}", text)
+    if after:
+        return _mm(after.group(1), after.group(2))
+    before = re.search(rf"{_NUM}{_UNIT}\s*{operation}", text)
+    if before:
+        return _mm(before.group(1), before.group(2))
+    return None
+
+
+# ========== FORMES ==========
+# Chaque parseur renvoie (paramètres, éléments gérés, formes couvertes) ou None
+# si une dimension obligatoire manque.
+
+def _parse_table(text: str):
+    top = _triple(text)
+    legs = _scope(text, r"legs?", width=100)
+    if top is None or legs is None:
+        return None
+    count = re.search(r"\b(three|3|five|5|six|6|eight|8)\s+(?:\w+\s+)?legs\b", text)
+    if count:
+        return None
+    leg_radius, leg_height = _radius(legs), _length(legs)
+    inset = _dim(text, r"inset|inset by") or _dim(text, r"from (?:each |the )?(?:corners?|edges?)")
+    if None in (leg_radius, leg_height, inset):
+        return None
+    length, width, thickness = top
+    # Pieds au-delà du milieu du plateau: positions négatives ou croisées
+    if inset >= min(length, width) / 2.0:
+        return None
+    return ({"length": length, "width": width, "thickness": thickness, "leg_radius": leg_radius,
+             "leg_height": leg_height, "inset": inset}, set(), {"cylinder", "box"})
+
+
+def _parse_screw(text: str):
+    shaft = _scope(text, r"shaft|shank", r"head")
+    head = _scope(text, r"head", r"shaft|shank")
+    if shaft is None or head is None or not re.search(r"\bhex", text):
+        return None
+    shaft_radius, shaft_length = _radius(shaft), _length(shaft)
+    head_radius = _radius(head)
+    across_flats = _dim(head, r"across flats|af|width across flats")
+    if head_radius is None and across_flats is not None:
+        head_radius = across_flats / math.sqrt(3.0)
+    head_height = _length(head)
+    if None in (shaft_radius, shaft_length, head_radius, head_height):
+        return None
+    params = {"shaft_radius": shaft_radius, "shaft_length": shaft_length,
+              "head_radius": head_radius, "head_height": head_height,
+              "chamfer": _edge_size(text, "chamfer")}
+    return params, {"chamfer"}, {"cylinder"}
+
+
+def _parse_glass(text: str):
+    if re.search(r"\bmug\b", text):
+        return None
+    outer = _scope(text, r"outer", r"inner") or text
+    inner = _scope(text, r"inner", r"outer")
+    outer_radius, height = _radius(outer) or _radius(text), _length(outer) or _length(text)
+    inner_radius = _radius(inner) if inner is not None else None
+    wall = _dim(text, r"wall(?: thickness)?|walls?")
+    if inner_radius is None and wall is not None and outer_radius is not None:
+        inner_radius = outer_radius - wall
+    bottom = _dim(text, r"(?:solid |flat )?bottom(?: thickness)?|(?:solid |flat )?base")
+    if bottom is None and inner is not None and height is not None:
+        inner_height = _length(inner)
+        bottom = height - inner_height if inner_height is not None else None
+    if None in (outer_radius, height, inner_radius, bottom) or not 0 < inner_radius < outer_radius:
+        return None
+    # Fond plus épais que le verre: la poche ne creuse rien
+    if not 0 < bottom < height:
+        return None
+    fillet = _edge_size(text, "fillet")
+    if fillet is not None and fillet >= (outer_radius - inner_radius) / 2.0:
+        return None
+    params = {"outer_radius": outer_radius, "inner_radius": inner_radius, "height": height,
+              "bottom": bottom, "fillet": fillet}
+    return params, {"fillet", "wall", "hollow"}, {"cylinder"}
+
+
+def _parse_pipe(text: str):
+    outer = _scope(text, r"outer", r"inner") or text
+    inner = _scope(text, r"inner", r"outer")
+    outer_radius, length = _radius(outer) or _radius(text), _length(outer) or _length(text)
+    inner_radius = _radius(inner) if inner is not None else None
+    wall = _dim(text, r"wall(?: thickness)?|walls?")
+    if inner_radius is None and wall is not None and outer_radius is not None:
+        inner_radius = outer_radius - wall
+    if None in (outer_radius, length, inner_radius) or not 0 < inner_radius < outer_radius:
+        return None
+    chamfer = _edge_size(text, "chamfer")
+    if chamfer is not None and chamfer >= (outer_radius - inner_radius) / 2.0:
+        return None
+    params = {"outer_radius": outer_radius, "inner_radius": inner_radius, "length": length,
+              "chamfer": chamfer}
+    return params, {"chamfer", "wall", "hollow"}, {"cylinder"}
+
+
+def _parse_torus(text: str):
+    major = _dim(text, r"major radius|ring radius|outer radius")
+    minor = _dim(text, r"minor radius|tube radius|cross-section radius|section radius")
+    if major is None or minor is None or minor >= major:
+        return None
+    return {"major_radius": major, "minor_radius": minor}, set(), set()
+
+
+def _parse_cone(text: str):
+    base = _dim(text, r"base radius|bottom radius|radius1|r1") or _radius(text)
+    top = _dim(text, r"top radius|tip radius|radius2|r2") or 0.0
+    height = _length(text)
+    if base is None or height is None:
+        return None
+    return {"radius1": base, "radius2": top, "height": height}, set(), set()
+
+
+def _parse_sphere(text: str):
+    radius = _radius(text)
+    if radius is None:
+        return None
+    return {"radius": radius}, set(), set()
+
+
+def _parse_cylinder(text: str):
+    radius, height = _radius(text), _length(text)
+    if radius is None or height is None:
+        return None
+    return {"radius": radius, "height": height}, set(), set()
+
+
+def _parse_box(text: str):
+    dims = _triple(text)
+    if dims is None:
+        named = [_dim(text, r"length|long"), _dim(text, r"width|wide"), _dim(text, r"height|tall|high|thick|thickness")]
+        dims = named if None not in named else None
+    if dims is None and re.search(r"\bcubes?\b", text):
+        side = _dim(text, r"side|edge|size|cubes?")
+        dims = [side] * 3 if side is not None else None
+    if dims is None:
+        return None
+    return {"width": dims[0], "height": dims[1], "depth": dims[2]}, set(), set()
+
+
+# Ordre: formes composées d'abord (un tuyau mentionne aussi des cylindres)
+_PARSERS: List[tuple] = [
+    ("table", _parse_table),
+    ("screw", _parse_screw),
+    ("glass", _parse_glass),
+    ("pipe", _parse_pipe),
+    ("torus", _parse_torus),
+    ("cone", _parse_cone),
+    ("sphere", _parse_sphere),
+    ("cylinder", _parse_cylinder),
+    ("box", _parse_box),
+]
+
+
+def _valid(primitive: str, params: Dict[str, Any]) -> bool:
+    """Cotes strictement positives (la pointe d'un cône peut être nulle)"""
+    for name, value in params.items():
+        if value is None:
+            continue
+        if value < 0 or (value == 0 and not (primitive == "cone" and name == "radius2")):
+            return False
+    return True
+
+
+def _leftover_words(text: str, primitive: str, handled: set) -> List[str]:
+    """Mots qui ne sont ni la forme, ni une cote, ni un mot vide, ni déjà comptés"""
+    stripped = re.sub(rf"{_NUM}{_UNIT}{_SEP}{_NUM}{_UNIT}{_SEP}{_NUM}{_UNIT}", " ", text)
+    stripped = re.sub(rf"{_NUM}{_UNIT}", " ", stripped)
+    known = _STOP_WORDS | _DIMENSION_WORDS | _VOCABULARY[primitive] | handled
+    leftover = []
+    for word in re.findall(r"[a-zø]+", stripped):
+        if word in known or word in leftover:
+            continue
+        # Formes et éléments non gérés ont déjà leur propre raison
+        if any(p.fullmatch(word) for p in _SHAPE_RE.values()):
+            continue
+        if any(p.match(word) for p in _FEATURE_RE.values()):
+            continue
+        leftover.append(word)
+    return leftover
+
+
+def match_fast_path(prompt: str) -> Optional[FastPathMatch]:
+    """
+    Forme simple reconnue dans le prompt (avec toutes ses dimensions), ou None.
+    La confiance est à comparer à FAST_PATH_MIN_CONFIDENCE.
+    """
+    text = re.sub(r"\s+", " ", prompt.lower())
+
+    for primitive, parse in _PARSERS:
+        if not _SHAPE_RE[primitive].search(text):
+            continue
+        parsed = parse(text)
+        if parsed is None:
+            continue
+
+        params, handled, covered = parsed
+        if not _valid(primitive, params):
+            continue
+        reasons = []
+        for name, pattern in _FEATURE_RE.items():
+            if name not in handled and pattern.search(text):
+                reasons.append(f"unsupported feature '{name}'")
+        for other, pattern in _SHAPE_RE.items():
+            if other != primitive and other not in covered and pattern.search(text):
+                reasons.append(f"other shape '{other}' mentioned")
+        for word in _leftover_words(text, primitive, handled):
+            reasons.append(f"unrecognized word '{word}'")
+
+        features = sum(1 for r in reasons if r.startswith("unsupported"))
+        confidence = max(0.0, 1.0 - 0.5 * features - 0.25 * (len(reasons) - features))
+        return FastPathMatch(primitive, params, confidence, reasons)
+
+    return None
+
+
+__all__ = ["FastPathMatch", "match_fast_path", "FAST_PATH_ENABLED", "FAST_PATH_MIN_CONFIDENCE"]
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Index local (BM25, sans dépendance réseau) des exemples de code pour le Synthesizer CoT.
+Remplace la recherche par sous-chaîne sur FEW_SHOT_EXAMPLES, qui ratait la plupart des
+descriptions de l'Architect ("hollow tube", "coffee cup"...).
+
+Corpus:
+- FEW_SHOT_EXAMPLES (cot_prompts.py)
+- WORKING_PATTERNS (cadquery_reference.py)
+- code des générations CoT réussies (prompt + code), conservé dans FEW_SHOT_HISTORY_FILE
+
+search() renvoie les k meilleurs exemples qui tiennent dans un budget de tokens
+(estimé à ~4 caractères par token).
+"""
+
+import os
+import re
+import json
+import math
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from cot_prompts import FEW_SHOT_EXAMPLES
+from cadquery_reference import WORKING_PATTERNS
+
+log = logging.getLogger("cadamx.few_shot")
+
+FEW_SHOT_TOP_K = int(os.getenv("FEW_SHOT_TOP_K", "2"))
+FEW_SHOT_TOKEN_BUDGET = int(os.getenv("FEW_SHOT_TOKEN_BUDGET", "600"))
+FEW_SHOT_HISTORY_FILE = os.getenv("FEW_SHOT_HISTORY_FILE",
+                                  str(Path(__file__).parent / "output" / "few_shot" / "history.jsonl"))
+FEW_SHOT_HISTORY_MAX = int(os.getenv("FEW_SHOT_HISTORY_MAX", "200"))
+
+# Paramètres BM25 classiques
+_K1 = 1.5
+_B = 0.75
+# Un exemple bien moins pertinent que le premier n'est pas ajouté au prompt
+_MIN_RELATIVE_SCORE = 0.25
+# Poids du nom / de la description face au code
+_NAME_WEIGHT = 3
+
+_STOP_WORDS = {
+    "a", "an", "the", "and", "or", "of", "with", "to", "in", "on", "at", "by", "for", "from", "into",
+    "then", "create", "make", "add", "mm", "cm", "deg", "import", "cadquery", "cq", "result", "as",
+}
+# Vocabulaire des prompts → noms des exemples
+_SYNONYMS = {
+    "tube": "pipe", "tubing": "pipe", "cup": "glass", "mug": "glass", "tumbler": "glass",
+    "coil": "spring", "helical": "helix", "bolt": "screw", "hemisphere": "bowl",
+    "hemispherical": "bowl", "leg": "table", "nut": "hexagonal", "hex": "hexagonal",
+    "cylindrical": "cylinder", "donut": "torus", "doughnut": "torus", "frustum": "cone",
+    "washer": "ring", "annulus": "ring", "cube": "box", "cuboid": "box",
+}
+
+_WORD_RE = re.compile(r"[A-Za-z][a-z]*|[A-Z]+(?![a-z])")
+
+
+def tokenize_text(text: str) -> List[str]:
+    """Mots en minuscules, camelCase découpé (makeHelix → make, helix), pluriels et synonymes ramenés"""
+    tokens = []
+    for word in _WORD_RE.findall(text):
+        word = word.lower()
+        if len(word) < 2 or word in _STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(_SYNONYMS.get(word, word))
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+@dataclass
+class FewShotExample:
+    """Exemple du corpus: nom, origine (few_shot, pattern, history) et code"""
+    name: str
+    source: str
+    code: str
+    description: str = ""
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.code)
+
+
+class FewShotIndex:
+    """Index BM25 en mémoire, recalculé à la demande après un ajout"""
+
+    def __init__(self, history_file: Optional[Path] = None, history_max: Optional[int] = None,
+                 load_history: bool = True):
+        self.history_file = Path(history_file or FEW_SHOT_HISTORY_FILE)
+        self.history_max = FEW_SHOT_HISTORY_MAX if history_max is None else history_max
+        self._lock = threading.Lock()
+        self._dirty = True
+
+        self.examples: List[FewShotExample] = []
+        for name, code in FEW_SHOT_EXAMPLES.items():
+            self.examples.append(FewShotExample(name, "few_shot", code, name))
+        for name, code in WORKING_PATTERNS.items():
+            self.examples.append(FewShotExample(name, "pattern", code, name.replace("_", " ")))
+        self.builtin_count = len(self.examples)
+
+        if load_history and self.history_file.exists():
+            for line in self.history_file.read_text(encoding="utf-8").splitlines()[-self.history_max:]:
+                try:
+                    entry = json.loads(line)
+                    self._add_history(entry["prompt"], entry["code"])
+                except (ValueError, KeyError):
+                    continue
+
+        log.info(f"📚 Few-shot index: {len(self.examples)} examples "
+                 f"({len(self.examples) - self.builtin_count} from past generations)")
+
+    def _add_history(self, prompt: str, code: str):
+        """Une entrée par prompt (la plus récente), au plus history_max"""
+        history = [e for e in self.examples[self.builtin_count:] if e.description != prompt]
+        history.append(FewShotExample(prompt[:60], "history", code, prompt))
+        self.examples[self.builtin_count:] = history[-self.history_max:]
+        self._dirty = True
+
+    def add_generation(self, prompt: str, code: str):
+        """Code CoT validé (Critic + exécution): ajouté à l'index et à l'historique sur disque"""
+        with self._lock:
+            self._add_history(prompt, code)
+            history = self.examples[self.builtin_count:]
+        self.history_file.parent.mkdir(parents=True, exist_ok=True)
+        lines = [json.dumps({"prompt": e.description, "code": e.code}, ensure_ascii=False) for e in history]
+        tmp = self.history_file.with_suffix(".tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, self.history_file)
+
+    def _build(self):
+        """Fréquences des termes par document et IDF (nom / description pondérés)"""
+        self._docs: List[Counter] = []
+        for example in self.examples:
+            terms = Counter(tokenize_text(example.code))
+            for term in tokenize_text(example.description):
+                terms[term] += _NAME_WEIGHT
+            self._docs.append(terms)
+        self._lengths = [sum(doc.values()) for doc in self._docs]
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        frequencies = Counter(term for doc in self._docs for term in doc)
+        n = len(self._docs)
+        self._idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in frequencies.items()}
+        self._dirty = False
+
+    def scores(self, query: str) -> List[float]:
+        with self._lock:
+            if self._dirty:
+                self._build()
+            terms = set(tokenize_text(query))
+            results = []
+            for doc, length in zip(self._docs, self._lengths):
+                score = 0.0
+                for term in terms:
+                    tf = doc.get(term, 0)
+                    if tf:
+                        norm = _K1 * (1 - _B + _B * length / self._avg_length)
+                        score += self._idf[term] * tf * (_K1 + 1) / (tf + norm)
+                results.append(score)
+            return results
+
+    def search(self, query: str, k: Optional[int] = None,
+               token_budget: Optional[int] = None) -> List[FewShotExample]:
+        """Les k exemples les plus pertinents dont le code tient dans token_budget"""
+        k = FEW_SHOT_TOP_K if k is None else k
+        budget = FEW_SHOT_TOKEN_BUDGET if token_budget is None else token_budget
+
+        ranked = sorted(zip(self.scores(query), range(len(self.examples))), key=lambda s: (-s[0], s[1]))
+        if not ranked or ranked[0][0] <= 0:
+            return []
+
+        selected, used = [], 0
+        for score, i in ranked:
+            if len(selected) >= k or score < ranked[0][0] * _MIN_RELATIVE_SCORE:
+                break
+            example = self.examples[i]
+            if used + example.tokens > budget:
+                continue
+            selected.append(example)
+            used += example.tokens
+        return selected
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "examples": len(self.examples),
+                "history": len(self.examples) - self.builtin_count,
+                "history_max": self.history_max,
+            }
+
+
+_shared: Optional[FewShotIndex] = None
+
+
+def shared_few_shot_index() -> FewShotIndex:
+    """Index du processus (créé au premier appel)"""
+    global _shared
+    if _shared is None:
+        _shared = FewShotIndex()
+    return _shared
+
+
+__all__ = ["FewShotIndex", "FewShotExample", "tokenize_text", "shared_few_shot_index"]
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Moteur honeycomb (nid d'abeille hexagonal, hexagones à sommet plat).
+- hex_centers : centres des cellules entièrement dans le panneau (vectorisé)
+- honeycomb_triangles : maillage NumPy direct des cellules, sans CAD,
+  pour quand seul le STL est demandé. Les parois partagées entre cellules
+  voisines ne sont pas émises: le maillage reste fermé et sans faces internes.
+
+Utilisé par le code généré (template honeycomb):
+    from honeycomb import hex_centers, honeycomb_triangles
+"""
+
+import math
+import logging
+
+import numpy as np
+
+log = logging.getLogger("cadamx.honeycomb")
+
+_SQRT3 = math.sqrt(3.0)
+
+
+def hex_centers(w: float, h: float, a: float, x0: float = 0.0, y0: float = 0.0) -> np.ndarray:
+    """
+    Centres (n, 2) des hexagones de rayon a entièrement contenus dans [x0, w] x [y0, h].
+    Pavage: colonnes espacées de 1.5a, colonnes impaires décalées de √3a/2.
+    """
+    dx, dy = 1.5 * a, _SQRT3 * a
+    half_w, half_h = a, dy / 2.0
+
+    nx = int(math.ceil((w + 2 * half_w) / dx)) + 2
+    ny = int(math.ceil((h + 2 * half_h) / dy)) + 2
+    i, j = np.meshgrid(np.arange(nx), np.arange(ny), indexing="ij")
+    cx = x0 + i * dx
+    cy = y0 + j * dy + np.where(i % 2 == 1, dy / 2.0, 0.0)
+
+    inside = ((x0 + half_w <= cx) & (cx <= w - half_w) &
+              (y0 + half_h <= cy) & (cy <= h - half_h))
+    return np.stack([cx[inside], cy[inside]], axis=1)
+
+
+def inner_radius(a: float, wall: float) -> float:
+    """Rayon de l'hexagone intérieur (offset de la paroi vers l'intérieur)"""
+    return a - 2.0 * wall / _SQRT3
+
+
+def honeycomb_triangles(centers: np.ndarray, a: float, wall: float, depth: float,
+                        z0: float = 0.0) -> np.ndarray:
+    """
+    Triangule toutes les cellules (anneaux hexagonaux extrudés) en une passe.
+
+    Returns:
+        (n, 3, 3) float32
+    """
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+    if len(centers) == 0:
+        return np.zeros((0, 3, 3), dtype=np.float32)
+
+    a_in = inner_radius(a, wall)
+    if a_in <= 0:
+        raise ValueError(f"Wall thickness {wall} too large for cell size {a}")
+
+    angles = np.radians(np.arange(6) * 60.0)
+    unit = np.stack([np.cos(angles), np.sin(angles)], axis=1)          # (6, 2)
+
+    def ring(radius, z):
+        xy = centers[:, None, :] + radius * unit[None]                  # (n, 6, 2)
+        return np.concatenate([xy, np.full(xy.shape[:2] + (1,), z)], axis=2)
+
+    z1 = z0 + depth
+    ob, ot = ring(a, z0), ring(a, z1)
+    ib, it = ring(a_in, z0), ring(a_in, z1)
+    nxt = lambda v: np.roll(v, -1, axis=1)
+
+    faces = [
+        # Dessus (normale +Z) et dessous (-Z)
+        np.stack([ot, nxt(ot), nxt(it)], axis=2), np.stack([ot, nxt(it), it], axis=2),
+        np.stack([ob, nxt(ib), nxt(ob)], axis=2), np.stack([ob, ib, nxt(ib)], axis=2),
+        # Parois intérieures (normale vers le centre)
+        np.stack([nxt(ib), ib, it], axis=2), np.stack([nxt(ib), it, nxt(it)], axis=2),
+    ]
+    tris = [f.reshape(-1, 3, 3) for f in faces]
+
+    # Parois extérieures: seulement côté vide (pas de voisin sur ce côté)
+    directions = np.radians(30.0 + 60.0 * np.arange(6))
+    offsets = _SQRT3 * a * np.stack([np.cos(directions), np.sin(directions)], axis=1)
+    quantum = a * 1e-3
+    keys = np.round(centers / quantum).astype(np.int64)
+    neighbor_keys = np.round((centers[:, None, :] + offsets[None]) / quantum).astype(np.int64)
+
+    packed = keys[:, 0] * (1 << 31) + keys[:, 1]
+    packed_neighbors = neighbor_keys[..., 0] * (1 << 31) + neighbor_keys[..., 1]
+    exposed = ~np.isin(packed_neighbors, packed)                        # (n, 6)
+
+    outer = [np.stack([ob, nxt(ob), nxt(ot)], axis=2), np.stack([ob, nxt(ot), ot], axis=2)]
+    tris += [f[exposed] for f in outer]
+
+    result = np.concatenate(tris).astype(np.float32)
+    log.info(f"🐝 Honeycomb mesh: {len(centers):,} cells → {len(result):,} triangles")
+    return result
+
+
+__all__ = ["hex_centers", "inner_radius", "honeycomb_triangles"]
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stockage des artefacts par job de génération.
+Chaque génération reçoit un job ID; ses fichiers (STL, STEP, code, aperçu) sont
+rangés dans un dossier adressé par contenu: output/<hash>/model.stl, etc.
+Les métadonnées sont propres au job: output/jobs/<job_id>.json (qui pointe vers le hash),
+car deux jobs au contenu identique partagent le même dossier.
+"""
+
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+log = logging.getLogger("cadamx.jobs")
+
+
+# Type d'artefact → (nom de fichier dans le dossier, media type)
+ARTIFACTS = {
+    "stl": ("model.stl", "application/octet-stream"),
+    "step": ("model.step", "application/octet-stream"),
+    "code": ("code.py", "text/x-python"),
+    "mesh": ("mesh.bin", "application/octet-stream"),  # aperçu viewer, gzip (mesh_ops.encode_mesh)
+    "meta": ("meta.json", "application/json"),  # job: jobs/<job_id>.json
+}
+
+
+class JobStore:
+    """
+    Registre job ID → dossier d'artefacts.
+    Les dossiers sont adressés par contenu (sha256 du code + STL), donc deux jobs
+    qui produisent exactement le même modèle partagent les mêmes fichiers;
+    leurs métadonnées (job_id, prompt, dates, design notes) restent séparées.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.jobs_dir = self.root / "jobs"
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+
+        self._index: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        log.info(f"📦 JobStore initialized @ {self.root}")
+
+    def new_job(self) -> str:
+        """Crée un nouvel identifiant de job"""
+        return uuid.uuid4().hex
+
+    def save(self, job_id: str, code: str, stl_path: Optional[str] = None,
+             step_path: Optional[str] = None, app_type: str = "model",
+             metadata: Optional[Dict[str, Any]] = None,
+             mesh_bin: Optional[bytes] = None) -> Dict[str, Any]:
+        """
+        Copie les artefacts d'un job dans son dossier adressé par contenu.
+        mesh_bin (aperçu binaire) est dérivé du STL: il n'entre pas dans le hash.
+
+        Returns:
+            Les métadonnées du job (jobs/<job_id>.json)
+        """
+        stl_file = Path(stl_path) if stl_path else None
+        step_file = Path(step_path) if step_path else None
+
+        digest = hashlib.sha256(code.encode("utf-8"))
+        for src in (stl_file, step_file):
+            if src and src.exists():
+                with open(src, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+        content_hash = digest.hexdigest()[:16]
+
+        job_dir = self.root / content_hash
+        job_dir.mkdir(parents=True, exist_ok=True)
+
+        files = {"code": ARTIFACTS["code"][0]}
+        (job_dir / ARTIFACTS["code"][0]).write_text(code, encoding="utf-8")
+
+        for kind, src in (("stl", stl_file), ("step", step_file)):
+            if src and src.exists():
+                dst = job_dir / ARTIFACTS[kind][0]
+                if not dst.exists():
+                    shutil.copyfile(src, dst)
+                files[kind] = dst.name
+
+        if mesh_bin is not None:
+            dst = job_dir / ARTIFACTS["mesh"][0]
+            if not dst.exists():
+                dst.write_bytes(mesh_bin)
+            files["mesh"] = dst.name
+
+        meta = {
+            "job_id": job_id,
+            "hash": content_hash,
+            "app_type": app_type,
+            "created_at": datetime.now().isoformat(),
+            "files": files,
+            "metadata": metadata or {},
+        }
+        # Métadonnées + pointeur job → hash (survit au redémarrage / partagé entre workers)
+        with self._lock:
+            self._write_meta(job_id, meta)
+            self._index[job_id] = content_hash
+
+        log.info(f"📦 Job {job_id} stored in {job_dir}")
+        return meta
+
+    def _meta_path(self, job_id: str) -> Optional[Path]:
+        """jobs/<job_id>.json (None pour un identifiant invalide)"""
+        if not job_id.isalnum():
+            return None
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _write_meta(self, job_id: str, meta: Dict[str, Any]):
+        """Écriture atomique des métadonnées (appelé sous self._lock)"""
+        path = self._meta_path(job_id)
+        tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps(meta, indent=2, ensure_ascii=False, default=str), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _resolve(self, job_id: str) -> Optional[Path]:
+        """Retourne le dossier d'un job (ou None s'il est inconnu)"""
+        meta_path = self._meta_path(job_id)
+        if meta_path is None:
+            return None
+
+        with self._lock:
+            content_hash = self._index.get(job_id)
+
+        if content_hash is None:
+            if not meta_path.exists():
+                return None
+            content_hash = json.loads(meta_path.read_text(encoding="utf-8"))["hash"]
+            with self._lock:
+                self._index[job_id] = content_hash
+
+        return self.root / content_hash
+
+    def get_meta(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Lit les métadonnées d'un job"""
+        path = self._meta_path(job_id)
+        if path is None or not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def update_meta(self, job_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Ajoute des champs aux métadonnées d'un job existant (enrichissements arrivés après coup)"""
+        path = self._meta_path(job_id)
+        if path is None:
+            return None
+        with self._lock:
+            if not path.exists():
+                return None
+            meta = json.loads(path.read_text(encoding="utf-8"))
+            meta.update(updates)
+            self._write_meta(job_id, meta)
+        return meta
+
+    def artifact_path(self, job_id: str, kind: str) -> Optional[Path]:
+        """Chemin d'un artefact (stl, step, code, mesh, meta) s'il existe"""
+        if kind not in ARTIFACTS:
+            return None
+        if kind == "meta":
+            path = self._meta_path(job_id)
+            return path if path is not None and path.exists() else None
+        job_dir = self._resolve(job_id)
+        if job_dir is None:
+            return None
+        path = job_dir / ARTIFACTS[kind][0]
+        return path if path.exists() else None
+
+
+__all__ = ["JobStore", "ARTIFACTS"]
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Générateur de lattices à poutres entièrement vectorisé (NumPy).
+1. Le jeu de poutres unique est calculé une fois pour toute la grille
+   (les arêtes partagées entre cellules voisines ne sont générées qu'une fois)
+2. Tous les cylindres sont triangulés en une seule opération broadcastée
+
+Utilisé par le code généré (template lattice):
+    from lattice import lattice_struts, strut_triangles
+"""
+
+import logging
+from itertools import combinations, permutations, product
+from typing import Dict, Tuple
+
+import numpy as np
+
+log = logging.getLogger("cadamx.lattice")
+
+# Coordonnées des cellules en quarts de cellule: tous les nœuds sont entiers
+_Q = 4
+
+_CORNERS = [tuple(p) for p in product((0, _Q), repeat=3)]
+_FACE_CENTERS = [(2, 2, 0), (2, 2, 4), (2, 0, 2), (2, 4, 2), (0, 2, 2), (4, 2, 2)]
+_BODY_CENTER = [(2, 2, 2)]
+
+
+def _d2(a, b) -> int:
+    return sum((x - y) ** 2 for x, y in zip(a, b))
+
+
+def _pairs_at(points_a, points_b, dist2: int):
+    """Paires (a, b) à distance² donnée (les doublons sont retirés sur la grille)"""
+    return [(a, b) for a in points_a for b in points_b if _d2(a, b) == dist2]
+
+
+def _kelvin_nodes():
+    """Octaèdre tronqué: permutations de (0, ±1, ±2) autour du centre"""
+    nodes = set()
+    for signs in product((-1, 1), repeat=2):
+        for perm in permutations((0, signs[0] * 1, signs[1] * 2)):
+            nodes.add(tuple(2 + c for c in perm))
+    return sorted(nodes)
+
+
+def _unit_cell(cell_type: str):
+    """Liste des poutres d'une cellule unité (coordonnées entières en quarts)"""
+    if cell_type == "cubic":
+        return [(a, b) for a, b in combinations(_CORNERS, 2) if _d2(a, b) == _Q ** 2]
+    if cell_type == "bcc":
+        return _pairs_at(_CORNERS, _BODY_CENTER, 12)
+    if cell_type == "fcc":
+        return _pairs_at(_CORNERS, _FACE_CENTERS, 8)
+    if cell_type == "octet":
+        return _unit_cell("fcc") + [(a, b) for a, b in combinations(_FACE_CENTERS, 2) if _d2(a, b) == 8]
+    if cell_type == "kelvin":
+        return [(a, b) for a, b in combinations(_kelvin_nodes(), 2) if _d2(a, b) == 2]
+    if cell_type == "diamond":
+        tetra = [(1, 1, 1), (1, 3, 3), (3, 1, 3), (3, 3, 1)]
+        return _pairs_at(tetra, _CORNERS + _FACE_CENTERS, 3)
+    raise KeyError(cell_type)
+
+
+CELL_TYPES = ("cubic", "bcc", "fcc", "octet", "kelvin", "diamond")
+
+_UNIT_CELLS: Dict[str, np.ndarray] = {
+    name: np.array(_unit_cell(name), dtype=np.int32) for name in CELL_TYPES
+}
+
+
+def lattice_struts(cell_type: str, cell_size: float, counts: Tuple[int, int, int],
+                   origin=(0.0, 0.0, 0.0)) -> np.ndarray:
+    """
+    Poutres uniques d'une grille nx x ny x nz de cellules.
+
+    Returns:
+        (m, 2, 3) float32 - extrémités de chaque poutre
+    """
+    if cell_type not in _UNIT_CELLS:
+        log.warning(f"⚠️ Unsupported strut cell '{cell_type}', using cubic")
+        cell_type = "cubic"
+
+    unit = _UNIT_CELLS[cell_type]                       # (e, 2, 3)
+    nx, ny, nz = (max(1, int(n)) for n in counts)
+    offsets = np.stack(np.meshgrid(np.arange(nx), np.arange(ny), np.arange(nz),
+                                   indexing="ij"), axis=-1).reshape(-1, 1, 1, 3).astype(np.int32) * _Q
+    struts = (offsets + unit[None]).reshape(-1, 2, 3)  # (cells * e, 2, 3)
+
+    # Clé entière par nœud, extrémités ordonnées, puis dédoublonnage des arêtes partagées
+    side = np.int64(_Q * max(nx, ny, nz) + 1)
+    keys = (struts[..., 0].astype(np.int64) * side + struts[..., 1]) * side + struts[..., 2]
+    swap = keys[:, 0] > keys[:, 1]
+    keys[swap] = keys[swap][:, ::-1]
+    struts[swap] = struts[swap][:, ::-1]
+
+    if int(side) ** 6 < 2 ** 62:
+        _, first = np.unique(keys[:, 0] * side ** 3 + keys[:, 1], return_index=True)
+    else:
+        _, first = np.unique(keys, axis=0, return_index=True)
+    unique = struts[np.sort(first)]
+
+    log.info(f"🔩 {cell_type} lattice {nx}x{ny}x{nz}: {len(struts):,} struts → {len(unique):,} unique")
+    return (unique.astype(np.float32) * np.float32(cell_size / _Q)
+            + np.asarray(origin, dtype=np.float32))
+
+
+def strut_triangles(struts: np.ndarray, radius: float, segments: int = 8,
+                    caps: bool = True) -> np.ndarray:
+    """
+    Triangule toutes les poutres (cylindres orientés le long de chaque poutre).
+
+    Returns:
+        (n, 3, 3) float32 - 2*segments triangles par poutre (+ 2*segments si caps)
+    """
+    struts = np.asarray(struts, dtype=np.float32).reshape(-1, 2, 3)
+    p1, p2 = struts[:, 0], struts[:, 1]
+    axis = p2 - p1
+    length = np.linalg.norm(axis, axis=1)
+    keep = length > 1e-6
+    p1, p2, axis, length = p1[keep], p2[keep], axis[keep], length[keep]
+    d = axis / length[:, None]
+
+    # Base orthonormée (u, v, d) par poutre
+    helper = np.where(np.abs(d[:, :1]) < 0.9, [[1.0, 0.0, 0.0]], [[0.0, 1.0, 0.0]]).astype(np.float32)
+    u = np.cross(d, helper)
+    u /= np.linalg.norm(u, axis=1, keepdims=True)
+    v = np.cross(d, u)
+
+    theta = np.linspace(0.0, 2.0 * np.pi, segments, endpoint=False, dtype=np.float32)
+    ring = radius * (np.cos(theta)[None, :, None] * u[:, None, :]
+                     + np.sin(theta)[None, :, None] * v[:, None, :])   # (m, seg, 3)
+    bottom = p1[:, None, :] + ring
+    top = p2[:, None, :] + ring
+    bottom_next = np.roll(bottom, -1, axis=1)
+    top_next = np.roll(top, -1, axis=1)
+
+    # Écriture directe dans le tableau de sortie (pas de listes ni de concaténation)
+    out = np.empty((len(p1), 4 if caps else 2, segments, 3, 3), dtype=np.float32)
+    out[:, 0, :, 0], out[:, 0, :, 1], out[:, 0, :, 2] = bottom, bottom_next, top_next
+    out[:, 1, :, 0], out[:, 1, :, 1], out[:, 1, :, 2] = bottom, top_next, top
+    if caps:
+        out[:, 2, :, 0], out[:, 2, :, 1], out[:, 2, :, 2] = p1[:, None, :], bottom_next, bottom
+        out[:, 3, :, 0], out[:, 3, :, 1], out[:, 3, :, 2] = p2[:, None, :], top, top_next
+
+    return out.reshape(-1, 3, 3)
+
+
+__all__ = ["CELL_TYPES", "lattice_struts", "strut_triangles"]
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache persistant des réponses LLM (utilisé par le client Ollama partagé, llm_pool).
+Clé = sha256(modèle, requête complète (prompt ou messages + condition d'arrêt), options
+d'échantillonnage): les prompts système fixes de cot_prompts.py et le prompt de healing
+produisent la même clé d'un run à l'autre, et un batch de régression relancé sur les
+mêmes prompts ne refait plus les appels.
+
+Seuls les appels à basse température sont mis en cache par défaut
+(temperature <= LLM_CACHE_MAX_TEMPERATURE): au-delà, la réponse est censée varier.
+Un appel peut forcer le comportement avec cache=True / cache=False.
+En mode replay (LLM_CACHE_REPLAY=1, activé par batch_runner.py), tous les appels
+passent par le cache quelle que soit leur température: Architect (0.7) et Planner
+(0.5) compris, un batch relancé rejoue les mêmes réponses sans appeler Ollama.
+
+Stockage: <root>/llm_cache.sqlite3, réponses compressées (zlib), éviction LRU
+quand la taille compressée totale dépasse LLM_CACHE_MAX_MB.
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+log = logging.getLogger("cadamx.llm_cache")
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", str(Path(__file__).parent / "output" / "llm_cache"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "256"))
+# Appels plus "créatifs" que ça: pas de cache sauf cache=True explicite
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.3"))
+# Rejeu déterministe: toutes les températures en cache (sauf cache=False explicite)
+LLM_CACHE_REPLAY = os.getenv("LLM_CACHE_REPLAY", "0") == "1"
+
+
+def llm_cache_key(model: str, request: Dict[str, Any], options: Dict[str, Any]) -> str:
+    """Hash de (modèle, requête, options) en JSON canonique"""
+    blob = json.dumps({"model": model, "request": request, "options": options},
+                      sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Table SQLite clé → réponse compressée (une connexion par appel, mode WAL)"""
+
+    def __init__(self, root: Optional[Path] = None, max_mb: Optional[float] = None,
+                 max_temperature: Optional[float] = None, enabled: Optional[bool] = None,
+                 replay: Optional[bool] = None):
+        self.enabled = LLM_CACHE_ENABLED if enabled is None else enabled
+        self.replay = LLM_CACHE_REPLAY if replay is None else replay
+        self.root = Path(root or LLM_CACHE_DIR)
+        self.max_bytes = int((LLM_CACHE_MAX_MB if max_mb is None else max_mb) * 1024 * 1024)
+        self.max_temperature = LLM_CACHE_MAX_TEMPERATURE if max_temperature is None else max_temperature
+
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if self.enabled:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self.db_path = self.root / "llm_cache.sqlite3"
+            with self._connect() as db:
+                db.execute("""
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                        key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used REAL NOT NULL,
+                        hits INTEGER NOT NULL DEFAULT 0,
+                        size INTEGER NOT NULL,
+                        value BLOB NOT NULL
+                    )""")
+                db.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)")
+            log.info(f"🗄️ LLM cache @ {self.db_path} (temperature <= {self.max_temperature})")
+
+    @contextmanager
+    def _connect(self):
+        """Connexion courte: commit puis fermeture (appels depuis des threads différents)"""
+        db = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+    def accepts(self, options: Dict[str, Any], cache: Optional[bool] = None) -> bool:
+        """Cet appel passe-t-il par le cache ? (cache=None: selon la température, sauf en replay)"""
+        if not self.enabled or cache is False:
+            return False
+        if cache is None and not self.replay and options.get("temperature", 0.0) > self.max_temperature:
+            with self._lock:
+                self.bypassed += 1
+            return False
+        return True
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row:
+                db.execute("UPDATE llm_cache SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        log.info(f"⚡ LLM cache hit {key[:12]}")
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def put(self, key: str, model: str, text: str):
+        value = zlib.compress(text.encode("utf-8"), 6)
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, created_at, last_used, hits, size, value) "
+                "VALUES (?, ?, ?, ?, 0, ?, ?)",
+                (key, model, now, now, len(value), value),
+            )
+        self._evict()
+
+    def _evict(self):
+        """Supprime les réponses les moins récemment utilisées au-delà de max_bytes"""
+        with self._connect() as db:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for key, size in db.execute("SELECT key, size FROM llm_cache ORDER BY last_used"):
+                if total <= self.max_bytes:
+                    break
+                victims.append(key)
+                total -= size
+            db.executemany("DELETE FROM llm_cache WHERE key = ?", [(k,) for k in victims])
+        with self._lock:
+            self.evictions += len(victims)
+        log.info(f"🧹 LLM cache: evicted {len(victims)} responses")
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size = 0, 0
+        if self.enabled:
+            with self._connect() as db:
+                entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "max_temperature": self.max_temperature,
+                "replay": self.replay,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+_shared: Optional[LLMCache] = None
+
+
+def shared_llm_cache() -> LLMCache:
+    """Cache du processus (créé au premier appel)"""
+    global _shared
+    if _shared is None:
+        _shared = LLMCache()
+    return _shared
+
+
+__all__ = ["LLMCache", "llm_cache_key", "shared_llm_cache"]
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Client Ollama partagé par tous les agents LLM.
+Un seul ollama.AsyncClient (pool de connexions HTTP keep-alive) par serveur Ollama,
+au lieu d'un client par agent, et une file d'attente à priorités devant lui:
+
+- un sémaphore par modèle (OLLAMA_MODEL_CONCURRENCY) borne les appels simultanés
+  d'un même modèle, donc Ollama ne charge pas un 33B et un 7B en alternance à chaque requête;
+- une limite globale (OLLAMA_MAX_CONCURRENCY) servie par priorité: à capacité saturée,
+  les appels courts (petits modèles) passent devant les synthèses 33B en attente.
+
+La priorité par défaut est la taille du modèle lue dans son tag (qwen2.5-coder:7b → 7,
+deepseek-coder:33b → 33): plus petit = servi en premier. La limite par modèle étant
+inférieure à la limite globale, un gros modèle garde toujours accès à un slot.
+
+Conditions d'arrêt (JsonClosed, FenceClosed): les agents n'exploitent que le premier
+bloc ```json``` / ```python``` de la réponse; le stream est coupé dès que ce bloc est
+fermé au lieu de laisser le modèle décoder ses explications jusqu'à num_predict.
+
+Les réponses des appels à basse température passent par le cache persistant (llm_cache).
+
+Chaque appel transmet keep_alive (OLLAMA_KEEP_ALIVE) pour qu'Ollama garde les modèles
+en mémoire entre deux requêtes; warm_up() les charge au démarrage du serveur.
+"""
+
+import os
+import re
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from llm_cache import LLMCache, llm_cache_key, shared_llm_cache
+
+log = logging.getLogger("cadamx.llm_pool")
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+# Appels Ollama simultanés, tous modèles confondus
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "3"))
+# Appels simultanés par modèle: "2" ou "2,deepseek-coder:33b=1" (défaut, puis exceptions)
+OLLAMA_MODEL_CONCURRENCY = os.getenv("OLLAMA_MODEL_CONCURRENCY", "2")
+# Connexions HTTP gardées ouvertes vers Ollama
+OLLAMA_KEEPALIVE_CONNECTIONS = int(os.getenv("OLLAMA_KEEPALIVE_CONNECTIONS", "8"))
+# Durée pendant laquelle Ollama garde un modèle chargé après un appel ("30m", "24h", -1 = toujours)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+_SIZE_RE = re.compile(r"(\d+(?:\.\d+)?)b\b", re.IGNORECASE)
+
+
+def model_priority(model: str) -> float:
+    """Priorité par défaut d'un modèle: sa taille en milliards de paramètres (0 si inconnue)"""
+    match = _SIZE_RE.search(model.split(":")[-1]) or _SIZE_RE.search(model)
+    return float(match.group(1)) if match else 0.0
+
+
+def parse_keep_alive(value: str):
+    """'-1' → -1, '600' → 600 (secondes), '30m' → '30m', '' → None (défaut d'Ollama)"""
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def parse_model_limits(spec: str):
+    """'2,deepseek-coder:33b=1' → (2, {'deepseek-coder:33b': 1})"""
+    default, limits = 1, {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        if "=" in part:
+            model, value = part.rsplit("=", 1)
+            limits[model.strip()] = max(1, int(value))
+        else:
+            default = max(1, int(part))
+    return default, limits
+
+
+class JsonClosed:
+    """Condition d'arrêt: le premier objet JSON de la réponse est refermé (chaînes et échappements gérés)"""
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+
+    def __call__(self, piece: str) -> bool:
+        for char in piece:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"' and self.started:
+                self.in_string = True
+            elif char == "{":
+                self.started = True
+                self.depth += 1
+            elif char == "}" and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+
+class FenceClosed:
+    """Condition d'arrêt: un bloc de code ``` ouvert puis refermé"""
+
+    FENCE = "```"
+
+    def __init__(self):
+        self.text = ""
+        self.open_at = -1
+
+    def __call__(self, piece: str) -> bool:
+        start = max(0, len(self.text) - len(self.FENCE) + 1)
+        self.text += piece
+        if self.open_at < 0:
+            found = self.text.find(self.FENCE, start)
+            if found < 0:
+                return False
+            self.open_at = found
+            start = found + len(self.FENCE)
+        else:
+            start = max(start, self.open_at + len(self.FENCE))
+        return self.text.find(self.FENCE, start) >= 0
+
+
+async def collect(stream: AsyncIterator[Any], text_of: Callable[[Any], str],
+                  on_token: Optional[Callable[[str], Awaitable[None]]] = None,
+                  stop: Optional[Callable[[str], bool]] = None) -> str:
+    """
+    Concatène un stream Ollama; on_token reçoit chaque fragment, et dès que stop(fragment)
+    est vrai le stream est fermé (la requête HTTP est abandonnée, Ollama arrête le décodage).
+    """
+    parts = []
+    try:
+        async for chunk in stream:
+            piece = text_of(chunk)
+            if not piece:
+                continue
+            parts.append(piece)
+            if on_token is not None:
+                await on_token(piece)
+            if stop is not None and stop(piece):
+                log.debug("✂️ Stop condition met, closing generation stream")
+                break
+    finally:
+        await stream.aclose()
+    return "".join(parts).strip()
+
+
+class PrioritySemaphore:
+    """Sémaphore asyncio dont les attentes sont servies par priorité croissante (FIFO à égalité)"""
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters: List = []
+        self._seq = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    async def acquire(self, priority: float = 0.0):
+        if self._value > 0 and not self.waiting:
+            self._value -= 1
+            return
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            # Slot accordé juste avant l'annulation: le rendre au suivant
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(True)
+                return
+        self._value += 1
+
+
+class OllamaPool:
+    """Client Ollama unique + limites de concurrence par modèle et globale"""
+
+    def __init__(self, base_url: Optional[str] = None, max_concurrency: Optional[int] = None,
+                 model_concurrency: Optional[str] = None, cache: Optional[LLMCache] = None,
+                 keep_alive: Optional[str] = None):
+        import httpx
+        import ollama
+
+        self.base_url = base_url or OLLAMA_BASE_URL
+        self.client = ollama.AsyncClient(
+            host=self.base_url,
+            limits=httpx.Limits(
+                max_connections=None,
+                max_keepalive_connections=OLLAMA_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        self.max_concurrency = max_concurrency or OLLAMA_MAX_CONCURRENCY
+        self.default_model_limit, self.model_limits = parse_model_limits(
+            OLLAMA_MODEL_CONCURRENCY if model_concurrency is None else model_concurrency
+        )
+        self._global = PrioritySemaphore(self.max_concurrency)
+        self._models: Dict[str, PrioritySemaphore] = {}
+        self.in_flight: Dict[str, int] = {}
+        self.cache = cache or shared_llm_cache()
+        self.keep_alive = parse_keep_alive(OLLAMA_KEEP_ALIVE if keep_alive is None else keep_alive)
+        # modèle → "warming" / "ready" / "failed"
+        self.warmup: Dict[str, str] = {}
+        log.info(f"🔌 Ollama pool @ {self.base_url} (max {self.max_concurrency} concurrent calls)")
+
+    def _model_slots(self, model: str) -> PrioritySemaphore:
+        if model not in self._models:
+            self._models[model] = PrioritySemaphore(self.model_limits.get(model, self.default_model_limit))
+        return self._models[model]
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: Optional[float] = None):
+        """Réserve un slot du modèle puis un slot global (jamais un slot global en attendant le modèle)"""
+        priority = model_priority(model) if priority is None else priority
+        model_slots = self._model_slots(model)
+        await model_slots.acquire(priority)
+        try:
+            await self._global.acquire(priority)
+            try:
+                self.in_flight[model] = self.in_flight.get(model, 0) + 1
+                yield
+            finally:
+                self.in_flight[model] -= 1
+                self._global.release()
+        finally:
+            model_slots.release()
+
+    async def cached(self, model: str, request: Dict[str, Any], options: Dict[str, Any],
+                     compute: Callable[[], Awaitable[str]],
+                     on_token: Optional[Callable[[str], Awaitable[None]]] = None,
+                     cache: Optional[bool] = None) -> str:
+        """
+        Réponse en cache pour (modèle, requête, options), sinon compute() puis mise en cache.
+        Un hit est transmis à on_token en un seul fragment. Les exceptions de compute
+        (Ollama injoignable...) remontent sans rien mettre en cache.
+        """
+        key = llm_cache_key(model, request, options) if self.cache.accepts(options, cache) else None
+        if key is not None:
+            text = await asyncio.to_thread(self.cache.get, key)
+            if text is not None:
+                if on_token is not None:
+                    await on_token(text)
+                return text
+
+        text = await compute()
+        if key is not None and text:
+            await asyncio.to_thread(self.cache.put, key, model, text)
+        return text
+
+    async def generate(self, model: str, prompt: str, options: Dict[str, Any],
+                       priority: Optional[float] = None, **kwargs):
+        async with self.slot(model, priority):
+            return await self.client.generate(model=model, prompt=prompt, options=options,
+                                              keep_alive=self.keep_alive, **kwargs)
+
+    async def chat(self, model: str, messages: List[Dict[str, str]], options: Dict[str, Any],
+                   priority: Optional[float] = None, **kwargs):
+        async with self.slot(model, priority):
+            return await self.client.chat(model=model, messages=messages, options=options,
+                                          keep_alive=self.keep_alive, **kwargs)
+
+    async def stream_chat(self, model: str, messages: List[Dict[str, str]], options: Dict[str, Any],
+                          priority: Optional[float] = None, **kwargs) -> AsyncIterator[Any]:
+        """Chat en streaming: le slot est tenu jusqu'à la fin (ou l'abandon) de l'itération"""
+        async with self.slot(model, priority):
+            stream = await self.client.chat(model=model, messages=messages, options=options, stream=True,
+                                            keep_alive=self.keep_alive, **kwargs)
+            try:
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                await stream.aclose()
+
+    async def stream_generate(self, model: str, prompt: str, options: Dict[str, Any],
+                              priority: Optional[float] = None, **kwargs) -> AsyncIterator[Any]:
+        """Génération en streaming (même contrat que stream_chat)"""
+        async with self.slot(model, priority):
+            stream = await self.client.generate(model=model, prompt=prompt, options=options, stream=True,
+                                                keep_alive=self.keep_alive, **kwargs)
+            try:
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                await stream.aclose()
+
+    async def warm_up(self, models: List[str]) -> Dict[str, str]:
+        """
+        Charge les modèles en parallèle (requête d'un token, hors file d'attente et hors cache)
+        et les épingle avec keep_alive. Un échec n'empêche pas le serveur de démarrer.
+        """
+        async def one(model: str):
+            self.warmup[model] = "warming"
+            start = time.perf_counter()
+            try:
+                await self.client.generate(model=model, prompt="ok", options={"num_predict": 1},
+                                           keep_alive=self.keep_alive)
+                self.warmup[model] = "ready"
+                log.info(f"🔥 {model} warm in {time.perf_counter() - start:.1f}s")
+            except Exception as e:
+                self.warmup[model] = "failed"
+                log.warning(f"⚠️ Warm-up of {model} failed: {e}")
+
+        await asyncio.gather(*(one(m) for m in dict.fromkeys(models)))
+        return dict(self.warmup)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "max_concurrency": self.max_concurrency,
+            "waiting": self._global.waiting + sum(s.waiting for s in self._models.values()),
+            "in_flight": {m: n for m, n in self.in_flight.items() if n},
+        }
+
+
+_pools: Dict[str, OllamaPool] = {}
+
+
+def get_pool(base_url: Optional[str] = None) -> OllamaPool:
+    """Pool partagé du processus pour un serveur Ollama (créé au premier appel)"""
+    base_url = base_url or OLLAMA_BASE_URL
+    if base_url not in _pools:
+        _pools[base_url] = OllamaPool(base_url)
+    return _pools[base_url]
+
+
+__all__ = ["OllamaPool", "PrioritySemaphore", "JsonClosed", "FenceClosed", "collect",
+           "get_pool", "model_priority", "parse_keep_alive", "parse_model_limits"]
@@ -1,17 +1,23 @@
 ﻿import os
 import json
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Dict, Any, Literal
 
+import numpy as np
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, FileResponse
 from pydantic import BaseModel
 
 from agents import AnalystAgent, GeneratorAgent, ValidatorAgent
 from multi_agent_system import OrchestratorAgent
+from job_store import JobStore, ARTIFACTS
+from llm_cache import shared_llm_cache
+from mesh_ops import encode_mesh, mesh_bounds
 
 # ========== CONFIGURATION ==========
 # Charger les variables d'environnement depuis .env
@@ -20,7 +26,22 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("cadamx")
 
-app = FastAPI(title="CadaMx API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Démarrage / arrêt du serveur: pré-chauffe le pool d'exécution et les modèles Ollama"""
+    global _warmup_task
+    await validator.start()
+    if OLLAMA_WARMUP:
+        # En tâche de fond: le serveur répond (503 sur /) pendant le chargement des modèles
+        _warmup_task = asyncio.create_task(_warm_up_models())
+    yield
+    if _warmup_task is not None and not _warmup_task.done():
+        _warmup_task.cancel()
+    await validator.close()
+
+
+app = FastAPI(title="CadaMx API", version="1.0.0", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -39,15 +60,29 @@ validator = ValidatorAgent()
 # Orchestrateur (coordonne les 9 agents: 3 existants + 6 nouveaux)
 orchestrator = OrchestratorAgent(analyst, generator, validator)
 
-# Stockage temporaire des derniers fichiers générés
-_last_stl_path: Optional[str] = None
-_last_step_path: Optional[str] = None
-_last_app_type: Optional[str] = None
+# Artefacts par job: output/<hash>/model.stl, model.step, code.py; métadonnées output/jobs/<job_id>.json
+OUTPUT_DIR = Path(__file__).parent / "output"
+job_store = JobStore(OUTPUT_DIR)
+
+# Intervalle (s) entre deux commentaires SSE de keep-alive
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+
+# Sentinelle de fin de flux
+_STREAM_END = object()
+
+# Enrichissements en cours (référence forte: survivent à la fermeture du stream)
+_background_tasks = set()
+
+# Pré-chargement des modèles Ollama au démarrage (readiness exposée sur /)
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1") == "1"
+_warmup_task: Optional[asyncio.Task] = None
 
 
 # ========== MODELS ==========
 class GenerateRequest(BaseModel):
     prompt: str
+    # "bypass": ignorer les caches (prompt / template) et régénérer
+    cache: Literal["use", "bypass"] = "use"
 
 
 # ========== HELPERS ==========
@@ -80,85 +115,180 @@ async def send_sse_event(event_type: str, data: dict) -> str:
 
 # ========== ENDPOINTS ==========
 
+def _llm_clients():
+    """Clients LLM des agents (modèles configurés)"""
+    return [
+        orchestrator.design_expert.llm,
+        orchestrator.self_healing.llm,
+        orchestrator.architect.client,
+        orchestrator.planner.client,
+        orchestrator.code_synthesizer.client,
+    ]
+
+
+def _llm_pools() -> Dict[Any, list]:
+    """Pool Ollama → modèles configurés (clients en mode fallback exclus)"""
+    pools: Dict[Any, list] = {}
+    for client in _llm_clients():
+        if not client.use_fallback:
+            model = getattr(client, "model_name", None) or client.model
+            pools.setdefault(client.pool, []).append(model)
+    return pools
+
+
+async def _warm_up_models():
+    """Charge tous les modèles configurés en parallèle (un token chacun) et les épingle (keep_alive)"""
+    pools = _llm_pools()
+    if not pools:
+        return
+    log.info(f"🔥 Warming up Ollama models: {sorted({m for models in pools.values() for m in models})}")
+    await asyncio.gather(*(pool.warm_up(models) for pool, models in pools.items()))
+
+
 @app.get("/")
-async def root():
-    """Health check"""
-    return {"status": "ok", "service": "CadaMx API"}
+async def root(response: Response):
+    """Health check + readiness: 503 tant que les modèles Ollama sont en cours de chargement"""
+    models = {}
+    for pool in _llm_pools():
+        models.update(pool.warmup)
+
+    warming = _warmup_task is not None and not _warmup_task.done()
+    if warming:
+        response.status_code = 503
+        status = "warming"
+    elif "failed" in models.values():
+        status = "degraded"
+    else:
+        status = "ok"
+    return {"status": status, "service": "CadaMx API", "ready": not warming, "models": models}
 
 
 @app.post("/api/generate")
-async def generate_endpoint(request: GenerateRequest):
+async def generate_endpoint(request: GenerateRequest, http_request: Request):
     """
     Endpoint principal de génération avec streaming SSE.
     
     Flux d'événements:
     1. type: "status" - Mises à jour de progression
-    2. type: "code" - Code Python généré (peut être échappé)
-    3. type: "complete" - Résultat final avec mesh, analysis, etc.
-    4. type: "error" - En cas d'erreur
+    2. type: "code_delta" - Fragments du code en cours de synthèse (chemin CoT)
+    3. type: "code" - Code Python généré (peut être échappé)
+    4. type: "complete" - Résultat final: mesh_url (mesh.bin), analysis, etc.
+    5. type: "design_notes" - Commentaire LLM du design, après complete (si design_notes_pending)
+    6. type: "error" - En cas d'erreur
     """
     
-    global _last_stl_path, _last_step_path, _last_app_type
-    
+    job_id = job_store.new_job()
+
     async def event_stream():
+        # File d'événements alimentée par le workflow au fil de l'eau
+        queue: asyncio.Queue = asyncio.Queue()
+
+        # Callback pour envoyer les événements de progression
+        async def progress_callback(event_type: str, data: dict):
+            if event_type == "code":
+                # Échapper le code pour JSON
+                data["code"] = escape_for_json(data.get("code", ""))
+            queue.put_nowait(await send_sse_event(event_type, data))
+
+        # Commentaire LLM du design: livré par l'orchestrateur après le résultat (None si échec)
+        design_notes: asyncio.Future = asyncio.get_running_loop().create_future()
+
+        async def on_design_notes(notes: Optional[str]):
+            if not design_notes.done():
+                design_notes.set_result(notes)
+
+        log.info(f"🚀 Starting multi-agent workflow (job {job_id}) for prompt: {request.prompt[:100]}...")
+        yield await send_sse_event("job", {"job_id": job_id})
+
+        # Exécuter le workflow orchestré en tâche de fond
+        workflow = asyncio.create_task(
+            orchestrator.execute_workflow(request.prompt, progress_callback=progress_callback, cache=request.cache,
+                                          on_design_notes=on_design_notes)
+        )
+        workflow.add_done_callback(lambda _: queue.put_nowait(_STREAM_END))
+
+        next_event = None
+
         try:
-            log.info(f"🚀 Starting multi-agent workflow for prompt: {request.prompt[:100]}...")
-
-            # Liste pour collecter les événements de progression
-            progress_events = []
-
-            # Callback pour envoyer les événements de progression
-            async def progress_callback(event_type: str, data: dict):
-                if event_type == "code":
-                    # Échapper le code pour JSON
-                    data["code"] = escape_for_json(data.get("code", ""))
-                event = await send_sse_event(event_type, data)
-                progress_events.append(event)
-
-            # Exécuter le workflow orchestré avec les 9 agents
-            result = await orchestrator.execute_workflow(
-                request.prompt,
-                progress_callback=progress_callback
-            )
-
-            # Envoyer tous les événements de progression
-            for event in progress_events:
+            # Relayer chaque événement dès qu'il est produit
+            while True:
+                if next_event is None:
+                    next_event = asyncio.ensure_future(queue.get())
+
+                done, _ = await asyncio.wait({next_event}, timeout=SSE_HEARTBEAT_INTERVAL)
+                if not done:
+                    if await http_request.is_disconnected():
+                        log.info("🔌 Client disconnected, stopping stream")
+                        return
+                    # Commentaire SSE: garde la connexion ouverte derrière les load balancers
+                    yield ": heartbeat\n\n"
+                    continue
+
+                event = next_event.result()
+                next_event = None
+                if event is _STREAM_END:
+                    break
                 yield event
 
+            result = workflow.result()
+
             if result["success"]:
-                # Succès - stocker les paths
-                _last_stl_path = result.get("stl_path")
-                _last_step_path = result.get("step_path")
-                _last_app_type = result.get("app_type", "model")
+                # Succès - ranger les artefacts du job
+                meta = await asyncio.to_thread(_store_job, job_id, result)
 
-                log.info(f"✅ Multi-agent generation successful!")
-                if _last_stl_path:
-                    log.info(f"  STL: {_last_stl_path}")
-                if _last_step_path:
-                    log.info(f"  STEP: {_last_step_path}")
+                log.info(f"✅ Multi-agent generation successful! (job {job_id})")
+                log.info(f"  Artifacts: {OUTPUT_DIR / meta['hash']}")
 
                 # Envoyer résultat final
                 response_data = {
                     "success": True,
-                    "mesh": result.get("mesh"),
+                    "job_id": job_id,
                     "analysis": result.get("analysis"),
                     "code": result.get("code"),  # Code non échappé pour le résultat final
                     "app_type": result.get("app_type"),
                     "progress": 100
                 }
 
-                # Ajouter les paths si disponibles
-                if _last_stl_path:
-                    response_data["stl_path"] = _last_stl_path
-                if _last_step_path:
-                    response_data["step_path"] = _last_step_path
+                # Ajouter les URLs des artefacts disponibles
+                for kind in ("stl", "step", "code"):
+                    if kind in meta["files"]:
+                        response_data[f"{kind}_url"] = f"/api/jobs/{job_id}/{kind}"
+
+                # Mesh d'aperçu: téléchargé en binaire par le viewer (plus de floats JSON dans le SSE)
+                if "mesh" in meta["files"]:
+                    response_data["mesh_url"] = f"/api/jobs/{job_id}/mesh.bin"
+                    response_data["mesh_bounds"] = meta["mesh_bounds"]
 
                 # Ajouter les métadonnées du système multi-agent
                 if "metadata" in result:
                     response_data["metadata"] = result["metadata"]
 
+                # Commentaire LLM du design encore en cours: livré après coup
+                notes_pending = bool(result.get("design_notes_pending"))
+                if notes_pending:
+                    response_data["design_notes_pending"] = True
+
                 yield await send_sse_event("complete", response_data)
 
+                if notes_pending:
+                    # Rattaché au job même si le client se déconnecte avant la fin
+                    attach = asyncio.create_task(_attach_design_notes(job_id, design_notes))
+                    _background_tasks.add(attach)
+                    attach.add_done_callback(_background_tasks.discard)
+
+                    while not attach.done():
+                        await asyncio.wait({attach}, timeout=SSE_HEARTBEAT_INTERVAL)
+                        if attach.done():
+                            break
+                        if await http_request.is_disconnected():
+                            log.info("🔌 Client disconnected, design notes will be attached to the job")
+                            return
+                        yield ": heartbeat\n\n"
+
+                    notes = attach.result()
+                    if notes:
+                        yield await send_sse_event("design_notes", {"job_id": job_id, "notes": notes})
+
             else:
                 # Erreur - les agents ont géré l'erreur
                 errors = result.get("errors", ["Unknown error"])
@@ -179,6 +309,14 @@ async def generate_endpoint(request: GenerateRequest):
                 "errors": [str(e)],
                 "progress": 0
             })
+
+        finally:
+            if next_event is not None:
+                next_event.cancel()
+            # Client parti (ou stream fermé): ne pas laisser tourner le workflow
+            if not workflow.done():
+                log.info("🛑 Cancelling workflow (client disconnected)")
+                workflow.cancel()
     
     return StreamingResponse(
         event_stream(),
@@ -192,63 +330,121 @@ async def generate_endpoint(request: GenerateRequest):
     )
 
 
-@app.get("/api/export/stl")
-async def export_stl():
-    """Télécharge le dernier fichier STL généré"""
-    from pathlib import Path
-    
-    # Utiliser le chemin du dernier fichier généré
-    if _last_stl_path and os.path.exists(_last_stl_path):
-        stl_file = Path(_last_stl_path)
-    else:
-        # Fallback: chercher le fichier le plus récent
-        output_dir = Path(__file__).parent / "output"
-        stl_files = sorted(
-            output_dir.glob("generated_*.stl"),
-            key=lambda p: p.stat().st_mtime,
-            reverse=True
-        )
-        
-        if stl_files:
-            stl_file = stl_files[0]
-        else:
-            raise HTTPException(status_code=404, detail="No STL file available")
-    
-    # Déterminer le nom du fichier basé sur le type
-    filename = f"{_last_app_type or 'model'}_generated.stl"
-    
+def _store_job(job_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Range les artefacts d'un job réussi (+ mesh d'aperçu binaire)"""
+    mesh_bin, bounds = result.get("mesh_bin"), result.get("mesh_bounds")
+    mesh = result.get("mesh")
+    if mesh_bin is None and mesh:
+        vertices = np.asarray(mesh["vertices"], dtype=np.float32).reshape(-1, 3)
+        faces = np.asarray(mesh["faces"], dtype=np.uint32).reshape(-1, 3)
+        mesh_bin = encode_mesh(vertices, faces)
+        bounds = mesh_bounds(vertices)
+
+    meta = job_store.save(
+        job_id,
+        result.get("code") or "",
+        stl_path=result.get("stl_path"),
+        step_path=result.get("step_path"),
+        app_type=result.get("app_type") or "model",
+        metadata=result.get("metadata"),
+        mesh_bin=mesh_bin,
+    )
+    meta["mesh_bounds"] = bounds
+    return meta
+
+
+async def _attach_design_notes(job_id: str, design_notes: "asyncio.Future") -> Optional[str]:
+    """Attend le commentaire LLM du design (délai borné par l'orchestrateur) et l'ajoute aux métadonnées du job"""
+    notes = await design_notes
+    if notes:
+        await asyncio.to_thread(job_store.update_meta, job_id, {"design_notes": notes})
+        log.info(f"📝 Design notes attached to job {job_id}")
+    return notes
+
+
+def _artifact_response(job_id: str, kind: str) -> FileResponse:
+    """Construit la réponse fichier pour un artefact de job"""
+    path = job_store.artifact_path(job_id, kind)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No {kind.upper()} file available for job {job_id}")
+
+    meta = job_store.get_meta(job_id) or {}
+    suffix = {"stl": "stl", "step": "step", "code": "py"}[kind]
+    filename = f"{meta.get('app_type') or 'model'}_generated.{suffix}"
+
     return FileResponse(
-        str(stl_file),
-        media_type="application/octet-stream",
+        str(path),
+        media_type=ARTIFACTS[kind][1],
         filename=filename
     )
 
 
-@app.get("/api/export/step")
-async def export_step():
-    """Télécharge le dernier fichier STEP généré"""
-    if not _last_step_path or not os.path.exists(_last_step_path):
-        raise HTTPException(status_code=404, detail="No STEP file available")
-    
-    filename = f"{_last_app_type or 'model'}_generated.step"
-    
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Métadonnées d'un job (jobs/<job_id>.json)"""
+    meta = job_store.get_meta(job_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return meta
+
+
+@app.get("/api/jobs/{job_id}/mesh.bin")
+async def get_job_mesh(job_id: str):
+    """
+    Mesh d'aperçu binaire (mesh_ops.encode_mesh), stocké déjà compressé:
+    le navigateur décompresse (Content-Encoding: gzip) et lit un ArrayBuffer.
+    """
+    path = job_store.artifact_path(job_id, "mesh")
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No preview mesh available for job {job_id}")
     return FileResponse(
-        _last_step_path,
-        media_type="application/octet-stream",
-        filename=filename
+        str(path),
+        media_type=ARTIFACTS["mesh"][1],
+        headers={"Content-Encoding": "gzip", "Cache-Control": "public, max-age=31536000, immutable"},
     )
 
 
+@app.get("/api/jobs/{job_id}/{kind}")
+async def get_job_artifact(job_id: str, kind: str):
+    """Télécharge un artefact d'un job: stl, step ou code"""
+    if kind not in ("stl", "step", "code"):
+        raise HTTPException(status_code=404, detail=f"Unknown artifact '{kind}'")
+    return _artifact_response(job_id, kind)
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Compteurs des caches (hits / misses / évictions)"""
+    return {
+        "prompts": orchestrator.prompt_cache.stats(),
+        "templates": orchestrator.template_cache.stats(),
+        "plans": orchestrator.plan_cache.stats(),
+        "llm": shared_llm_cache().stats(),
+    }
+
+
+@app.get("/api/export/stl")
+async def export_stl(job_id: Optional[str] = None):
+    """Télécharge le STL d'un job (job_id obligatoire: pas de repli sur le job d'un autre client)"""
+    if not job_id:
+        raise HTTPException(status_code=400, detail="job_id query parameter is required")
+    return _artifact_response(job_id, "stl")
+
+
+@app.get("/api/export/step")
+async def export_step(job_id: Optional[str] = None):
+    """Télécharge le STEP d'un job (job_id obligatoire: pas de repli sur le job d'un autre client)"""
+    if not job_id:
+        raise HTTPException(status_code=400, detail="job_id query parameter is required")
+    return _artifact_response(job_id, "step")
+
+
 # ========== MAIN ==========
 if __name__ == "__main__":
     import uvicorn
     
-    # Créer le dossier output si nécessaire
-    output_dir = Path(__file__).parent / "output"
-    output_dir.mkdir(exist_ok=True)
-    
     log.info("Starting CadaMx API server...")
-    log.info("Output directory: " + str(output_dir))
+    log.info("Output directory: " + str(OUTPUT_DIR))
     
     uvicorn.run(
         "main:app",
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Opérations de maillage vectorisées (NumPy) pour l'aperçu du viewer.
+- weld_vertices : fusion des sommets identiques → maillage indexé
+- cluster_decimate : simplification par regroupement de sommets sur une grille
+  de voxels, position de chaque cluster par minimisation des quadriques d'erreur
+  (Lindstrom 2000), avec un budget de triangles
+- encode_mesh / decode_mesh : format binaire du viewer (mesh.bin)
+"""
+
+import os
+import gzip
+import struct
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+log = logging.getLogger("cadamx.mesh_ops")
+
+# Tolérance de fusion des sommets (unités du modèle, mm). 0 = fusion exacte uniquement
+MESH_WELD_TOLERANCE = float(os.getenv("MESH_WELD_TOLERANCE", "1e-4"))
+
+# Budget de triangles du mesh d'aperçu envoyé au viewer
+MESH_PREVIEW_MAX_TRIANGLES = int(os.getenv("MESH_PREVIEW_MAX_TRIANGLES", "20000"))
+
+
+def _unique_rows(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """np.unique(axis=0) rapide: chaque ligne vue comme un seul scalaire opaque"""
+    keys = np.ascontiguousarray(keys)
+    rows = keys.view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    return first, inverse.ravel()
+
+
+def weld_vertices(triangles: np.ndarray, tolerance: Optional[float] = None,
+                  drop_degenerate: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fusionne les sommets partagés d'une soupe de triangles.
+
+    Args:
+        triangles: (n, 3, 3) sommets par triangle
+        tolerance: pas de quantification (défaut MESH_WELD_TOLERANCE)
+        drop_degenerate: supprime les triangles dont deux sommets ont fusionné
+
+    Returns:
+        vertices: (m, 3) float32 - sommets uniques
+        indices:  (k, 3) uint32  - triangles indexés
+    """
+    tolerance = MESH_WELD_TOLERANCE if tolerance is None else tolerance
+    points = np.asarray(triangles, dtype=np.float32).reshape(-1, 3)
+    if len(points) == 0:
+        return np.zeros((0, 3), np.float32), np.zeros((0, 3), np.uint32)
+
+    if tolerance > 0:
+        keys = np.floor(points.astype(np.float64) / tolerance + 0.5).astype(np.int64)
+    else:
+        keys = points + np.float32(0.0)  # -0.0 → 0.0 pour la comparaison binaire
+
+    first, inverse = _unique_rows(keys)
+    vertices = points[first]
+    indices = inverse.astype(np.uint32).reshape(-1, 3)
+
+    if drop_degenerate:
+        a, b, c = indices.T
+        indices = indices[(a != b) & (b != c) & (a != c)]
+
+    return vertices, indices
+
+
+def _cluster(vertices: np.ndarray, origin: np.ndarray, cell: float) -> Tuple[np.ndarray, int]:
+    """Identifiant de cellule de chaque sommet (compacté 0..k-1) et nombre de cellules"""
+    keys = np.floor((vertices - origin) / cell).astype(np.int64)
+    # Coordonnées de grille bornées (≤ 4096): une seule clé int64, tri bien plus rapide
+    side = int(keys.max()) + 1
+    packed = (keys[:, 0] * side + keys[:, 1]) * side + keys[:, 2]
+    uniq, inverse = np.unique(packed, return_inverse=True)
+    return inverse.ravel(), len(uniq)
+
+
+def _collapse_faces(indices: np.ndarray, cluster_ids: np.ndarray) -> np.ndarray:
+    """Remappe les triangles sur les clusters, retire dégénérés et doublons"""
+    faces = cluster_ids[indices]
+    a, b, c = faces.T
+    faces = faces[(a != b) & (b != c) & (a != c)]
+    if len(faces) == 0:
+        return faces
+    ordered = np.sort(faces, axis=1)
+    n = int(ordered.max()) + 1
+    if n < (1 << 21):
+        _, keep = np.unique((ordered[:, 0] * n + ordered[:, 1]) * n + ordered[:, 2], return_index=True)
+    else:
+        keep, _ = _unique_rows(ordered)
+    return faces[np.sort(keep)]
+
+
+def _quadric_positions(vertices: np.ndarray, indices: np.ndarray,
+                       cluster_ids: np.ndarray, n_clusters: int, cell: float) -> np.ndarray:
+    """
+    Position optimale de chaque cluster: minimise la somme des distances au carré
+    aux plans des faces d'origine (quadriques pondérées par l'aire).
+    Les directions mal conditionnées (zones plates, arêtes) retombent sur la moyenne,
+    et un déplacement de plus d'une cellule est rejeté.
+    """
+    tri = vertices[indices].astype(np.float64)
+    cross = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    area = np.linalg.norm(cross, axis=1)
+    normal = cross / np.maximum(area, 1e-30)[:, None]
+    offset = -np.einsum("ij,ij->i", normal, tri[:, 0])
+
+    # Quadrique par face: A = w n nᵀ, b = w d n (aire comme poids)
+    A_face = area[:, None, None] * normal[:, :, None] * normal[:, None, :]
+    b_face = (area * offset)[:, None] * normal
+
+    # Somme par cluster (chaque face compte pour ses 3 coins): bincount par coefficient
+    owners = cluster_ids[indices]
+    weights = np.concatenate([A_face.reshape(-1, 9), b_face], axis=1)
+    totals = np.stack([
+        sum(np.bincount(owners[:, corner], weights=weights[:, col], minlength=n_clusters)
+            for corner in range(3))
+        for col in range(12)
+    ], axis=1)
+    A = totals[:, :9].reshape(-1, 3, 3)
+    b = totals[:, 9:]
+
+    counts = np.bincount(cluster_ids, minlength=n_clusters).astype(np.float64)
+    mean = np.stack([np.bincount(cluster_ids, weights=vertices[:, k].astype(np.float64),
+                                 minlength=n_clusters) for k in range(3)], axis=1)
+    mean /= np.maximum(counts, 1)[:, None]
+
+    # x = moyenne + pinv(A) (-b - A·moyenne), valeurs singulières relatives < 1e-3 ignorées
+    U, S, Vt = np.linalg.svd(A)
+    S_inv = np.where(S > 1e-3 * S[:, :1], 1.0 / np.maximum(S, 1e-30), 0.0)
+    residual = -b - np.einsum("kij,kj->ki", A, mean)
+    delta = np.einsum("kij,ki,kli,kl->kj", Vt, S_inv, U, residual)
+    delta[np.linalg.norm(delta, axis=1) > cell] = 0.0
+    return (mean + delta).astype(np.float32)
+
+
+def cluster_decimate(vertices: np.ndarray, indices: np.ndarray,
+                     max_triangles: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simplifie un maillage indexé sous un budget de triangles.
+
+    La grille de voxels la plus fine qui respecte le budget est trouvée par
+    dichotomie; chaque voxel devient un sommet. Les triangles restent connectés
+    entre clusters voisins: pas de trous comme avec un sous-échantillonnage
+    des triangles.
+
+    Le résultat n'est pas garanti manifold: une paroi plus fine qu'un voxel
+    s'écrase en arêtes partagées par plus de deux faces, et la suppression des
+    faces doublées peut laisser des faces pendantes. Réservé à l'aperçu
+    (l'export STL garde le maillage d'origine).
+
+    Returns:
+        (vertices (m, 3) float32, indices (k, 3) uint32)
+    """
+    max_triangles = max_triangles or MESH_PREVIEW_MAX_TRIANGLES
+    vertices = np.asarray(vertices, dtype=np.float32)
+    indices = np.asarray(indices).reshape(-1, 3)
+    if len(indices) <= max_triangles:
+        return vertices, indices.astype(np.uint32)
+
+    origin = vertices.min(axis=0)
+    extent = float((vertices.max(axis=0) - origin).max()) or 1.0
+
+    def attempt(resolution):
+        cluster_ids, n_clusters = _cluster(vertices, origin, extent / resolution)
+        return cluster_ids, n_clusters, _collapse_faces(indices, cluster_ids)
+
+    # Résolution (cellules sur le plus grand axe): croissance exponentielle puis dichotomie
+    lo, best = 1, attempt(1)
+    hi = 2
+    while hi <= 4096:
+        result = attempt(hi)
+        if len(result[2]) > max_triangles:
+            break
+        lo, best = hi, result
+        hi *= 2
+
+    while hi - lo > 1 and hi <= 4096:
+        mid = (lo + hi) // 2
+        result = attempt(mid)
+        if len(result[2]) <= max_triangles:
+            lo, best = mid, result
+        else:
+            hi = mid
+
+    cluster_ids, n_clusters, faces = best
+    positions = _quadric_positions(vertices, indices, cluster_ids, n_clusters, extent / lo)
+
+    # Ne garder que les clusters référencés
+    used, remap = np.unique(faces, return_inverse=True)
+    log.info(f"🔻 Decimated {len(indices):,} → {len(faces):,} triangles (grid {lo} cells)")
+    return positions[used], remap.reshape(-1, 3).astype(np.uint32)
+
+
+# ========== TRANSPORT BINAIRE ==========
+# En-tête (little-endian, 40 octets): magic, version, flags, nb sommets, nb triangles,
+# bounds (min xyz, max xyz). Suivi de float32[nb_sommets*3] puis uint32[nb_triangles*3].
+# 40 octets: les positions et les index restent alignés sur 4 pour les TypedArray JS.
+MESH_MAGIC = b"CMSH"
+MESH_VERSION = 1
+_MESH_HEADER = struct.Struct("<4sHHII6f")
+
+
+def mesh_bounds(vertices: np.ndarray) -> Dict[str, List[float]]:
+    """Boîte englobante {min: [x, y, z], max: [x, y, z]}"""
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    if len(vertices) == 0:
+        return {"min": [0.0, 0.0, 0.0], "max": [0.0, 0.0, 0.0]}
+    return {"min": vertices.min(axis=0).tolist(), "max": vertices.max(axis=0).tolist()}
+
+
+def encode_mesh(vertices: np.ndarray, indices: np.ndarray, compress: bool = True) -> bytes:
+    """Sérialise un maillage indexé au format mesh.bin (gzip si compress=True)"""
+    vertices = np.ascontiguousarray(vertices, dtype="<f4").reshape(-1, 3)
+    indices = np.ascontiguousarray(indices, dtype="<u4").reshape(-1, 3)
+    bounds = mesh_bounds(vertices)
+
+    header = _MESH_HEADER.pack(MESH_MAGIC, MESH_VERSION, 0, len(vertices), len(indices),
+                               *bounds["min"], *bounds["max"])
+    payload = b"".join((header, vertices.tobytes(), indices.tobytes()))
+    return gzip.compress(payload, compresslevel=6) if compress else payload
+
+
+def decode_mesh(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Inverse de encode_mesh (accepte les données gzip ou brutes)"""
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    magic, version, _, n_vertices, n_triangles, *_ = _MESH_HEADER.unpack_from(data)
+    if magic != MESH_MAGIC or version != MESH_VERSION:
+        raise ValueError(f"Not a mesh.bin v{MESH_VERSION} payload")
+
+    offset = _MESH_HEADER.size
+    vertices = np.frombuffer(data, dtype="<f4", count=n_vertices * 3, offset=offset).reshape(-1, 3)
+    offset += vertices.nbytes
+    indices = np.frombuffer(data, dtype="<u4", count=n_triangles * 3, offset=offset).reshape(-1, 3)
+    return vertices, indices
+
+
+__all__ = [
+    "weld_vertices", "cluster_decimate", "encode_mesh", "decode_mesh", "mesh_bounds",
+    "MESH_WELD_TOLERANCE", "MESH_PREVIEW_MAX_TRIANGLES",
+]
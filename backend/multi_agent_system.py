@@ -10,14 +10,25 @@ import os
 import re
 import logging
 import asyncio
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, Callable, Set
 from dataclasses import dataclass
 from enum import Enum
 
 from cot_agents import ArchitectAgent, PlannerAgent, CodeSynthesizerAgent
+from llm_pool import FenceClosed, collect
+from template_cache import TemplateCache
+from prompt_cache import PromptCache
+from plan_cache import PlanCache
+from few_shot_index import shared_few_shot_index
 
 log = logging.getLogger("cadamx.multi_agent")
 
+# Commentaire LLM du DesignExpert: "background" (tâche de fond, event SSE design_notes),
+# "inline" (attendu dans la validation) ou "off"
+DESIGN_NOTES_MODE = os.getenv("DESIGN_NOTES_MODE", "background")
+# Délai max (s) du commentaire en tâche de fond
+DESIGN_NOTES_TIMEOUT = float(os.getenv("DESIGN_NOTES_TIMEOUT", "60"))
+
 
 class AgentStatus(Enum):
     """Status d'un agent (pending, running, success, failed, retry)"""
@@ -56,6 +67,9 @@ class WorkflowContext:
     errors: List[Dict[str, Any]] = None
     retry_count: int = 0
     max_retries: int = 3
+    # Origine du code: "template", "fast_path", "plan_cache" ou "llm" (chaîne CoT complète)
+    code_source: Optional[str] = None
+    plan_cache_key: Optional[str] = None
 
     def __post_init__(self):
         if self.errors is None:
@@ -73,8 +87,9 @@ class OllamaLLM:
         self.use_fallback = False
 
         try:
-            import ollama
-            self.client = ollama.AsyncClient(host=self.base_url)
+            from llm_pool import get_pool
+            # Client partagé (keep-alive + limites par modèle) entre tous les agents
+            self.pool = get_pool(self.base_url)
             log.info(f"✅ Ollama LLM initialized: {model_name} @ {self.base_url}")
         except ImportError:
             log.error("⚠️ Ollama package not installed, using fallback mode")
@@ -83,36 +98,57 @@ class OllamaLLM:
             log.warning(f"⚠️ Ollama connection failed: {e}, using fallback mode")
             self.use_fallback = True
 
-    async def generate(self, prompt: str, max_tokens: int = 512, temperature: float = 0.7) -> str:
-        """Génère une réponse avec le modèle LLM"""
+    async def generate(self, prompt: str, max_tokens: int = 512, temperature: float = 0.7,
+                       stop: Optional[Callable[[str], bool]] = None, cache: Optional[bool] = None) -> str:
+        """
+        Génère une réponse avec le modèle LLM.
+        Avec stop (JsonClosed, FenceClosed), la réponse est streamée et coupée dès que la condition est atteinte.
+        cache: None = cache LLM selon la température, True/False pour forcer.
+        """
 
         if self.use_fallback:
             return await self._fallback_generate(prompt)
 
+        options = {
+            "num_predict": max_tokens,
+            "temperature": temperature,
+            "top_p": 0.9,
+        }
+        request = {"prompt": prompt, "stop": type(stop).__name__ if stop else None}
+
         try:
-            import ollama
-
-            response = await self.client.generate(
-                model=self.model_name,
-                prompt=prompt,
-                options={
-                    "num_predict": max_tokens,
-                    "temperature": temperature,
-                    "top_p": 0.9,
-                }
+            return await self.pool.cached(
+                self.model_name, request, options,
+                lambda: self._complete(prompt, options, stop),
+                cache=cache,
             )
 
-            # Ollama retourne un dict avec 'response'
-            if isinstance(response, dict):
-                return response.get("response", "").strip()
-
-            return str(response).strip()
-
         except Exception as e:
             log.error(f"Ollama API call failed: {e}")
             log.warning("Falling back to heuristic mode")
             return await self._fallback_generate(prompt)
 
+    async def _complete(self, prompt: str, options: Dict[str, Any], stop: Optional[Callable[[str], bool]]) -> str:
+        """Appel Ollama effectif (streamé si stop)"""
+        if stop is not None:
+            return await collect(
+                self.pool.stream_generate(self.model_name, prompt, options),
+                lambda chunk: chunk["response"],
+                stop=stop,
+            )
+
+        response = await self.pool.generate(
+            model=self.model_name,
+            prompt=prompt,
+            options=options
+        )
+
+        # Ollama retourne un dict avec 'response'
+        if isinstance(response, dict):
+            return response.get("response", "").strip()
+
+        return str(response).strip()
+
     async def _fallback_generate(self, prompt: str) -> str:
         """Fallback basique basé sur des règles heuristiques"""
 
@@ -172,6 +208,17 @@ class OrchestratorAgent:
         self.planner = PlannerAgent()
         self.code_synthesizer = CodeSynthesizerAgent()
 
+        # Cache disque des résultats de templates (mêmes paramètres → mêmes artefacts)
+        self.template_cache = TemplateCache()
+        # Cache par prompt normalisé, devant tout le workflow
+        self.prompt_cache = PromptCache()
+        # Squelettes des programmes CoT réussis: même design, autres cotes
+        self.plan_cache = PlanCache()
+        # Exemples retrouvés par le Synthesizer: les programmes validés y sont ajoutés
+        self.few_shot_index = shared_few_shot_index()
+        # Commentaires LLM du design livrés après le résultat (référence forte jusqu'à la livraison)
+        self._notes_tasks: Set[asyncio.Task] = set()
+
         # Types connus supportés par templates
         self.known_types = {
             "splint", "stent", "lattice", "heatsink",
@@ -200,11 +247,50 @@ class OrchestratorAgent:
         log.info(f"⚡ Type '{app_type}' connu → Utilisation Template")
         return False
 
-    async def execute_workflow(self, prompt: str, progress_callback=None) -> Dict[str, Any]:
+    async def execute_workflow(self, prompt: str, progress_callback=None, cache: str = "use",
+                               on_design_notes=None) -> Dict[str, Any]:
+        """
+        Exécute le workflow complet, derrière le cache des prompts.
+
+        Args:
+            cache: "use" (défaut) ou "bypass" - ignore les caches en lecture
+                   et rafraîchit l'entrée avec le nouveau résultat
+            on_design_notes: async callback(notes) - commentaire LLM du design (mode "background"),
+                             appelé après le résultat (notes None si échec ou délai dépassé).
+                             Sans callback, le commentaire n'est pas calculé.
+        """
+        bypass = cache == "bypass"
+
+        if not bypass and self.prompt_cache.enabled:
+            cached = await asyncio.to_thread(self.prompt_cache.get, prompt)
+            if cached:
+                return await self._cached_response(cached, progress_callback, "prompt")
+
+        result = await self._run_workflow(prompt, progress_callback, use_template_cache=not bypass,
+                                          use_plan_cache=not bypass, on_design_notes=on_design_notes)
+
+        if result.get("success"):
+            metadata = result.setdefault("metadata", {})
+            metadata["cache"] = "bypass" if bypass else metadata.get("cache", "miss")
+
+        if result.get("success") and self.prompt_cache.enabled:
+            try:
+                entry = await asyncio.to_thread(self.prompt_cache.put, prompt, result)
+                if entry and result.get("mesh_bin") is None:
+                    result["mesh_bin"], result["mesh_bounds"] = entry["mesh_bin"], entry["mesh_bounds"]
+            except Exception as e:
+                log.warning(f"⚠️ Prompt cache write failed: {e}")
+
+        return result
+
+    async def _run_workflow(self, prompt: str, progress_callback=None, use_template_cache: bool = True,
+                            use_plan_cache: bool = True, on_design_notes=None) -> Dict[str, Any]:
         """
         Exécute le workflow complet avec gestion d'erreurs et retry
         """
         context = WorkflowContext(prompt=prompt)
+        phase_tasks = ()
+        notes_task = None
 
         try:
             # PHASE 1: Analyse (Agent existant)
@@ -223,130 +309,57 @@ class OrchestratorAgent:
 
             context.analysis = result.data
 
-            # PHASE 2: Design Expert - Validation des règles métier
+            # ROUTING: Template (types connus) vs Chain-of-Thought (formes universelles)
+            use_cot = self._should_use_cot(context.analysis)
+
+            # Template déjà exécuté avec exactement ces paramètres: rien à régénérer
+            template_key = None
+            if self.template_cache.enabled and not use_cot:
+                template_key = self.template_cache.key(context.analysis)
+                cached = await asyncio.to_thread(self.template_cache.get, template_key) if use_template_cache else None
+                if cached:
+                    return await self._cached_response(cached, progress_callback, "template")
+
+            # PHASES 2-4: petit graphe de dépendances. Le design (appel LLM) et les contraintes
+            # ne lisent que context.analysis: ils tournent en parallèle, et la génération
+            # démarre de façon spéculative sans les attendre. Le code généré n'est jeté que
+            # si les contraintes échouent; le design n'est attendu qu'à la fin du workflow.
             if progress_callback:
                 await progress_callback("status", {"message": "🎨 Validating design rules...", "progress": 20})
+                await progress_callback("status", {"message": "⚖️ Checking manufacturing constraints...", "progress": 30})
 
-            result = await self._execute_with_retry(
+            design_task = asyncio.create_task(self._execute_with_retry(
                 self.design_expert.validate_design,
                 context,
                 "Design Validation",
                 context.analysis
-            )
-
-            if result.status != AgentStatus.SUCCESS:
-                log.warning("⚠️ Design validation warnings, continuing...")
-
-            context.design_validation = result.data
-
-            # PHASE 3: Constraint Validator - Vérifier les contraintes
-            if progress_callback:
-                await progress_callback("status", {"message": "⚖️ Checking manufacturing constraints...", "progress": 30})
-
-            result = await self._execute_with_retry(
+            ))
+            constraint_task = asyncio.create_task(self._execute_with_retry(
                 self.constraint_validator.validate_constraints,
                 context,
                 "Constraint Validation",
                 context.analysis
+            ))
+            generation_task = asyncio.create_task(
+                self._generate_code(context, prompt, use_cot, progress_callback, use_plan_cache)
             )
+            phase_tasks = (design_task, constraint_task, generation_task)
+
+            # Commentaire LLM du design: enrichissement livré après le modèle (event design_notes)
+            if self.design_expert.notes_mode == "background" and on_design_notes is not None:
+                notes_task = asyncio.create_task(self.design_expert.design_notes(context.analysis))
+
+            result = await constraint_task
 
             if result.status != AgentStatus.SUCCESS:
+                generation_task.cancel()  # Génération spéculative jetée
                 return self._build_error_response(context, "Constraint validation failed")
 
             context.constraints_validation = result.data
 
-            # PHASE 4: Génération de code - ROUTING: Template vs Chain-of-Thought
-            use_cot = self._should_use_cot(context.analysis)
-
-            if use_cot:
-                # ========== CHAIN-OF-THOUGHT PATHWAY (Formes universelles) ==========
-                log.info("🧠 Using Chain-of-Thought agents for universal shape generation")
-
-                # PHASE 4a: Architect Agent - Raisonnement sur le design
-                if progress_callback:
-                    await progress_callback("status", {"message": "🏗️ Architect analyzing design...", "progress": 40})
-
-                try:
-                    design_analysis = await self.architect.analyze_design(prompt)
-                    log.info(f"🏗️ Architect: {design_analysis.description} (complexity: {design_analysis.complexity})")
-                except Exception as e:
-                    log.error(f"Architect failed: {e}")
-                    return self._build_error_response(context, f"Architect analysis failed: {e}")
-
-                # PHASE 4b: Planner Agent - Plan de construction
-                if progress_callback:
-                    await progress_callback("status", {"message": "📐 Planner creating construction plan...", "progress": 50})
-
-                try:
-                    construction_plan = await self.planner.create_plan(design_analysis, prompt)
-                    log.info(f"📐 Planner: {len(construction_plan.steps)} steps (complexity: {construction_plan.estimated_complexity})")
-                except Exception as e:
-                    log.error(f"Planner failed: {e}")
-                    return self._build_error_response(context, f"Planning failed: {e}")
-
-                # PHASE 4c: Code Synthesizer - Génération du code
-                if progress_callback:
-                    await progress_callback("status", {"message": "💻 Synthesizer generating code...", "progress": 60})
-
-                try:
-                    generated = await self.code_synthesizer.generate_code(construction_plan, design_analysis)
-                    code = generated.code
-                    detected_type = "cot_generated"  # Type spécial pour CoT
-                    log.info(f"💻 Synthesizer: Code generated (confidence: {generated.confidence:.2f})")
-                except Exception as e:
-                    log.error(f"Code synthesis failed: {e}")
-                    return self._build_error_response(context, f"Code synthesis failed: {e}")
-
-                # Clean emojis from generated code to avoid encoding issues
-                import re
-                emoji_pattern = re.compile("["
-                    u"\U0001F600-\U0001F64F"  # emoticons
-                    u"\U0001F300-\U0001F5FF"  # symbols & pictographs
-                    u"\U0001F680-\U0001F6FF"  # transport & map symbols
-                    u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
-                    u"\U00002702-\U000027B0"  # dingbats
-                    u"\U000024C2-\U0001F251"
-                    u"\u2705"  # ✅ check mark
-                    u"\u274C"  # ❌ cross mark
-                    "]+", flags=re.UNICODE)
-                code = emoji_pattern.sub('', code)
-
-                context.generated_code = code
-
-            else:
-                # ========== TEMPLATE PATHWAY (Types connus) ==========
-                log.info("⚡ Using template-based generation")
-
-                if progress_callback:
-                    await progress_callback("status", {"message": "💻 Generating code from template...", "progress": 45})
-
-                result = await self._execute_with_retry(
-                    self.generator.generate,
-                    context,
-                    "Code Generation (Template)",
-                    context.analysis
-                )
-
-                if result.status != AgentStatus.SUCCESS:
-                    return self._build_error_response(context, "Code generation failed")
-
-                code, detected_type = result.data
-
-                # Clean emojis from generated code to avoid encoding issues
-                import re
-                emoji_pattern = re.compile("["
-                    u"\U0001F600-\U0001F64F"  # emoticons
-                    u"\U0001F300-\U0001F5FF"  # symbols & pictographs
-                    u"\U0001F680-\U0001F6FF"  # transport & map symbols
-                    u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
-                    u"\U00002702-\U000027B0"  # dingbats
-                    u"\U000024C2-\U0001F251"
-                    u"\u2705"  # ✅ check mark
-                    u"\u274C"  # ❌ cross mark
-                    "]+", flags=re.UNICODE)
-                code = emoji_pattern.sub('', code)
-
-                context.generated_code = code
+            code, detected_type, generation_error = await generation_task
+            if generation_error:
+                return self._build_error_response(context, generation_error)
 
             # PHASE 5: Syntax Validator - Vérifier la syntaxe
             if progress_callback:
@@ -398,6 +411,11 @@ class OrchestratorAgent:
                 prompt
             )
 
+            # Programme reconstruit depuis le cache des plans: pas de healing, chaîne LLM complète
+            if critic_result.status != AgentStatus.SUCCESS and context.code_source == "plan_cache":
+                return await self._plan_cache_fallback(context, prompt, progress_callback, use_template_cache,
+                                                       on_design_notes)
+
             # Si le Critic détecte des problèmes sémantiques, tenter de corriger AVANT exécution
             if critic_result.status != AgentStatus.SUCCESS:
                 log.warning("🔍 Critic detected semantic issues - attempting to heal BEFORE execution")
@@ -459,6 +477,11 @@ class OrchestratorAgent:
                 detected_type
             )
 
+            if result.status != AgentStatus.SUCCESS and context.code_source == "plan_cache":
+                return await self._plan_cache_fallback(context, prompt, progress_callback, use_template_cache,
+                                                       on_design_notes)
+
+            executed_as_generated = result.status == AgentStatus.SUCCESS
             if result.status != AgentStatus.SUCCESS:
                 # Gestion d'erreur avancée
                 error_result = await self.error_handler.handle_error(
@@ -498,11 +521,17 @@ class OrchestratorAgent:
 
             context.execution_result = result.data
 
+            # Validation design (LLM) terminée en parallèle de la génération et de l'exécution
+            design_result = await design_task
+            if design_result.status != AgentStatus.SUCCESS:
+                log.warning("⚠️ Design validation warnings, continuing...")
+            context.design_validation = design_result.data
+
             # SUCCÈS!
             if progress_callback:
                 await progress_callback("status", {"message": "✅ Generation complete!", "progress": 100})
 
-            return {
+            response = {
                 "success": True,
                 "mesh": result.data.get("mesh"),
                 "analysis": result.data.get("analysis"),
@@ -514,14 +543,244 @@ class OrchestratorAgent:
                     "design_validation": context.design_validation,
                     "constraints_validation": context.constraints_validation,
                     "syntax_validation": context.syntax_validation,
-                    "retry_count": context.retry_count
+                    "retry_count": context.retry_count,
+                    "code_source": context.code_source
                 }
             }
 
+            # Programme de la chaîne LLM validé tel quel: squelette réutilisable pour d'autres cotes
+            # et exemple few-shot pour les prochaines synthèses
+            if (context.code_source == "llm" and executed_as_generated
+                    and critic_result.status == AgentStatus.SUCCESS):
+                try:
+                    await asyncio.to_thread(self.plan_cache.put, prompt, code)
+                except Exception as e:
+                    log.warning(f"⚠️ Plan cache write failed: {e}")
+                try:
+                    await asyncio.to_thread(self.few_shot_index.add_generation, prompt, code)
+                except Exception as e:
+                    log.warning(f"⚠️ Few-shot history write failed: {e}")
+
+            if notes_task is not None:
+                # Livré à l'appelant après le résultat (event design_notes de l'API)
+                delivery = asyncio.create_task(self._deliver_design_notes(notes_task, on_design_notes))
+                self._notes_tasks.add(delivery)
+                delivery.add_done_callback(self._notes_tasks.discard)
+                response["design_notes_pending"], notes_task = True, None
+
+            if template_key and not use_cot:
+                response["metadata"]["cache"] = "miss"
+                try:
+                    entry = await asyncio.to_thread(
+                        self.template_cache.put, template_key, code, detected_type,
+                        response["stl_path"], response["step_path"], response["mesh"],
+                        {"analysis": response["analysis"], "workflow": response["metadata"]},
+                    )
+                    if entry:
+                        # mesh.bin déjà encodé par le cache: l'API le réutilise tel quel
+                        response["mesh_bin"] = entry["mesh_bin"]
+                        response["mesh_bounds"] = entry["mesh_bounds"]
+                except Exception as e:
+                    log.warning(f"⚠️ Template cache write failed: {e}")
+
+            return response
+
         except Exception as e:
             log.error(f"❌ Orchestrator workflow failed: {e}", exc_info=True)
             return self._build_error_response(context, str(e))
 
+        finally:
+            for task in (*phase_tasks, notes_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def _deliver_design_notes(self, task: "asyncio.Task", callback):
+        """Attend le commentaire LLM du design (au plus DESIGN_NOTES_TIMEOUT) et le passe au callback"""
+        try:
+            notes = await asyncio.wait_for(task, timeout=DESIGN_NOTES_TIMEOUT)
+        except asyncio.TimeoutError:
+            log.warning(f"⏱️ Design notes timed out after {DESIGN_NOTES_TIMEOUT:.0f}s")
+            notes = None
+        except Exception as e:
+            log.warning(f"⚠️ Design notes failed: {e}")
+            notes = None
+
+        try:
+            await callback(notes)
+        except Exception as e:
+            log.warning(f"⚠️ Design notes callback failed: {e}")
+
+    async def _generate_code(self, context: WorkflowContext, prompt: str, use_cot: bool,
+                             progress_callback=None, use_plan_cache: bool = True
+                             ) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """
+        PHASE 4: Génération de code - Template ou Chain-of-Thought.
+        Lancée en parallèle des validations (ne dépend que de context.analysis).
+
+        Returns:
+            (code, detected_type, None) ou (None, None, message d'erreur)
+        """
+        if use_cot:
+            # ========== CHAIN-OF-THOUGHT PATHWAY (Formes universelles) ==========
+            log.info("🧠 Using Chain-of-Thought agents for universal shape generation")
+
+            # Forme simple entièrement cotée: code déterministe, pas d'appel LLM
+            generated = self.code_synthesizer.fast_path(prompt)
+            planned = None
+            if generated is None and use_plan_cache and self.plan_cache.enabled:
+                # Même design déjà synthétisé avec d'autres cotes: programme reconstruit
+                planned = await asyncio.to_thread(self.plan_cache.lookup, prompt)
+
+            if generated is not None:
+                code = generated.code
+                detected_type = "cot_generated"
+                context.code_source = "fast_path"
+                if progress_callback:
+                    await progress_callback("status", {"message": "⚡ Fast path: simple shape, skipping LLM agents", "progress": 60})
+            elif planned is not None:
+                code = planned["code"]
+                detected_type = "cot_generated"
+                context.code_source = "plan_cache"
+                context.plan_cache_key = planned["key"]
+                if progress_callback:
+                    await progress_callback("status", {"message": "♻️ Reusing cached program with new dimensions", "progress": 60})
+            else:
+                context.code_source = "llm"
+                # PHASE 4a: Architect Agent - Raisonnement sur le design
+                if progress_callback:
+                    await progress_callback("status", {"message": "🏗️ Architect analyzing design...", "progress": 40})
+
+                try:
+                    design_analysis = await self.architect.analyze_design(prompt)
+                    log.info(f"🏗️ Architect: {design_analysis.description} (complexity: {design_analysis.complexity})")
+                except Exception as e:
+                    log.error(f"Architect failed: {e}")
+                    return None, None, f"Architect analysis failed: {e}"
+
+                # PHASE 4b: Planner Agent - Plan de construction
+                if progress_callback:
+                    await progress_callback("status", {"message": "📐 Planner creating construction plan...", "progress": 50})
+
+                try:
+                    construction_plan = await self.planner.create_plan(design_analysis, prompt)
+                    log.info(f"📐 Planner: {len(construction_plan.steps)} steps (complexity: {construction_plan.estimated_complexity})")
+                except Exception as e:
+                    log.error(f"Planner failed: {e}")
+                    return None, None, f"Planning failed: {e}"
+
+                # PHASE 4c: Code Synthesizer - Génération du code
+                if progress_callback:
+                    await progress_callback("status", {"message": "💻 Synthesizer generating code...", "progress": 60})
+
+                # Code en cours d'écriture relayé au client (events code_delta)
+                on_token = None
+                if progress_callback:
+                    async def on_token(delta: str):
+                        await progress_callback("code_delta", {"delta": delta})
+
+                try:
+                    generated = await self.code_synthesizer.generate_code(construction_plan, design_analysis, on_token=on_token)
+                    code = generated.code
+                    detected_type = "cot_generated"  # Type spécial pour CoT
+                    log.info(f"💻 Synthesizer: Code generated (confidence: {generated.confidence:.2f})")
+                except Exception as e:
+                    log.error(f"Code synthesis failed: {e}")
+                    return None, None, f"Code synthesis failed: {e}"
+
+            # Clean emojis from generated code to avoid encoding issues
+            import re
+            emoji_pattern = re.compile("["
+                u"\U0001F600-\U0001F64F"  # emoticons
+                u"\U0001F300-\U0001F5FF"  # symbols & pictographs
+                u"\U0001F680-\U0001F6FF"  # transport & map symbols
+                u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
+                u"\U00002702-\U000027B0"  # dingbats
+                u"\U000024C2-\U0001F251"
+                u"\u2705"  # ✅ check mark
+                u"\u274C"  # ❌ cross mark
+                "]+", flags=re.UNICODE)
+            code = emoji_pattern.sub('', code)
+
+            context.generated_code = code
+
+        else:
+            # ========== TEMPLATE PATHWAY (Types connus) ==========
+            log.info("⚡ Using template-based generation")
+
+            if progress_callback:
+                await progress_callback("status", {"message": "💻 Generating code from template...", "progress": 45})
+
+            result = await self._execute_with_retry(
+                self.generator.generate,
+                context,
+                "Code Generation (Template)",
+                context.analysis
+            )
+
+            if result.status != AgentStatus.SUCCESS:
+                return None, None, "Code generation failed"
+
+            code, detected_type = result.data
+            context.code_source = "template"
+
+            # Clean emojis from generated code to avoid encoding issues
+            import re
+            emoji_pattern = re.compile("["
+                u"\U0001F600-\U0001F64F"  # emoticons
+                u"\U0001F300-\U0001F5FF"  # symbols & pictographs
+                u"\U0001F680-\U0001F6FF"  # transport & map symbols
+                u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
+                u"\U00002702-\U000027B0"  # dingbats
+                u"\U000024C2-\U0001F251"
+                u"\u2705"  # ✅ check mark
+                u"\u274C"  # ❌ cross mark
+                "]+", flags=re.UNICODE)
+            code = emoji_pattern.sub('', code)
+
+            context.generated_code = code
+
+        return code, detected_type, None
+
+    async def _plan_cache_fallback(self, context: WorkflowContext, prompt: str, progress_callback=None,
+                                   use_template_cache: bool = True, on_design_notes=None) -> Dict[str, Any]:
+        """Programme reconstruit refusé (Critic / exécution): entrée supprimée, chaîne LLM complète"""
+        log.warning("♻️ Cached program rejected for this prompt, falling back to the full CoT chain")
+        try:
+            await asyncio.to_thread(self.plan_cache.invalidate, context.plan_cache_key)
+        except Exception as e:
+            log.warning(f"⚠️ Plan cache invalidation failed: {e}")
+
+        if progress_callback:
+            await progress_callback("status", {"message": "♻️ Cached program rejected, regenerating...", "progress": 35})
+        return await self._run_workflow(prompt, progress_callback, use_template_cache, use_plan_cache=False,
+                                        on_design_notes=on_design_notes)
+
+    async def _cached_response(self, cached: Dict[str, Any], progress_callback=None,
+                               layer: str = "template") -> Dict[str, Any]:
+        """Résultat complet depuis un cache (template ou prompt): ni génération, ni CadQuery"""
+        if progress_callback:
+            await progress_callback("status", {"message": f"⚡ Reusing cached {layer} result...", "progress": 50})
+            await progress_callback("code", {
+                "code": cached["code"],
+                "app_type": cached["app_type"],
+                "progress": 70
+            })
+            await progress_callback("status", {"message": "✅ Generation complete!", "progress": 100})
+
+        metadata = cached.get("metadata", {})
+        return {
+            "success": True,
+            "mesh": None,
+            "mesh_bin": cached["mesh_bin"],
+            "mesh_bounds": cached["mesh_bounds"],
+            "analysis": metadata.get("analysis"),
+            "code": cached["code"],
+            "app_type": cached["app_type"],
+            "stl_path": cached["stl_path"],
+            "step_path": cached["step_path"],
+            "metadata": {**(metadata.get("workflow") or {}), "cache": "hit", "cache_layer": layer},
+        }
+
     async def _execute_with_retry(self, func, context: WorkflowContext, agent_name: str, *args) -> AgentResult:
         """Exécute une fonction agent avec retry automatique"""
 
@@ -597,6 +856,7 @@ class DesignExpertAgent:
     def __init__(self):
         model_name = os.getenv("DESIGN_EXPERT_MODEL", "qwen2.5-coder:7b")
         self.llm = OllamaLLM(model_name)
+        self.notes_mode = DESIGN_NOTES_MODE
 
         # Règles métier par type CAD
         self.design_rules = {
@@ -685,8 +945,11 @@ class DesignExpertAgent:
             if cell_size < rules.get("min_cell_size", 0):
                 violations.append(f"Cell size {cell_size}mm is too small")
 
-        # Validation LLM pour analyse approfondie
-        llm_validation = await self._llm_design_validation(app_type, analysis)
+        # Seules les règles décident: le commentaire LLM n'est attendu ici qu'en mode "inline"
+        # (en mode "background", l'orchestrateur le calcule à part via design_notes)
+        llm_validation = None
+        if self.notes_mode == "inline":
+            llm_validation = await self._llm_design_validation(app_type, analysis)
 
         if violations:
             return AgentResult(
@@ -705,6 +968,10 @@ class DesignExpertAgent:
             }
         )
 
+    async def design_notes(self, analysis: Dict[str, Any]) -> str:
+        """Commentaire LLM seul (enrichissement en tâche de fond, hors chemin critique)"""
+        return await self._llm_design_validation(analysis.get("type", "splint"), analysis)
+
     async def _llm_design_validation(self, app_type: str, analysis: Dict[str, Any]) -> str:
         """Utilise le LLM pour une analyse approfondie du design"""
 
@@ -2747,7 +3014,7 @@ class SelfHealingAgent:
 
         try:
             # Augmenté à 2048 tokens pour permettre code complet
-            response = await self.llm.generate(prompt, max_tokens=2048, temperature=0.1)
+            response = await self.llm.generate(prompt, max_tokens=2048, temperature=0.1, stop=FenceClosed())
 
             # Extraction améliorée du code avec plusieurs stratégies
             healed_code = None
@@ -3053,7 +3320,7 @@ class CriticAgent:
                 if shape == 'cone':
                     has_loft = 'loft' in code
                     has_taper = 'taper=' in code or 'taper =' in code
-                    has_cone_method = '.cone(' in code
+                    has_cone_method = '.cone(' in code or 'makeCone(' in code
 
                     if not (has_loft or has_taper or has_cone_method):
                         # Ni loft, ni taper, ni .cone() = mauvaise forme
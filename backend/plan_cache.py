@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache paramétrique des programmes CoT: un même design avec d'autres cotes
+("pipe outer radius 20 inner 15 length 150" puis "outer 25 inner 18 length 200")
+réutilise le programme déjà synthétisé au lieu de rappeler Architect, Planner et
+Synthesizer.
+
+- Signature structurelle: prompt normalisé (prompt_cache.normalize_prompt) dont les
+  nombres sont remplacés par '#', plus le motif d'égalité des nombres (150 = 150).
+- Squelette: le programme réussi dont chaque littéral numérique est relié aux nombres
+  du prompt, directement (150 → p2) ou par une combinaison simple (127.5 → p4 + p2/2).
+  Un littéral ambigu (deux combinaisons possibles) ou inexpliqué: pas de squelette.
+- Les nombres du prompt absents du programme restent fixes dans l'entrée
+  ("4 legs" ne devient pas "6 legs" par rebinding).
+
+L'orchestrateur revient à la chaîne LLM complète si le programme reconstruit échoue
+au Critic ou à l'exécution (l'entrée est alors supprimée).
+
+Stockage: <root>/plan_cache.sqlite3, invalidé avec la version du pipeline (cache_version).
+"""
+
+import io
+import os
+import re
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import logging
+import threading
+import tokenize
+from contextlib import contextmanager
+from itertools import permutations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from prompt_cache import normalize_prompt, cache_version
+
+log = logging.getLogger("cadamx.plan_cache")
+
+PLAN_CACHE_ENABLED = os.getenv("PLAN_CACHE_ENABLED", "1") == "1"
+PLAN_CACHE_DIR = os.getenv("PLAN_CACHE_DIR", str(Path(__file__).parent / "output" / "plan_cache"))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "500"))
+
+_NUMBER_RE = re.compile(r"(?<![\w.])(\d+(?:\.\d+)?)(?![\d.])")
+# Littéraux de structure gardés tels quels (côtés d'un polygone, diviseurs, angles)
+_STRUCTURAL = {0.0, 1.0, 2.0, 3.0, 4.0, 6.0, 90.0, 180.0, 270.0, 360.0}
+# Premier argument jamais relié au prompt: polygon(6, ...) même si le prompt contient "6 mm"
+_STRUCTURAL_CALLS = {"polygon", "range", "revolve"}
+# Opérateurs dont l'opérande de droite est un facteur, pas une cote: L / 2, i % 2
+_DIVISOR_OPS = {"/", "//", "%", "**"}
+# Coefficients des combinaisons essayées pour un littéral dérivé des cotes
+_SINGLE_COEFS = (-1.0, 0.5, -0.5, 2.0, -2.0)
+_PAIR_COEFS = ((1.0, 1.0), (1.0, -1.0), (1.0, 0.5), (1.0, -0.5), (0.5, 1.0), (0.5, -1.0), (0.5, 0.5), (0.5, -0.5))
+
+Term = List[float]  # [coefficient, indice] ou [coefficient, indice, indice] (produit: pas × spires)
+
+
+def prompt_signature(prompt: str) -> Tuple[str, List[float], List[int]]:
+    """
+    (signature, nombres, classes): 'pipe radius # mm length # mm', [20, 150], [0, 1].
+    classes[i] = indice du premier nombre de même valeur (motif d'égalité).
+    """
+    text = normalize_prompt(prompt)
+    numbers = [float(n) for n in _NUMBER_RE.findall(text)]
+    classes = [numbers.index(value) for value in numbers]
+    return _NUMBER_RE.sub("#", text), numbers, classes
+
+
+def _close(a: float, b: float) -> bool:
+    return abs(a - b) <= 1e-6 * max(1.0, abs(a), abs(b))
+
+
+def _evaluate(terms: List[Term], values: List[float]) -> float:
+    total = 0.0
+    for coef, *indices in terms:
+        for index in indices:
+            coef *= values[int(index)]
+        total += coef
+    return total
+
+
+def _format(value: float) -> str:
+    """150.0 → 150, 127.50000001 → 127.5, négatif entre parenthèses"""
+    value = round(value, 6)
+    text = str(int(value)) if value.is_integer() else f"{value:.6g}"
+    return f"({text})" if value < 0 else text
+
+
+class _Binder:
+    """Relie un littéral du programme aux nombres du prompt"""
+
+    def __init__(self, numbers: List[float], classes: List[int]):
+        self.numbers = numbers
+        self.reps = sorted(set(classes))
+        # Valeurs perturbées (une par classe) pour détecter les combinaisons ambiguës
+        rng = random.Random(0)
+        probe = [value * rng.uniform(1.3, 2.9) + rng.uniform(1.0, 9.0) for value in numbers]
+        self.probe = [probe[c] for c in classes]
+
+    def bind(self, value: float) -> Optional[List[Term]]:
+        """
+        Combinaison des nombres du prompt égale à value: [] pour un littéral de structure
+        non cité dans le prompt, None si inexpliqué ou ambigu
+        """
+        for rep in self.reps:
+            if _close(self.numbers[rep], value):
+                return [[1.0, rep]]
+        if value in _STRUCTURAL:
+            return []
+        for candidates in (self._singles(value), self._pairs(value), self._products(value)):
+            if candidates:
+                probed = {round(_evaluate(c, self.probe), 6) for c in candidates}
+                return candidates[0] if len(probed) == 1 else None
+        return None
+
+    def _singles(self, value: float) -> List[List[Term]]:
+        return [[[coef, i]] for i in self.reps for coef in _SINGLE_COEFS
+                if _close(coef * self.numbers[i], value)]
+
+    def _pairs(self, value: float) -> List[List[Term]]:
+        return [[[a, i], [b, j]] for i, j in permutations(self.reps, 2) for a, b in _PAIR_COEFS
+                if _close(a * self.numbers[i] + b * self.numbers[j], value)]
+
+    def _products(self, value: float) -> List[List[Term]]:
+        return [[[1.0, i, j]] for i, j in permutations(self.reps, 2)
+                if i < j and _close(self.numbers[i] * self.numbers[j], value)]
+
+
+def _structural_positions(tokens: List[tokenize.TokenInfo]) -> set:
+    """
+    Positions des nombres jamais reliés au prompt: tuples de -1/0/1 (axes, directions),
+    premier argument de polygon / revolve, bornes de range, diviseurs et multiplicateurs
+    d'une expression (H / 2 reste H / 2 même si le prompt contient "2 mm")
+    """
+    positions, stack = set(), []
+    for n, tok in enumerate(tokens):
+        call = tokens[n:n + 3]
+        if (len(call) == 3 and tok.type == tokenize.NAME and tok.string in _STRUCTURAL_CALLS
+                and call[1].string == "(" and call[2].type == tokenize.NUMBER):
+            positions.add(call[2].start)
+        if tok.type == tokenize.NUMBER:
+            before = tokens[n - 1] if n else None
+            after = tokens[n + 1] if n + 1 < len(tokens) else None
+            if before is not None and before.type == tokenize.OP and before.string in _DIVISOR_OPS:
+                positions.add(tok.start)
+            # Multiplicateur: l'autre opérande n'est pas un nombre (2 * 150 reste relié)
+            elif (before is not None and before.string == "*" and n >= 2
+                  and tokens[n - 2].type != tokenize.NUMBER):
+                positions.add(tok.start)
+            elif (after is not None and after.string == "*" and n + 2 < len(tokens)
+                  and tokens[n + 2].type != tokenize.NUMBER):
+                positions.add(tok.start)
+            elif stack and stack[-1]["range"]:
+                positions.add(tok.start)
+        if tok.type == tokenize.OP and tok.string == "(":
+            if stack:
+                stack[-1]["mixed"] = True
+            is_range = n > 0 and tokens[n - 1].type == tokenize.NAME and tokens[n - 1].string == "range"
+            stack.append({"numbers": [], "mixed": False, "range": is_range})
+        elif tok.type == tokenize.OP and tok.string == ")" and stack:
+            group = stack.pop()
+            numbers = group["numbers"]
+            if not group["mixed"] and len(numbers) >= 2 and all(float(t.string) in (0.0, 1.0) for t in numbers):
+                positions.update(t.start for t in numbers)
+        elif stack and tok.type == tokenize.NUMBER:
+            stack[-1]["numbers"].append(tok)
+        elif stack and (tok.type in (tokenize.NAME, tokenize.STRING) or
+                        (tok.type == tokenize.OP and tok.string not in (",", "-"))):
+            stack[-1]["mixed"] = True
+    return positions
+
+
+def parametrize_code(code: str, numbers: List[float], classes: List[int]) -> Optional[Dict[str, Any]]:
+    """
+    Squelette du programme: {"parts": [texte, termes, texte, ...], "used": [indices]}.
+    None si un littéral ne peut pas être relié sans ambiguïté aux nombres du prompt.
+    """
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return None
+
+    lines = code.splitlines(keepends=True)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+    structural = _structural_positions(tokens)
+    binder = _Binder(numbers, classes)
+
+    parts: List[Any] = []
+    used = set()
+    cursor = 0
+    for tok in tokens:
+        if tok.type != tokenize.NUMBER:
+            continue
+        try:
+            value = float(tok.string)
+        except ValueError:  # 0x10, 1j...
+            return None
+        if tok.start in structural:
+            continue
+        terms = binder.bind(value)
+        if terms == []:
+            continue
+        if terms is None:
+            log.info(f"🧩 Plan cache: literal {tok.string} not tied to the prompt, program not cached")
+            return None
+        start = offsets[tok.start[0] - 1] + tok.start[1]
+        end = offsets[tok.end[0] - 1] + tok.end[1]
+        parts += [code[cursor:start], terms]
+        used.update(int(index) for _, *indices in terms for index in indices)
+        cursor = end
+    parts.append(code[cursor:])
+    return {"parts": parts, "used": sorted(used)}
+
+
+def render_skeleton(parts: List[Any], numbers: List[float]) -> str:
+    """Programme reconstruit avec les nombres d'un nouveau prompt"""
+    return "".join(part if isinstance(part, str) else _format(_evaluate(part, numbers)) for part in parts)
+
+
+class PlanCache:
+    """Index SQLite signature structurelle → squelette de programme (une connexion par appel, mode WAL)"""
+
+    def __init__(self, root: Optional[Path] = None, max_entries: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        self.enabled = PLAN_CACHE_ENABLED if enabled is None else enabled
+        self.root = Path(root or PLAN_CACHE_DIR)
+        self.max_entries = PLAN_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.version = cache_version()
+
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.rejected = 0
+        self.invalidated = 0
+        self._lock = threading.Lock()
+
+        if self.enabled:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self.db_path = self.root / "plan_cache.sqlite3"
+            with self._connect() as db:
+                db.execute("""
+                    CREATE TABLE IF NOT EXISTS plan_cache (
+                        key TEXT PRIMARY KEY,
+                        signature TEXT NOT NULL,
+                        version TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used REAL NOT NULL,
+                        hits INTEGER NOT NULL DEFAULT 0,
+                        entry TEXT NOT NULL
+                    )""")
+                db.execute("CREATE INDEX IF NOT EXISTS idx_plan_cache_signature ON plan_cache(signature)")
+                db.execute("DELETE FROM plan_cache WHERE version != ?", (self.version,))
+            log.info(f"🗄️ Plan cache @ {self.db_path} (version {self.version})")
+
+    @contextmanager
+    def _connect(self):
+        """Connexion courte: commit puis fermeture (appels depuis des threads différents)"""
+        db = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+    def lookup(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """
+        Programme reconstruit pour ce prompt: {"key", "code", "source_prompt"}, ou None.
+        Le motif d'égalité et les nombres fixes de l'entrée doivent correspondre.
+        """
+        if not self.enabled:
+            return None
+
+        signature, numbers, classes = prompt_signature(prompt)
+        if not numbers:
+            return None
+
+        with self._connect() as db:
+            rows = db.execute("SELECT key, entry FROM plan_cache WHERE signature = ? AND version = ? "
+                              "ORDER BY last_used DESC", (signature, self.version)).fetchall()
+
+        for key, blob in rows:
+            entry = json.loads(blob)
+            if entry["classes"] != classes:
+                continue
+            if any(not _close(numbers[int(i)], value) for i, value in entry["fixed"].items()):
+                continue
+            code = render_skeleton(entry["parts"], numbers)
+            with self._connect() as db:
+                db.execute("UPDATE plan_cache SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+            with self._lock:
+                self.hits += 1
+            log.info(f"⚡ Plan cache hit {key[:12]} (from: {entry['source_prompt'][:60]})")
+            return {"key": key, "code": code, "source_prompt": entry["source_prompt"]}
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, prompt: str, code: str) -> Optional[str]:
+        """Range le squelette d'un programme réussi; renvoie sa clé, None s'il n'est pas paramétrable"""
+        if not self.enabled:
+            return None
+
+        signature, numbers, classes = prompt_signature(prompt)
+        skeleton = parametrize_code(code, numbers, classes) if numbers else None
+        if skeleton is None or not skeleton["used"]:
+            with self._lock:
+                self.rejected += 1
+            return None
+
+        # Nombres du prompt que le programme n'utilise pas: ils font partie de l'entrée
+        fixed = {str(i): numbers[i] for i in range(len(numbers)) if classes[i] not in skeleton["used"]}
+        entry = {"parts": skeleton["parts"], "classes": classes, "fixed": fixed, "source_prompt": prompt}
+        key = hashlib.sha256(json.dumps([self.version, signature, classes, fixed], sort_keys=True)
+                             .encode("utf-8")).hexdigest()[:32]
+
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO plan_cache (key, signature, version, created_at, last_used, hits, entry) "
+                "VALUES (?, ?, ?, ?, ?, 0, ?)",
+                (key, signature, self.version, now, now, json.dumps(entry, ensure_ascii=False)),
+            )
+            overflow = db.execute("SELECT COUNT(*) FROM plan_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                db.execute("DELETE FROM plan_cache WHERE key IN "
+                           "(SELECT key FROM plan_cache ORDER BY last_used LIMIT ?)", (overflow,))
+        with self._lock:
+            self.stored += 1
+        log.info(f"🗄️ Plan skeleton cached {key[:12]} ({len(skeleton['used'])} parameters)")
+        return key
+
+    def invalidate(self, key: str):
+        """Programme reconstruit refusé (Critic / exécution): l'entrée ne resservira plus"""
+        if not self.enabled:
+            return
+        with self._connect() as db:
+            db.execute("DELETE FROM plan_cache WHERE key = ?", (key,))
+        with self._lock:
+            self.invalidated += 1
+        log.info(f"🧹 Plan cache entry {key[:12]} invalidated")
+
+    def stats(self) -> Dict[str, Any]:
+        entries = 0
+        if self.enabled:
+            with self._connect() as db:
+                entries = db.execute("SELECT COUNT(*) FROM plan_cache").fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stored": self.stored,
+                "rejected": self.rejected,
+                "invalidated": self.invalidated,
+                "version": self.version,
+            }
+
+
+__all__ = ["PlanCache", "prompt_signature", "parametrize_code", "render_skeleton"]
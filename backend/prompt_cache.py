@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache des résultats complets par prompt (devant OrchestratorAgent.execute_workflow).
+Le prompt est normalisé (casse, espaces, orthographe des unités, écriture des
+nombres) puis cherché dans une base SQLite; un hit renvoie le code, les artefacts
+et les métadonnées sans analyse, sans appel LLM ni exécution.
+
+Invalidation:
+- TTL (PROMPT_CACHE_TTL_HOURS, 0 = jamais)
+- version: modèles LLM configurés + version des templates + PROMPT_CACHE_VERSION;
+  changer l'un d'eux rend toutes les anciennes entrées inaccessibles (purgées au démarrage)
+
+Stockage: <root>/prompt_cache.sqlite3 (index + résultat JSON) et <root>/<clé>/
+pour les fichiers (model.stl, model.step, mesh.bin).
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from job_store import ARTIFACTS
+from mesh_ops import encode_mesh, mesh_bounds
+from template_cache import template_version
+
+log = logging.getLogger("cadamx.prompt_cache")
+
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE_ENABLED", "1") == "1"
+PROMPT_CACHE_DIR = os.getenv("PROMPT_CACHE_DIR", str(Path(__file__).parent / "output" / "prompt_cache"))
+PROMPT_CACHE_TTL_HOURS = float(os.getenv("PROMPT_CACHE_TTL_HOURS", "168"))
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "2000"))
+# À incrémenter pour invalider le cache après un changement du pipeline (agents, healing...)
+PROMPT_CACHE_VERSION = os.getenv("PROMPT_CACHE_VERSION", "1")
+
+# Modèles dont dépend le résultat (variable d'environnement → défaut des agents)
+_MODEL_SETTINGS = {
+    "DESIGN_EXPERT_MODEL": "qwen2.5-coder:7b",
+    "CODE_LLM_MODEL": "deepseek-coder:6.7b",
+    "COT_ARCHITECT_MODEL": "qwen2.5:14b",
+    "COT_PLANNER_MODEL": "qwen2.5-coder:14b",
+    "COT_SYNTHESIZER_MODEL": "deepseek-coder:33b",
+}
+
+# Orthographes d'unités → forme canonique (pas de conversion: "2 cm" reste "2 cm")
+_UNIT_SYNONYMS = [
+    (r"millim(?:e|è)t(?:er|re)s?", "mm"),
+    (r"centim(?:e|è)t(?:er|re)s?", "cm"),
+    (r"m(?:e|è)t(?:er|re)s?", "m"),
+    (r"inch(?:es)?", "in"),
+    (r"degr(?:ee|é)s?|degs?|°", "deg"),
+]
+_UNIT_RE = [(re.compile(rf"(?<![a-z])(?:{pattern})(?![a-z])"), unit) for pattern, unit in _UNIT_SYNONYMS]
+_NUMBER_UNIT_RE = re.compile(r"(\d)\s*(mm|cm|m|in|deg)(?![a-z])")
+_NUMBER_RE = re.compile(r"(?<![\w.])(\d+(?:\.\d+)?)(?![\d.])")
+
+
+def _format_number(match: re.Match) -> str:
+    """10.0 → 10, 007 → 7, 2.50 → 2.5"""
+    text = match.group(1)
+    value = float(text)
+    return str(int(value)) if value.is_integer() else f"{value:.10g}"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Forme canonique d'un prompt: deux prompts trivialement différents ont la même"""
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    for pattern, unit in _UNIT_RE:
+        text = pattern.sub(unit, text)
+    text = _NUMBER_RE.sub(_format_number, text)
+    text = _NUMBER_UNIT_RE.sub(r"\1 \2", text)
+    return text.rstrip(" .!")
+
+
+def cache_version() -> str:
+    """Version du pipeline: modèles LLM + templates + version manuelle"""
+    models = {name: os.getenv(name, default) for name, default in _MODEL_SETTINGS.items()}
+    blob = json.dumps({"models": models, "templates": template_version(), "manual": PROMPT_CACHE_VERSION},
+                      sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:12]
+
+
+class PromptCache:
+    """Index SQLite prompt normalisé → résultat du workflow (une connexion par appel, mode WAL)"""
+
+    def __init__(self, root: Optional[Path] = None, ttl_hours: Optional[float] = None,
+                 max_entries: Optional[int] = None, enabled: Optional[bool] = None):
+        self.enabled = PROMPT_CACHE_ENABLED if enabled is None else enabled
+        self.root = Path(root or PROMPT_CACHE_DIR)
+        ttl_hours = PROMPT_CACHE_TTL_HOURS if ttl_hours is None else ttl_hours
+        self.ttl = ttl_hours * 3600.0 if ttl_hours > 0 else None
+        self.max_entries = PROMPT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.version = cache_version()
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.enabled:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self.db_path = self.root / "prompt_cache.sqlite3"
+            with self._connect() as db:
+                db.execute("""
+                    CREATE TABLE IF NOT EXISTS prompt_cache (
+                        key TEXT PRIMARY KEY,
+                        normalized_prompt TEXT NOT NULL,
+                        version TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used REAL NOT NULL,
+                        hits INTEGER NOT NULL DEFAULT 0,
+                        result TEXT NOT NULL
+                    )""")
+                db.execute("CREATE INDEX IF NOT EXISTS idx_prompt_cache_last_used ON prompt_cache(last_used)")
+            self._purge()
+            log.info(f"🗄️ Prompt cache @ {self.db_path} (version {self.version})")
+
+    @contextmanager
+    def _connect(self):
+        """Connexion courte: commit puis fermeture (appels depuis des threads différents)"""
+        db = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+    def key(self, prompt: str) -> str:
+        blob = f"{self.version}\n{normalize_prompt(prompt)}"
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:32]
+
+    def _delete(self, db: sqlite3.Connection, keys):
+        keys = list(keys)
+        if not keys:
+            return
+        db.executemany("DELETE FROM prompt_cache WHERE key = ?", [(k,) for k in keys])
+        for key in keys:
+            shutil.rmtree(self.root / key, ignore_errors=True)
+
+    def _purge(self):
+        """Supprime les entrées d'une autre version, expirées, ou au-delà de la limite (LRU)"""
+        now = time.time()
+        with self._connect() as db:
+            stale = [k for (k,) in db.execute("SELECT key FROM prompt_cache WHERE version != ?", (self.version,))]
+            if self.ttl:
+                stale += [k for (k,) in db.execute("SELECT key FROM prompt_cache WHERE created_at < ?",
+                                                  (now - self.ttl,))]
+            self._delete(db, set(stale))
+
+            overflow = db.execute("SELECT COUNT(*) FROM prompt_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                oldest = db.execute("SELECT key FROM prompt_cache ORDER BY last_used LIMIT ?", (overflow,))
+                self._delete(db, [k for (k,) in oldest])
+        if stale or overflow > 0:
+            log.info(f"🧹 Prompt cache: purged {len(set(stale)) + max(overflow, 0)} entries")
+
+    def get(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """
+        Résultat en cache pour ce prompt, ou None.
+        Même format que TemplateCache.get (code, app_type, chemins, mesh_bin, metadata).
+        """
+        if not self.enabled:
+            return None
+
+        key = self.key(prompt)
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT created_at, result FROM prompt_cache WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl and now - row[0] > self.ttl:
+                self._delete(db, [key])
+                row = None
+            if row:
+                db.execute("UPDATE prompt_cache SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        stored = json.loads(row[1])
+        entry_dir = self.root / key
+        files = stored.get("files", {})
+        if any(not (entry_dir / name).exists() for name in files.values()):
+            log.warning(f"⚠️ Prompt cache entry {key[:12]} lost its files, ignoring")
+            with self._connect() as db:
+                self._delete(db, [key])
+            return None
+
+        log.info(f"⚡ Prompt cache hit {key[:12]} ({stored.get('app_type')})")
+        path = lambda kind: str(entry_dir / files[kind]) if kind in files else None
+        return {
+            "key": key,
+            "app_type": stored.get("app_type"),
+            "code": stored.get("code") or "",
+            "stl_path": path("stl"),
+            "step_path": path("step"),
+            "mesh_bin": (entry_dir / files["mesh"]).read_bytes() if "mesh" in files else None,
+            "mesh_bounds": stored.get("mesh_bounds"),
+            "metadata": {"analysis": stored.get("analysis"), "workflow": stored.get("metadata", {})},
+        }
+
+    def put(self, prompt: str, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Range un résultat réussi du workflow.
+
+        Returns:
+            {"mesh_bin", "mesh_bounds"} de l'entrée (pour réutiliser l'encodage), None si désactivé
+        """
+        if not self.enabled or not result.get("success"):
+            return None
+
+        key = self.key(prompt)
+        tmp_dir = self.root / f".tmp-{uuid.uuid4().hex}"
+        tmp_dir.mkdir(parents=True)
+        files = {}
+        for kind in ("stl", "step"):
+            src = result.get(f"{kind}_path")
+            if src and os.path.exists(src):
+                shutil.copyfile(src, tmp_dir / ARTIFACTS[kind][0])
+                files[kind] = ARTIFACTS[kind][0]
+
+        mesh_bin, bounds = result.get("mesh_bin"), result.get("mesh_bounds")
+        mesh = result.get("mesh")
+        if mesh_bin is None and mesh:
+            vertices = np.asarray(mesh["vertices"], dtype=np.float32).reshape(-1, 3)
+            faces = np.asarray(mesh["faces"], dtype=np.uint32).reshape(-1, 3)
+            mesh_bin, bounds = encode_mesh(vertices, faces), mesh_bounds(vertices)
+        if mesh_bin is not None:
+            (tmp_dir / ARTIFACTS["mesh"][0]).write_bytes(mesh_bin)
+            files["mesh"] = ARTIFACTS["mesh"][0]
+
+        # Les marqueurs de cache du run courant ne sont pas des métadonnées du modèle
+        metadata = {k: v for k, v in (result.get("metadata") or {}).items() if k not in ("cache", "cache_layer")}
+        stored = {
+            "code": result.get("code"),
+            "app_type": result.get("app_type"),
+            "analysis": result.get("analysis"),
+            "metadata": metadata,
+            "mesh_bounds": bounds,
+            "files": files,
+        }
+
+        entry_dir = self.root / key
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO prompt_cache (key, normalized_prompt, version, created_at, last_used, hits, result) "
+                "VALUES (?, ?, ?, ?, ?, 0, ?)",
+                (key, normalize_prompt(prompt), self.version, now, now,
+                 json.dumps(stored, ensure_ascii=False, default=str)),
+            )
+        self._purge()
+
+        log.info(f"🗄️ Prompt result cached {key[:12]} ({stored['app_type']})")
+        return {"mesh_bin": mesh_bin, "mesh_bounds": bounds}
+
+    def stats(self) -> Dict[str, Any]:
+        entries = 0
+        if self.enabled:
+            with self._connect() as db:
+                entries = db.execute("SELECT COUNT(*) FROM prompt_cache").fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "ttl_hours": self.ttl / 3600.0 if self.ttl else 0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "version": self.version,
+            }
+
+
+__all__ = ["PromptCache", "normalize_prompt", "cache_version"]
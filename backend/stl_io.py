@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lecture / écriture STL vectorisées (NumPy).
+Le STL binaire est mappé en mémoire avec un dtype structuré
+(normale, 3 sommets, attribut) : pas de boucle Python par triangle.
+Le STL ASCII est détecté et parsé en un seul passage.
+
+write_stl est aussi utilisé par le code généré (templates NumPy):
+    from stl_io import write_stl
+"""
+
+import os
+import re
+import logging
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+log = logging.getLogger("cadamx.stl_io")
+
+# Enregistrement binaire STL: 12 float32 + uint16 = 50 octets
+STL_DTYPE = np.dtype([
+    ("normal", "<f4", (3,)),
+    ("vertices", "<f4", (3, 3)),
+    ("attr", "<u2"),
+])
+
+HEADER_SIZE = 84  # 80 octets d'en-tête + uint32 nombre de triangles
+
+_FLOAT = rb"([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)"
+_VERTEX_RE = re.compile(rb"vertex\s+" + _FLOAT + rb"\s+" + _FLOAT + rb"\s+" + _FLOAT)
+_NORMAL_RE = re.compile(rb"facet\s+normal\s+" + _FLOAT + rb"\s+" + _FLOAT + rb"\s+" + _FLOAT)
+
+PathLike = Union[str, os.PathLike]
+
+
+def is_ascii_stl(path: PathLike) -> bool:
+    """
+    Détecte un STL ASCII.
+    Beaucoup d'exporteurs écrivent 'solid' dans l'en-tête binaire: on se fie
+    d'abord à la taille attendue (84 + 50 * n), puis au mot-clé 'facet'.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(HEADER_SIZE)
+        if len(head) == HEADER_SIZE:
+            count = int(np.frombuffer(head, dtype="<u4", count=1, offset=80)[0])
+            if size == HEADER_SIZE + count * STL_DTYPE.itemsize:
+                return False
+        if not head.lstrip().startswith(b"solid"):
+            return False
+        return b"facet" in head + f.read(512)
+
+
+def _read_binary(path: PathLike, mmap: bool) -> np.ndarray:
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.seek(80)
+        declared = int(np.frombuffer(f.read(4), dtype="<u4")[0])
+
+    available = max(0, (size - HEADER_SIZE) // STL_DTYPE.itemsize)
+    count = min(declared, available)
+    if count != declared:
+        log.warning(f"⚠️ Truncated STL {Path(path).name}: header says {declared} triangles, file holds {available}")
+
+    if count == 0:
+        return np.zeros(0, dtype=STL_DTYPE)
+    if mmap:
+        return np.memmap(path, dtype=STL_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+    return np.fromfile(path, dtype=STL_DTYPE, count=count, offset=HEADER_SIZE)
+
+
+def _read_ascii(path: PathLike) -> np.ndarray:
+    data = Path(path).read_bytes()
+    vertices = np.array(_VERTEX_RE.findall(data), dtype=np.float32).reshape(-1, 3, 3)
+    normals = np.array(_NORMAL_RE.findall(data), dtype=np.float32).reshape(-1, 3)
+
+    records = np.zeros(len(vertices), dtype=STL_DTYPE)
+    records["vertices"] = vertices
+    if len(normals) == len(vertices):
+        records["normal"] = normals
+    return records
+
+
+def read_stl_records(path: PathLike, mmap: bool = True) -> np.ndarray:
+    """
+    Lit un STL (binaire ou ASCII) en tableau structuré STL_DTYPE.
+    En binaire avec mmap=True, le tableau est une vue sur le fichier (zéro copie):
+    ne copier que ce dont on a besoin.
+    """
+    if is_ascii_stl(path):
+        return _read_ascii(path)
+    return _read_binary(path, mmap)
+
+
+def read_stl(path: PathLike, mmap: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lit un STL et retourne (triangles, normales) en float32.
+
+    Returns:
+        triangles: (n, 3, 3) - sommets de chaque triangle
+        normals:   (n, 3)    - normales des facettes telles qu'écrites dans le fichier
+    """
+    records = read_stl_records(path, mmap=mmap)
+    return records["vertices"], records["normal"]
+
+
+def compute_normals(triangles: np.ndarray) -> np.ndarray:
+    """Normales unitaires des facettes (n, 3) float32; 0 pour les triangles dégénérés"""
+    tris = np.asarray(triangles, dtype=np.float32).reshape(-1, 3, 3)
+    n = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+    lens = np.linalg.norm(n, axis=1, keepdims=True)
+    lens[lens == 0] = 1.0
+    return (n / lens).astype(np.float32)
+
+
+def _header_bytes(header: Union[str, bytes]) -> bytes:
+    if isinstance(header, str):
+        header = header.encode("ascii", "replace")
+    # Un en-tête binaire qui commence par 'solid' trompe certains lecteurs
+    if header.lstrip().lower().startswith(b"solid"):
+        header = b"STL " + header
+    return header[:80].ljust(80, b" ")
+
+
+def write_stl(path: PathLike, triangles: np.ndarray, header: Union[str, bytes] = "CadaMx",
+              ascii: bool = False, normals: Optional[np.ndarray] = None) -> int:
+    """
+    Écrit un STL depuis un tableau de triangles (n, 3, 3).
+    Binaire: un tableau structuré STL_DTYPE écrit en un seul tofile().
+
+    Returns:
+        Le nombre de triangles écrits
+    """
+    tris = np.asarray(triangles, dtype=np.float32).reshape(-1, 3, 3)
+    norms = compute_normals(tris) if normals is None else np.asarray(normals, dtype=np.float32).reshape(-1, 3)
+
+    if ascii:
+        name = header.decode("ascii", "replace") if isinstance(header, bytes) else header
+        name = name.strip().replace("\n", " ") or "CadaMx"
+        facet = ("facet normal %e %e %e\n outer loop\n"
+                 "  vertex %e %e %e\n  vertex %e %e %e\n  vertex %e %e %e\n"
+                 " endloop\nendfacet\n")
+        values = np.concatenate([norms, tris.reshape(-1, 9)], axis=1).astype(np.float64)
+        with open(path, "w", encoding="ascii") as f:
+            f.write(f"solid {name}\n")
+            f.write((facet * len(values)) % tuple(values.ravel()))
+            f.write(f"endsolid {name}\n")
+        return len(tris)
+
+    records = np.zeros(len(tris), dtype=STL_DTYPE)
+    records["normal"] = norms
+    records["vertices"] = tris
+    with open(path, "wb") as f:
+        f.write(_header_bytes(header))
+        f.write(np.uint32(len(tris)).astype("<u4").tobytes())
+        records.tofile(f)
+    return len(tris)
+
+
+__all__ = ["STL_DTYPE", "is_ascii_stl", "read_stl", "read_stl_records", "compute_normals", "write_stl"]
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache disque des résultats de templates.
+Clé = sha256(app_type, analyse normalisée, version des templates): deux prompts
+dont l'analyste extrait exactement les mêmes paramètres partagent la même entrée
+(STL, STEP, code, mesh d'aperçu, métadonnées), sans régénérer ni ré-exécuter.
+
+La version des templates est le hash des sources qui produisent la géométrie
+(templates.py et les modules importés par le code généré): modifier un template
+invalide automatiquement toutes ses entrées.
+
+Éviction LRU (dernier accès) bornée en nombre d'entrées et en taille totale.
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from job_store import ARTIFACTS
+from mesh_ops import encode_mesh, mesh_bounds
+
+log = logging.getLogger("cadamx.template_cache")
+
+TEMPLATE_CACHE_ENABLED = os.getenv("TEMPLATE_CACHE_ENABLED", "1") == "1"
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", str(Path(__file__).parent / "output" / "template_cache"))
+TEMPLATE_CACHE_MAX_ENTRIES = int(os.getenv("TEMPLATE_CACHE_MAX_ENTRIES", "500"))
+TEMPLATE_CACHE_MAX_MB = float(os.getenv("TEMPLATE_CACHE_MAX_MB", "1024"))
+
+# Sources dont dépend la géométrie produite par un template
+_TEMPLATE_SOURCES = ("templates.py", "stl_io.py", "lattice.py", "cad_ops.py", "honeycomb.py")
+
+# Clés de l'analyse qui ne changent pas le modèle
+_VOLATILE_KEYS = {"raw_prompt", "prompt"}
+
+
+@lru_cache(maxsize=1)
+def template_version() -> str:
+    """Hash des sources des templates (calculé une fois par processus)"""
+    digest = hashlib.sha256()
+    backend = Path(__file__).parent
+    for name in _TEMPLATE_SOURCES:
+        path = backend / name
+        if path.exists():
+            digest.update(name.encode("utf-8"))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def normalize(value: Any) -> Any:
+    """
+    Forme canonique JSON d'une valeur d'analyse:
+    3 et 3.0 identiques, flottants à 9 chiffres significatifs, clés triées,
+    tuples → listes, chaînes sans espaces de bord.
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        number = float(f"{float(value):.9g}")
+        return 0.0 if number == 0 else number
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [normalize(v) for v in value]
+    return str(value)
+
+
+def cache_key(analysis: Dict[str, Any], version: Optional[str] = None) -> str:
+    """Clé de cache d'une analyse (app_type + paramètres normalisés + version)"""
+    stable = {k: v for k, v in analysis.items() if k not in _VOLATILE_KEYS}
+    payload = {
+        "app_type": analysis.get("type", "unknown"),
+        "analysis": normalize(stable),
+        "version": version or template_version(),
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:32]
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+
+
+class TemplateCache:
+    """
+    Entrées adressées par clé: <root>/<key>/model.stl, model.step, code.py, mesh.bin, meta.json.
+    L'ordre LRU est gardé en mémoire et persisté par la date de modification de meta.json.
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_entries: Optional[int] = None,
+                 max_mb: Optional[float] = None, enabled: Optional[bool] = None):
+        self.enabled = TEMPLATE_CACHE_ENABLED if enabled is None else enabled
+        self.root = Path(root or TEMPLATE_CACHE_DIR)
+        self.max_entries = TEMPLATE_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.max_bytes = int((TEMPLATE_CACHE_MAX_MB if max_mb is None else max_mb) * 1024 * 1024)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # clé → taille en octets, de la plus ancienne à la plus récente
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.enabled:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._load_index()
+            log.info(f"🗃️ Template cache @ {self.root} ({len(self._entries)} entries, version {template_version()})")
+
+    def _load_index(self):
+        """Reconstruit l'ordre LRU depuis le disque (entrées incomplètes supprimées)"""
+        found = []
+        for entry in self.root.iterdir():
+            if not entry.is_dir():
+                continue
+            meta = entry / ARTIFACTS["meta"][0]
+            if entry.name.startswith(".") or not meta.exists():
+                shutil.rmtree(entry, ignore_errors=True)
+                continue
+            found.append((meta.stat().st_mtime, entry.name, _dir_size(entry)))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+        self._evict()
+
+    def key(self, analysis: Dict[str, Any]) -> str:
+        return cache_key(analysis)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Entrée en cache (et la marque comme récente), ou None"""
+        if not self.enabled:
+            return None
+
+        entry_dir = self.root / key
+        meta_path = entry_dir / ARTIFACTS["meta"][0]
+        if not meta_path.exists():
+            with self._lock:
+                self.misses += 1
+                self._entries.pop(key, None)
+            return None
+
+        with self._lock:
+            # Entrée écrite par un autre processus (plusieurs workers uvicorn)
+            if key not in self._entries:
+                self._entries[key] = _dir_size(entry_dir)
+            self._entries.move_to_end(key)
+
+        os.utime(meta_path)
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        with self._lock:
+            self.hits += 1
+        log.info(f"⚡ Template cache hit {key[:12]} ({meta.get('app_type')})")
+        return self._entry(entry_dir, meta)
+
+    def put(self, key: str, code: str, app_type: str, stl_path: Optional[str] = None,
+            step_path: Optional[str] = None, mesh: Optional[Dict[str, Any]] = None,
+            metadata: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Range le résultat d'un template. Le mesh d'aperçu (vertices/faces) est encodé
+        ici une fois pour toutes (mesh.bin).
+
+        Returns:
+            L'entrée créée (même format que get), None si le cache est désactivé
+        """
+        if not self.enabled:
+            return None
+
+        # Écriture dans un dossier temporaire puis renommage: jamais d'entrée à moitié écrite
+        tmp_dir = self.root / f".tmp-{uuid.uuid4().hex}"
+        tmp_dir.mkdir(parents=True)
+        files = {"code": ARTIFACTS["code"][0]}
+        (tmp_dir / ARTIFACTS["code"][0]).write_text(code, encoding="utf-8")
+
+        for kind, src in (("stl", stl_path), ("step", step_path)):
+            if src and os.path.exists(src):
+                shutil.copyfile(src, tmp_dir / ARTIFACTS[kind][0])
+                files[kind] = ARTIFACTS[kind][0]
+
+        bounds = None
+        if mesh:
+            vertices = np.asarray(mesh["vertices"], dtype=np.float32).reshape(-1, 3)
+            faces = np.asarray(mesh["faces"], dtype=np.uint32).reshape(-1, 3)
+            (tmp_dir / ARTIFACTS["mesh"][0]).write_bytes(encode_mesh(vertices, faces))
+            files["mesh"] = ARTIFACTS["mesh"][0]
+            bounds = mesh_bounds(vertices)
+
+        meta = {
+            "key": key,
+            "app_type": app_type,
+            "template_version": template_version(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "files": files,
+            "mesh_bounds": bounds,
+            "metadata": metadata or {},
+        }
+        (tmp_dir / ARTIFACTS["meta"][0]).write_text(
+            json.dumps(meta, indent=2, ensure_ascii=False, default=str), encoding="utf-8"
+        )
+
+        entry_dir = self.root / key
+        self._swap_in(tmp_dir, entry_dir)
+
+        with self._lock:
+            self._entries[key] = _dir_size(entry_dir)
+            self._entries.move_to_end(key)
+        self._evict()
+
+        log.info(f"🗃️ Template result cached {key[:12]} ({app_type})")
+        return self._entry(entry_dir, meta)
+
+    def _swap_in(self, tmp_dir: Path, entry_dir: Path):
+        """
+        Renomme l'entrée neuve à sa place. Une entrée existante (cache "bypass",
+        ou même clé écrite par une autre requête) est d'abord mise de côté puis
+        supprimée: le résultat le plus récent remplace toujours l'ancien.
+        """
+        for _ in range(3):
+            try:
+                os.replace(tmp_dir, entry_dir)
+                return
+            except OSError:
+                # os.replace ne remplace pas un dossier non vide
+                old_dir = self.root / f".old-{uuid.uuid4().hex}"
+                try:
+                    os.replace(entry_dir, old_dir)
+                except FileNotFoundError:
+                    continue  # retirée entre-temps: réessayer le renommage
+                shutil.rmtree(old_dir, ignore_errors=True)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        log.warning(f"⚠️ Template cache entry {entry_dir.name[:12]} not refreshed (concurrent writes)")
+
+    def _entry(self, entry_dir: Path, meta: Dict[str, Any]) -> Dict[str, Any]:
+        files = meta.get("files", {})
+        path = lambda kind: str(entry_dir / files[kind]) if kind in files else None
+        mesh_path = path("mesh")
+        return {
+            "key": meta.get("key", entry_dir.name),
+            "app_type": meta.get("app_type"),
+            "code": (entry_dir / files["code"]).read_text(encoding="utf-8"),
+            "stl_path": path("stl"),
+            "step_path": path("step"),
+            "mesh_bin": Path(mesh_path).read_bytes() if mesh_path else None,
+            "mesh_bounds": meta.get("mesh_bounds"),
+            "metadata": meta.get("metadata", {}),
+        }
+
+    def _evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà des limites"""
+        victims = []
+        with self._lock:
+            total = sum(self._entries.values())
+            while self._entries and (len(self._entries) > self.max_entries or total > self.max_bytes):
+                key, size = self._entries.popitem(last=False)
+                total -= size
+                victims.append(key)
+            self.evictions += len(victims)
+
+        for key in victims:
+            shutil.rmtree(self.root / key, ignore_errors=True)
+        if victims:
+            log.info(f"🧹 Template cache: evicted {len(victims)} entries")
+
+    def clear(self):
+        with self._lock:
+            keys = list(self._entries)
+            self._entries.clear()
+        for key in keys:
+            shutil.rmtree(self.root / key, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": sum(self._entries.values()),
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "template_version": template_version(),
+            }
+
+
+__all__ = ["TemplateCache", "cache_key", "normalize", "template_version"]
@@ -91,9 +91,10 @@ class CodeTemplates:
         
         code = f"""#!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import struct, math
+import math
 import numpy as np
 from pathlib import Path
+from stl_io import write_stl
 
 # ===== PARAMETERS =====
 LENGTH = {total_length}
@@ -109,26 +110,6 @@ STRAP_LENGTH = {strap_length}
 STRAP_HEIGHT = 8.0
 
 # ===== FUNCTIONS =====
-def compute_normals(tris):
-    v1 = tris[:,1] - tris[:,0]
-    v2 = tris[:,2] - tris[:,0]
-    n = np.cross(v1, v2)
-    lens = np.linalg.norm(n, axis=1)
-    lens[lens == 0] = 1.0
-    return (n.T / lens).T.astype(np.float32)
-
-def write_stl(path, tris):
-    tris = np.asarray(tris, dtype=np.float32)
-    norms = compute_normals(tris)
-    with open(path, "wb") as f:
-        f.write(b"Generated Splint" + b" " * 64)
-        f.write(struct.pack("<I", len(tris)))
-        for i in range(len(tris)):
-            nx, ny, nz = norms[i]
-            v1, v2, v3 = tris[i,0], tris[i,1], tris[i,2]
-            f.write(struct.pack("<12f", nx, ny, nz, *v1, *v2, *v3))
-            f.write(struct.pack("<H", 0))
-
 def find_section_params(v):
     for s in SECTIONS:
         if s['v_start'] <= v <= s['v_end']:
@@ -262,7 +243,7 @@ tris.extend(add_straps(inner, outer, STRAP_POSITIONS, STRAP_WIDTH, STRAP_LENGTH,
 
 output_dir = Path(__file__).parent / "output"
 output_dir.mkdir(exist_ok=True)
-write_stl(str(output_dir / "generated_splint.stl"), tris)
+write_stl(str(output_dir / "generated_splint.stl"), tris, header="Generated Splint")
 print(f"✅ STL: generated_splint.stl ({{len(tris)}} triangles)")
 """
         return code
@@ -285,6 +266,7 @@ print(f"✅ STL: generated_splint.stl ({{len(tris)}} triangles)")
 import math
 import cadquery as cq
 from pathlib import Path
+from cad_ops import bulk_fuse
 
 CFG = {{
     "outer_radius": {outer_radius},
@@ -358,23 +340,18 @@ def get_ring_points(cfg, z_center, phase_shift=0):
     return peaks, valleys
 
 def create_ring_struts(cfg, peaks, valleys):
-    stent = None
+    struts = []
     n = len(peaks)
     
     for i in range(n):
-        s1 = create_strut_between_points(cfg, peaks[i], valleys[i])
-        if s1:
-            stent = s1 if stent is None else stent.union(s1)
-        
+        struts.append(create_strut_between_points(cfg, peaks[i], valleys[i]))
         next_peak = peaks[(i + 1) % n]
-        s2 = create_strut_between_points(cfg, valleys[i], next_peak)
-        if s2:
-            stent = stent.union(s2) if stent else s2
+        struts.append(create_strut_between_points(cfg, valleys[i], next_peak))
     
-    return stent
+    return [s for s in struts if s is not None]
 
 def create_bridges_between_rings(cfg, rings_points):
-    bridges = None
+    bridges = []
     
     for ring_idx in range(len(rings_points) - 1):
         peaks1, valleys1 = rings_points[ring_idx]
@@ -384,16 +361,12 @@ def create_bridges_between_rings(cfg, rings_points):
         
         if ring_idx % 2 == 0:
             for i in range(n_peaks):
-                bridge = create_strut_between_points(cfg, peaks1[i], valleys2[i])
-                if bridge:
-                    bridges = bridge if bridges is None else bridges.union(bridge)
+                bridges.append(create_strut_between_points(cfg, peaks1[i], valleys2[i]))
         else:
             for i in range(n_peaks):
-                bridge = create_strut_between_points(cfg, valleys1[i], peaks2[i])
-                if bridge:
-                    bridges = bridge if bridges is None else bridges.union(bridge)
+                bridges.append(create_strut_between_points(cfg, valleys1[i], peaks2[i]))
     
-    return bridges
+    return [b for b in bridges if b is not None]
 
 def build_stent(cfg):
     n_rings = cfg["n_rings"]
@@ -403,7 +376,7 @@ def build_stent(cfg):
     total_height = (n_rings - 1) * ring_spacing
     z_start = -total_height / 2
     
-    stent = None
+    struts = []
     rings_points = []
     
     for ring_idx in range(n_rings):
@@ -412,16 +385,13 @@ def build_stent(cfg):
         
         peaks, valleys = get_ring_points(cfg, z, phase_shift)
         rings_points.append((peaks, valleys))
-        
-        ring = create_ring_struts(cfg, peaks, valleys)
-        if ring:
-            stent = ring if stent is None else stent.union(ring)
+        struts.extend(create_ring_struts(cfg, peaks, valleys))
     
-    bridges = create_bridges_between_rings(cfg, rings_points)
-    if bridges:
-        stent = stent.union(bridges)
+    struts.extend(create_bridges_between_rings(cfg, rings_points))
     
-    return stent
+    # Une seule fusion booléenne pour toutes les poutres (au lieu d'unions en chaîne)
+    print(f"Fusing {{len(struts)}} struts...")
+    return bulk_fuse(struts)
 
 print("Generating stent with diamond cells...")
 model = build_stent(CFG)
@@ -445,33 +415,14 @@ print(f"✅ STL: generated_stent.stl ({{CFG['n_rings']}} rings, {{CFG['n_peaks']
         n_arms = params.get('n_arms', 4)
         
         code = f"""#!/usr/bin/env python3
-import math, struct, numpy as np
+import math, numpy as np
 from pathlib import Path
+from stl_io import write_stl
 
 ARM_L, ARM_W = {arm_length}, {arm_width}
 CENTER_D, THICK = {center_diameter}, {thickness}
 N_ARMS = {n_arms}
 
-def compute_normals(tris):
-    v1, v2 = tris[:,1] - tris[:,0], tris[:,2] - tris[:,0]
-    n = np.cross(v1, v2)
-    lens = np.linalg.norm(n, axis=1)
-    lens[lens == 0] = 1.0
-    return (n.T / lens).T.astype(np.float32)
-
-def write_stl(path, tris):
-    tris = np.asarray(tris, dtype=np.float32)
-    norms = compute_normals(tris)
-    with open(path, "wb") as f:
-        header = f"Gripper {{N_ARMS}}-Armed".encode('ascii')
-        f.write(header + b" " * (80 - len(header)))
-        f.write(struct.pack("<I", len(tris)))
-        for i in range(len(tris)):
-            nx, ny, nz = norms[i]
-            v1, v2, v3 = tris[i,0], tris[i,1], tris[i,2]
-            f.write(struct.pack("<12f", nx, ny, nz, *v1, *v2, *v3))
-            f.write(struct.pack("<H", 0))
-
 def create_box(cx, cy, cz, w, h, d):
     hw, hh, hd = w/2, h/2, d/2
     v = [np.array([cx+x, cy+y, cz+z]) for x in [-hw,hw] for y in [-hh,hh] for z in [-hd,hd]]
@@ -529,7 +480,7 @@ for i in range(N_ARMS):
 
 output_dir = Path(__file__).parent / "output"
 output_dir.mkdir(exist_ok=True)
-write_stl(str(output_dir / "generated_gripper.stl"), tris)
+write_stl(str(output_dir / "generated_gripper.stl"), tris, header=f"Gripper {{N_ARMS}}-Armed")
 print(f"✅ STL: generated_gripper.stl ({{len(tris)}} triangles, {{N_ARMS}} arms)")
 """
         return code
@@ -547,89 +498,29 @@ print(f"✅ STL: generated_gripper.stl ({{len(tris)}} triangles, {{N_ARMS}} arms
         height = params.get('height', 100.0)
         
         code = f"""#!/usr/bin/env python3
-import math, struct, numpy as np
+import numpy as np
 from pathlib import Path
+from stl_io import write_stl
+from lattice import lattice_struts, strut_triangles
 
 CELL_TYPE = "{cell_type}"
 CELL_SIZE = {cell_size}
 STRUT_D = {strut_d}
 LEN, WID, HEI = {length}, {width}, {height}
-
-def compute_normals(tris):
-    v1, v2 = tris[:,1] - tris[:,0], tris[:,2] - tris[:,0]
-    n = np.cross(v1, v2)
-    lens = np.linalg.norm(n, axis=1)
-    lens[lens == 0] = 1.0
-    return (n.T / lens).T.astype(np.float32)
-
-def write_stl(path, tris):
-    tris = np.asarray(tris, dtype=np.float32)
-    norms = compute_normals(tris)
-    with open(path, "wb") as f:
-        header = f"Lattice {{CELL_TYPE.upper()}}".encode('ascii')
-        f.write(header + b" " * (80 - len(header)))
-        f.write(struct.pack("<I", len(tris)))
-        for i in range(len(tris)):
-            nx, ny, nz = norms[i]
-            v1, v2, v3 = tris[i,0], tris[i,1], tris[i,2]
-            f.write(struct.pack("<12f", nx, ny, nz, *v1, *v2, *v3))
-            f.write(struct.pack("<H", 0))
-
-def make_cyl(p1, p2, r, seg=8):
-    x1, y1, z1 = p1
-    x2, y2, z2 = p2
-    l = math.sqrt((x2-x1)**2 + (y2-y1)**2 + (z2-z1)**2)
-    if l < 0.001: return []
-    
-    tris = []
-    for i in range(seg):
-        a1 = 2 * math.pi * i / seg
-        a2 = 2 * math.pi * (i + 1) / seg
-        
-        rx1, ry1 = r * math.cos(a1), r * math.sin(a1)
-        rx2, ry2 = r * math.cos(a2), r * math.sin(a2)
-        
-        v1 = np.array([x1+rx1, y1+ry1, z1])
-        v2 = np.array([x1+rx2, y1+ry2, z1])
-        v3 = np.array([x2+rx2, y2+ry2, z2])
-        v4 = np.array([x2+rx1, y2+ry1, z2])
-        
-        tris.extend([
-            np.array([v1,v2,v3],dtype=np.float32),
-            np.array([v1,v3,v4],dtype=np.float32)
-        ])
-    return tris
-
-def cubic_cell(cx, cy, cz, s, r):
-    h = s / 2
-    nodes = [
-        (cx-h,cy-h,cz-h), (cx+h,cy-h,cz-h), (cx+h,cy+h,cz-h), (cx-h,cy+h,cz-h),
-        (cx-h,cy-h,cz+h), (cx+h,cy-h,cz+h), (cx+h,cy+h,cz+h), (cx-h,cy+h,cz+h)
-    ]
-    edges = [(0,1),(1,2),(2,3),(3,0),(4,5),(5,6),(6,7),(7,4),(0,4),(1,5),(2,6),(3,7)]
-    tris = []
-    for i, j in edges:
-        tris.extend(make_cyl(nodes[i], nodes[j], r))
-    return tris
+SEGMENTS = 8
 
 print(f"Generating {{CELL_TYPE.upper()}} lattice...")
 
-nx, ny, nz = int(LEN/CELL_SIZE), int(WID/CELL_SIZE), int(HEI/CELL_SIZE)
-tris = []
-r = STRUT_D / 2
+nx, ny, nz = max(1, int(LEN/CELL_SIZE)), max(1, int(WID/CELL_SIZE)), max(1, int(HEI/CELL_SIZE))
 
-for i in range(nx):
-    for j in range(ny):
-        for k in range(nz):
-            cx = (i + 0.5) * CELL_SIZE
-            cy = (j + 0.5) * CELL_SIZE
-            cz = (k + 0.5) * CELL_SIZE
-            tris.extend(cubic_cell(cx, cy, cz, CELL_SIZE, r))
+# Poutres uniques (arêtes partagées dédoublonnées) puis tous les cylindres en une passe
+struts = lattice_struts(CELL_TYPE, CELL_SIZE, (nx, ny, nz))
+tris = strut_triangles(struts, STRUT_D / 2, segments=SEGMENTS)
 
 output_dir = Path(__file__).parent / "output"
 output_dir.mkdir(exist_ok=True)
-write_stl(str(output_dir / "generated_lattice.stl"), tris)
-print(f"✅ STL: generated_lattice.stl ({{len(tris)}} triangles, {{nx}}x{{ny}}x{{nz}} cells)")
+write_stl(str(output_dir / "generated_lattice.stl"), tris, header=f"Lattice {{CELL_TYPE.upper()}}")
+print(f"✅ STL: generated_lattice.stl ({{len(tris):,}} triangles, {{len(struts):,}} struts, {{nx}}x{{ny}}x{{nz}} cells)")
 """
         return code
 
@@ -648,9 +539,9 @@ print(f"✅ STL: generated_lattice.stl ({{len(tris)}} triangles, {{nx}}x{{ny}}x{
         
         code = f"""#!/usr/bin/env python3
 import math
-import struct
 import numpy as np
 from pathlib import Path
+from stl_io import write_stl
 
 HEX_RADIUS = {hex_radius}
 W_FRAME = {w_frame}
@@ -660,28 +551,6 @@ TRI_THICKNESS = {tri_thickness}
 W_BAR = {w_bar}
 H_BAR = 10.0
 
-def compute_normals(tris):
-    v1 = tris[:,1] - tris[:,0]
-    v2 = tris[:,2] - tris[:,0]
-    n = np.cross(v1, v2)
-    lens = np.linalg.norm(n, axis=1)
-    lens[lens == 0] = 1.0
-    n = (n.T / lens).T
-    return n.astype(np.float32)
-
-def write_binary_stl(path, tris):
-    tris = np.asarray(tris, dtype=np.float32)
-    norms = compute_normals(tris)
-    with open(path, "wb") as f:
-        header = b"Generated Facade"
-        f.write(header + b" " * (80 - len(header)))
-        f.write(struct.pack("<I", tris.shape[0]))
-        for i in range(tris.shape[0]):
-            nx, ny, nz = norms[i].tolist()
-            v1, v2, v3 = tris[i,0].tolist(), tris[i,1].tolist(), tris[i,2].tolist()
-            f.write(struct.pack("<12f", nx, ny, nz, *v1, *v2, *v3))
-            f.write(struct.pack("<H", 0))
-
 def hexagon_points(radius):
     return [(radius * math.cos(i * math.pi / 3), 
              radius * math.sin(i * math.pi / 3)) 
@@ -780,7 +649,7 @@ output_dir = Path(__file__).parent / "output"
 output_dir.mkdir(exist_ok=True)
 stl_path = output_dir / "generated_facade.stl"
 tris_array = np.array(tris, dtype=np.float32)
-write_binary_stl(str(stl_path), tris_array)
+write_stl(str(stl_path), tris_array, header="Generated Facade")
 
 print(f"✅ STL: {{stl_path}} ({{len(tris):,}} triangles)")
 """
@@ -799,8 +668,9 @@ print(f"✅ STL: {{stl_path}} ({{len(tris):,}} triangles)")
         element_size = params.get('element_size', 200.0)
         
         code = f"""#!/usr/bin/env python3
-import math, struct, numpy as np
+import math, numpy as np
 from pathlib import Path
+from stl_io import write_stl
 
 PATTERN = "{pattern_type}"
 WIDTH = {width}
@@ -808,26 +678,6 @@ HEIGHT = {height}
 DEPTH = {depth}
 ELEM_SIZE = {element_size}
 
-def compute_normals(tris):
-    v1, v2 = tris[:,1] - tris[:,0], tris[:,2] - tris[:,0]
-    n = np.cross(v1, v2)
-    lens = np.linalg.norm(n, axis=1)
-    lens[lens == 0] = 1.0
-    return (n.T / lens).T.astype(np.float32)
-
-def write_stl(path, tris):
-    tris = np.asarray(tris, dtype=np.float32)
-    norms = compute_normals(tris)
-    with open(path, "wb") as f:
-        header = f"Facade {{PATTERN.upper()}}".encode('ascii')
-        f.write(header + b" " * (80 - len(header)))
-        f.write(struct.pack("<I", len(tris)))
-        for i in range(len(tris)):
-            nx, ny, nz = norms[i]
-            v1, v2, v3 = tris[i,0], tris[i,1], tris[i,2]
-            f.write(struct.pack("<12f", nx, ny, nz, *v1, *v2, *v3))
-            f.write(struct.pack("<H", 0))
-
 def wavy_panel(x, y, w, h):
     tris = []
     seg = 10
@@ -870,7 +720,7 @@ for i in range(ny):
 
 output_dir = Path(__file__).parent / "output"
 output_dir.mkdir(exist_ok=True)
-write_stl(str(output_dir / "generated_facade.stl"), tris)
+write_stl(str(output_dir / "generated_facade.stl"), tris, header=f"Facade {{PATTERN.upper()}}")
 print(f"✅ STL: generated_facade.stl ({{len(tris)}} triangles)")
 """
         return code
@@ -1030,6 +880,7 @@ print("✅ STL: generated_heatsink.stl")
 import math
 import cadquery as cq
 from pathlib import Path
+from cad_ops import bulk_fuse
 
 CFG = dict(
     width={width},
@@ -1059,6 +910,7 @@ def _triangle_prism(W, H, T, rf=0.0):
     return tri
 
 def _make_louver_field(W, H, T, angle_deg, pitch, slat_w, slat_d, end_r, z0):
+    # Une latte de base, copiée le long de la normale
     theta = math.radians(angle_deg)
     diag = math.hypot(W, H)
     L = diag * 2.1
@@ -1084,13 +936,10 @@ def _make_louver_field(W, H, T, angle_deg, pitch, slat_w, slat_d, end_r, z0):
               .rotate((0, 0, 0), (0, 0, 1), math.degrees(theta))
               .translate((cx, cy, z0)))  # DÉCALAGE ICI
     
-    field = None
     start = -(n_slats // 2)
-    for i in range(start, start + n_slats):
-        d = i * pitch
-        slat = base3d.translate((d*nx, d*ny, 0))
-        field = slat if field is None else field.union(slat)
-    return field
+    # Lattes disjointes: une seule fusion multi-outils
+    return bulk_fuse(base3d.translate((i*pitch*nx, i*pitch*ny, 0))
+                     for i in range(start, start + n_slats))
 
 def build(cfg=CFG):
     W, H, T = cfg["width"], cfg["height"], cfg["thickness"]
@@ -1144,11 +993,13 @@ print("✅ generated_facade.stl")
         depth = params.get('cell_depth', 40.0)
         corner_fillet = params.get('corner_fillet', 0.0)
         full_depth = params.get('full_depth', False)
+        mesh_only = params.get('mesh_only', False)
         
         code = f"""#!/usr/bin/env python3
-import cadquery as cq
 import math
 from pathlib import Path
+from honeycomb import hex_centers, inner_radius, honeycomb_triangles
+from stl_io import write_stl
 
 W = {W}
 H = {H}
@@ -1158,79 +1009,54 @@ WALL = {wall}
 DEPTH = {depth}
 CORNER_FILLET = {corner_fillet}
 FULL_DEPTH = {full_depth}
-
-def hex_vertices_flat_top(a):
-    r = a
-    s = (math.sqrt(3)/2.0) * a
-    return [
-        (r, 0.0),
-        (r/2.0, s),
-        (-r/2.0, s),
-        (-r, 0.0),
-        (-r/2.0, -s),
-        (r/2.0, -s),
-    ]
-
-def make_hex_face(a, wall):
-    verts = hex_vertices_flat_top(a)
-    outer = cq.Workplane("XY").polyline(verts).close()
-    inner = outer.offset2D(-wall)
-    face = (outer
-            .toPending()
-            .consolidateWires()
-            .add(inner.wires())
-            .toPending()
-            .consolidateWires())
-    return face
-
-def honeycomb_field(w, h, t, a, wall, depth, z0=0.0):
-    dx = 1.5 * a
-    dy = math.sqrt(3.0) * a
-    
-    half_w = a
-    half_h = dy/2.0
-    
-    cell2d = make_hex_face(a, wall)
-    cell3d = cell2d.extrude(depth).translate((0, 0, z0))
-    
-    nx = int(math.ceil((w + 2*half_w) / dx)) + 2
-    ny = int(math.ceil((h + 2*half_h) / dy)) + 2
-    
-    solids = None
-    x0 = 0.0
-    y0 = 0.0
-    
-    for i in range(nx):
-        cx = x0 + i*dx
-        col_off = (dy/2.0) if (i % 2) else 0.0
-        for j in range(ny):
-            cy = y0 + j*dy + col_off
-            
-            if not ((x0 + half_w) <= cx <= (w - half_w) and
-                    (y0 + half_h) <= cy <= (h - half_h)):
-                continue
-            
-            c = cell3d.translate((cx, cy, 0.0))
-            solids = c if solids is None else solids.union(c)
-    
-    return solids if solids is not None else cq.Workplane("XY")
+MESH_ONLY = {mesh_only}  # True: maillage NumPy direct (STL seulement, pas de B-Rep)
+
+def make_cell(a, wall, depth, z0=0.0):
+    # Anneau hexagonal (sommet plat) extrudé: un seul solide, copié ensuite
+    outer = cq.Workplane("XY").polygon(6, 2 * a).val()
+    inner = cq.Workplane("XY").polygon(6, 2 * inner_radius(a, wall)).val()
+    cell = cq.Solid.extrudeLinear(outer, [inner], cq.Vector(0, 0, depth))
+    return cell.translate(cq.Vector(0, 0, z0))
+
+def honeycomb_field(centers, a, wall, depth, z0=0.0):
+    if len(centers) == 0:
+        return cq.Workplane("XY")
+    cell = make_cell(a, wall, depth, z0)
+    cells = [cell.translate(cq.Vector(cx, cy, 0.0)) for cx, cy in centers.tolist()]
+    # Une seule fusion multi-outils (les cellules se touchent par leurs parois)
+    return bulk_fuse(cells, glue=True)
 
 print("Generating honeycomb panel...")
 
 depth_final = T if FULL_DEPTH else DEPTH
 z0 = 0.0
 
-panel = cq.Workplane("XY").rect(W, H, centered=False).extrude(T)
-if CORNER_FILLET > 0:
-    panel = panel.edges("|Z").fillet(CORNER_FILLET)
-
-honey = honeycomb_field(W, H, T, CELL_SIZE, WALL, depth_final, z0)
-
-model = honey.intersect(panel)
+centers = hex_centers(W, H, CELL_SIZE)
+print(f"{{len(centers)}} cells")
 
 output_dir = Path(__file__).parent / "output"
 output_dir.mkdir(exist_ok=True)
-cq.exporters.export(model.val(), str(output_dir / "generated_facade.stl"))
+
+if MESH_ONLY:
+    # Cellules entièrement dans le panneau en XY; en Z, même découpe que
+    # honey.intersect(panel): les cellules s'arrêtent à l'épaisseur T
+    z_bottom, z_top = max(z0, 0.0), min(z0 + depth_final, T)
+    tris = honeycomb_triangles(centers, CELL_SIZE, WALL, z_top - z_bottom, z_bottom)
+    write_stl(str(output_dir / "generated_facade.stl"), tris, header="Honeycomb Panel")
+else:
+    # CadQuery seulement pour le B-Rep (le maillage direct s'en passe)
+    import cadquery as cq
+    from cad_ops import bulk_fuse
+
+    panel = cq.Workplane("XY").rect(W, H, centered=False).extrude(T)
+    if CORNER_FILLET > 0:
+        panel = panel.edges("|Z").fillet(CORNER_FILLET)
+
+    honey = honeycomb_field(centers, CELL_SIZE, WALL, depth_final, z0)
+
+    model = honey.intersect(panel)
+    cq.exporters.export(model.val(), str(output_dir / "generated_facade.stl"))
+
 print("✅ STL: generated_facade.stl (Honeycomb Panel)")
 """
         return code
@@ -1253,6 +1079,7 @@ print("✅ STL: generated_facade.stl (Honeycomb Panel)")
 import cadquery as cq
 import math
 from pathlib import Path
+from cad_ops import bulk_fuse
 
 L = {panel_length}
 H = {panel_height}
@@ -1269,23 +1096,25 @@ base = cq.Workplane("XY").rect(L, H).extrude(BASE_THICK)
 
 freq = 2.0 * math.pi / (L * PERIOD_RATIO)
 
-ribs = cq.Workplane("XY")
 x0 = -L/2
+fins = []
 for i in range(N_FINS):
-    x = x0 + i*(L/(N_FINS-1))
+    x = x0 + i*(L/max(N_FINS-1, 1))
     off0 = AMP * math.sin(freq*(x + 0.00*L))
     off1 = AMP * math.sin(freq*(x + 0.25*L))
-    fin = (cq.Workplane("XY")
-           .center(x, off0).rect(FIN_T, H)
-           .workplane(offset=DEPTH).center(0, off1-off0).rect(FIN_T, H)
-           .loft(ruled=True, combine=True))
-    ribs = ribs.union(fin)
+    fins.append(cq.Workplane("XY")
+                .center(x, off0).rect(FIN_T, H)
+                .workplane(offset=DEPTH).center(0, off1-off0).rect(FIN_T, H)
+                .loft(ruled=True, combine=True))
 
+# Ailettes collectées puis fusionnées en une fois (pas de chaîne d'unions)
+ribs = bulk_fuse(fins)
 clip = cq.Workplane("XY").rect(L, H).extrude(DEPTH + BASE_THICK + 6.0)
 model = base.union(ribs.intersect(clip))
 
 output_dir = Path(__file__).parent / "output"
 output_dir.mkdir(exist_ok=True)
+
 cq.exporters.export(model.val(), str(output_dir / "generated_facade.stl"))
 print("✅ STL: generated_facade.stl")
 """
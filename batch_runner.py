@@ -21,6 +21,7 @@ sys.path.insert(0, str(Path(__file__).parent / "backend"))
 
 from multi_agent_system import OrchestratorAgent
 from agents import AnalystAgent, GeneratorAgent, ValidatorAgent
+from llm_cache import shared_llm_cache
 
 
 # Default list of CAD prompts (used if prompts.json doesn't exist)
@@ -82,10 +83,15 @@ class BatchRunner:
         self.output_dir = output_dir or Path(__file__).parent / "batch_results"
         self.output_dir.mkdir(exist_ok=True)
 
+        # Replay mode: Architect (0.7) and Planner (0.5) responses are cached too,
+        # so re-running the same batch does not call Ollama again
+        shared_llm_cache().replay = True
+
         # Initialize the three base agents
         analyst = AnalystAgent()
         generator = GeneratorAgent()
         validator = ValidatorAgent()
+        self.validator = validator
 
         # Create orchestrator with the required agents
         self.orchestrator = OrchestratorAgent(analyst, generator, validator)
@@ -183,10 +189,14 @@ class BatchRunner:
         overall_start = datetime.now()
         total_prompts = len(prompts)
 
-        # Execute each prompt
-        for i, prompt in enumerate(prompts):
-            result = await self.run_single_prompt(prompt, i, total_prompts)
-            self.results.append(result)
+        # Execute each prompt (warm execution workers once for the whole batch)
+        await self.validator.start()
+        try:
+            for i, prompt in enumerate(prompts):
+                result = await self.run_single_prompt(prompt, i, total_prompts)
+                self.results.append(result)
+        finally:
+            await self.validator.close()
 
         overall_end = datetime.now()
         total_time = (overall_end - overall_start).total_seconds()
@@ -2,6 +2,7 @@
 let scene, camera, renderer, axesHelper = null, model = null;
 let wireframeMode = false;
 let currentCode = '';
+let currentJobId = null;
 
 // ===== ContrÃ´les manuels =====
 let isDragging = false;
@@ -805,6 +806,26 @@ function loadSelectedExample() {
 }
 
 // ==== Mesh Loader ====
+// mesh.bin: en-tête 40 octets (magic "CMSH", version, flags, nb sommets, nb triangles,
+// bounds) puis float32 positions et uint32 index, little-endian (voir mesh_ops.py)
+function parseMeshBinary(buffer) {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== 'CMSH') throw new Error('Invalid mesh.bin payload');
+
+    const vertexCount = view.getUint32(8, true);
+    const triangleCount = view.getUint32(12, true);
+    const vertices = new Float32Array(buffer, 40, vertexCount * 3);
+    const faces = new Uint32Array(buffer, 40 + vertexCount * 12, triangleCount * 3);
+    return { vertices, faces, normals: [] };
+}
+
+async function loadMeshFromUrl(url) {
+    const r = await fetch(`${BACKEND_URL}${url}`);
+    if (!r.ok) throw new Error(`Mesh download failed: HTTP ${r.status}`);
+    loadMesh(parseMeshBinary(await r.arrayBuffer()));
+}
+
 function loadMesh(mesh) {
     if (model) {
         scene.remove(model);
@@ -814,10 +835,13 @@ function loadMesh(mesh) {
     }
 
     const geometry = new THREE.BufferGeometry();
-    geometry.setAttribute('position', new THREE.Float32BufferAttribute(mesh.vertices, 3));
+    // TypedArray (mesh.bin) utilisé tel quel, sans copie
+    const positions = mesh.vertices instanceof Float32Array ? mesh.vertices : new Float32Array(mesh.vertices);
+    geometry.setAttribute('position', new THREE.BufferAttribute(positions, 3));
     if (mesh.normals && mesh.normals.length)
         geometry.setAttribute('normal', new THREE.Float32BufferAttribute(mesh.normals, 3));
-    geometry.setIndex(mesh.faces);
+    const index = mesh.faces instanceof Uint32Array ? mesh.faces : new Uint32Array(mesh.faces);
+    geometry.setIndex(new THREE.BufferAttribute(index, 1));
     geometry.computeVertexNormals();
     geometry.computeBoundingSphere();
 
@@ -878,6 +902,8 @@ async function generateCAD() {
     loadingIndicator.classList.remove('hidden');
 
     currentCode = '';
+    currentJobId = null;
+    setCodePanel('');
     updateProgress(0, 'Starting...');
 
     try {
@@ -921,29 +947,51 @@ async function generateCAD() {
                     const data = JSON.parse(dataStr);
                     console.log('SSE event:', data.type || 'unknown');
 
-                    if (data.type === 'status') {
+                    if (data.type === 'job') {
+                        currentJobId = data.job_id;
+                    }
+                    else if (data.type === 'status') {
                         updateProgress(lastProgress + 10, data.message);
                         lastProgress = Math.min(lastProgress + 10, 90);
                     }
+                    else if (data.type === 'code_delta') {
+                        // Code being synthesized: shown live, replaced by the final 'code' event
+                        currentCode += data.delta;
+                        appendCodePanel(data.delta);
+                        const lines = currentCode.split('\n').length;
+                        updateProgress(60, `Synthesizing code... (${lines} lines)`);
+                    }
                     else if (data.type === 'code') {
                         const code = decodeEscapedString(data.code);
                         currentCode = code;
+                        setCodePanel(code);
                         updateProgress(60, 'Code generated');
                     }
                     else if (data.type === 'complete') {
                         if (data.success) {
                             updateProgress(100, 'Complete!');
 
-                            if (data.code) currentCode = data.code;
-                            if (data.mesh) loadMesh(data.mesh);
+                            if (data.job_id) currentJobId = data.job_id;
+                            if (data.code) {
+                                currentCode = data.code;
+                                setCodePanel(data.code);
+                            }
+                            if (data.mesh_url) await loadMeshFromUrl(data.mesh_url);
+                            else if (data.mesh) loadMesh(data.mesh);
                             if (data.analysis) displayAnalysis(data.analysis);
                             if (data.parameters) displayParameters(data.parameters);
 
+                            // Model ready: unlock the UI, design notes may still arrive on the stream
+                            resetGenerateUI();
+
                             console.log('âœ… Generation successful!');
                         } else {
                             throw new Error(data.errors?.join(', ') || 'Generation failed');
                         }
                     }
+                    else if (data.type === 'design_notes') {
+                        if (data.job_id === currentJobId) displayDesignNotes(data.notes);
+                    }
                     else if (data.type === 'error') {
                         throw new Error(data.errors?.join(', ') || 'Unknown error');
                     }
@@ -959,19 +1007,64 @@ async function generateCAD() {
         showError(`Generation failed: ${error.message}`);
         updateProgress(0, 'Failed');
     } finally {
-        setTimeout(() => {
-            progressDiv.classList.add('hidden');
+        resetGenerateUI();
+    }
+}
+
+function resetGenerateUI() {
+    const generateBtn = document.getElementById('generateBtn');
+    const progressDiv = document.getElementById('progress');
+    const loadingIndicator = document.getElementById('loadingIndicator');
+
+    setTimeout(() => {
+        progressDiv?.classList.add('hidden');
+        if (generateBtn) {
             generateBtn.disabled = false;
             generateBtn.classList.remove('opacity-50');
-            loadingIndicator.classList.add('hidden');
-        }, 1000);
-    }
+        }
+        loadingIndicator?.classList.add('hidden');
+    }, 1000);
+}
+
+function displayDesignNotes(notes) {
+    const el = document.getElementById('analysis');
+    if (!el || !notes) return;
+
+    const card = document.createElement('div');
+    card.className = 'bg-white/10 rounded-lg p-4';
+    const title = document.createElement('h3');
+    title.className = 'text-lg font-bold text-white mb-2';
+    title.textContent = 'Design Notes';
+    const body = document.createElement('p');
+    body.className = 'text-gray-300 text-sm whitespace-pre-line';
+    body.textContent = notes;
+    card.append(title, body);
+    el.appendChild(card);
+}
+
+// ==== Code Panel ====
+function setCodePanel(code) {
+    const el = document.getElementById('codeOutput');
+    if (!el) return;
+    el.textContent = code;
+    el.scrollTop = 0;
+}
+
+function appendCodePanel(delta) {
+    const el = document.getElementById('codeOutput');
+    if (!el) return;
+    el.textContent += delta;
+    el.scrollTop = el.scrollHeight;
 }
 
 // ==== Export Functions ====
 async function exportSTL() {
     try {
-        const r = await fetch(`${BACKEND_URL}/api/export/stl`);
+        if (!currentJobId) {
+            showError('No STL file available');
+            return;
+        }
+        const r = await fetch(`${BACKEND_URL}/api/jobs/${currentJobId}/stl`);
         if (!r.ok) {
             showError('No STL file available');
             return;
@@ -989,7 +1082,11 @@ async function exportSTL() {
 
 async function exportSTEP() {
     try {
-        const r = await fetch(`${BACKEND_URL}/api/export/step`);
+        if (!currentJobId) {
+            showError('No STEP file available');
+            return;
+        }
+        const r = await fetch(`${BACKEND_URL}/api/jobs/${currentJobId}/step`);
         if (!r.ok) {
             showError('No STEP file available');
             return;
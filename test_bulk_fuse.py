@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test de la fusion groupée des poutres du stent (un seul BRepAlgoAPI_Fuse)
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from templates import CodeTemplates
+
+
+def test_stent_template_uses_bulk_fuse():
+    """Le template collecte les poutres et fusionne une seule fois"""
+    print("\n" + "=" * 80)
+    print("TEST: stent template bulk fuse")
+    print("=" * 80)
+
+    code = CodeTemplates.generate_stent({"parameters": {"n_peaks": 8, "n_rings": 12}})
+    compile(code, "<stent>", "exec")
+    assert "from cad_ops import bulk_fuse" in code
+    assert ".union(" not in code
+    assert "return bulk_fuse(struts)" in code
+    print("✅ No incremental .union() chain in the stent template")
+
+
+def test_facade_templates_use_bulk_fuse():
+    """Lattes et ailettes fusionnées en une fois, sans NumPy ni moteur d'instanciation"""
+    louvre = CodeTemplates.generate_louvre_wall({"parameters": {}})
+    fins = CodeTemplates.generate_sine_wave_fins({"parameters": {}})
+    for name, code in (("louvre_wall", louvre), ("sine_wave_fins", fins)):
+        compile(code, f"<{name}>", "exec")
+        assert "from cad_ops import bulk_fuse" in code
+        assert "numpy" not in code and "instanc" not in code
+        assert "= field.union(" not in code and "ribs.union(" not in code
+    assert "return bulk_fuse(base3d.translate(" in louvre and "ribs = bulk_fuse(fins)" in fins
+    print("✅ Louvre and fin templates fuse their repeated features once")
+
+
+def test_bulk_fuse_matches_union_chain():
+    """bulk_fuse donne le même volume que la chaîne d'unions"""
+    try:
+        import cadquery as cq
+    except ImportError:
+        print("⚠️ cadquery not installed, skipping geometric check")
+        return
+
+    from cad_ops import bulk_fuse
+
+    boxes = [cq.Workplane("XY").box(4, 1, 1).translate((i * 3.0, 0, 0)) for i in range(20)]
+
+    start = time.perf_counter()
+    chained = boxes[0]
+    for b in boxes[1:]:
+        chained = chained.union(b)
+    t_chain = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fused = bulk_fuse(boxes + [None])
+    t_bulk = time.perf_counter() - start
+
+    assert len(fused.solids().vals()) == 1
+    assert abs(fused.val().Volume() - chained.val().Volume()) < 1e-6
+    print(f"✅ Same solid: chain {t_chain:.2f}s, bulk {t_bulk:.2f}s")
+
+    assert bulk_fuse([]) is None
+    single = bulk_fuse([boxes[0]])
+    assert abs(single.val().Volume() - 4.0) < 1e-9
+
+
+if __name__ == "__main__":
+    test_stent_template_uses_bulk_fuse()
+    test_facade_templates_use_bulk_fuse()
+    test_bulk_fuse_matches_union_chain()
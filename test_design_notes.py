@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Test du commentaire LLM du DesignExpert hors chemin critique:
+règles seules dans la validation, notes livrées après l'event complete
+"""
+import sys
+import json
+import asyncio
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import main
+from main import GenerateRequest, generate_endpoint
+from job_store import JobStore
+from multi_agent_system import DesignExpertAgent, OrchestratorAgent, AgentResult, AgentStatus
+from cot_agents import GeneratedCode, DesignAnalysis, ConstructionPlan
+from prompt_cache import PromptCache
+from template_cache import TemplateCache
+from plan_cache import PlanCache
+from few_shot_index import FewShotIndex
+
+
+class FakeLLM:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def generate(self, prompt, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return "Walls are thick enough for FDM printing."
+
+
+class FakeRequest:
+    async def is_disconnected(self):
+        return False
+
+
+class NotesOrchestrator:
+    """Orchestrateur factice dont les notes arrivent après le résultat"""
+
+    async def execute_workflow(self, prompt, progress_callback=None, cache="use", on_design_notes=None):
+        async def deliver():
+            await asyncio.sleep(0.2)
+            await on_design_notes("Consider a 2 mm fillet on the base.")
+
+        self.delivery = asyncio.create_task(deliver())
+        return {"success": True, "mesh": None, "analysis": {}, "code": "x = 1\n", "app_type": "model",
+                "design_notes_pending": True}
+
+
+def test_rules_do_not_wait_for_llm():
+    """En mode background, validate_design ne fait aucun appel LLM"""
+    print("\n" + "=" * 80)
+    print("TEST: DesignExpert rule check without LLM")
+    print("=" * 80)
+
+    agent = DesignExpertAgent()
+    agent.llm = FakeLLM(delay=30.0)
+    agent.notes_mode = "background"
+    analysis = {"type": "heatsink", "parameters": {"plate_w": 40.0}}
+
+    result = asyncio.run(asyncio.wait_for(agent.validate_design(analysis), timeout=2))
+    assert result.status == AgentStatus.SUCCESS
+    assert result.data["llm_analysis"] is None
+    assert agent.llm.calls == 0
+    print("✅ Rule check returned without waiting for the LLM")
+
+    agent.llm = FakeLLM()
+    assert asyncio.run(agent.design_notes(analysis)).startswith("Walls")
+    print("✅ design_notes() produces the commentary on demand")
+
+
+def test_design_notes_event_after_complete():
+    """L'event design_notes suit complete et les notes sont rangées dans meta.json du job"""
+    print("\n" + "=" * 80)
+    print("TEST: design_notes SSE event")
+    print("=" * 80)
+
+    async def run():
+        main.orchestrator = NotesOrchestrator()
+        response = await generate_endpoint(GenerateRequest(prompt="a cube"), FakeRequest())
+        return [json.loads(e[6:]) async for e in response.body_iterator if e.startswith("data: ")]
+
+    original = main.orchestrator, main.job_store
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            main.job_store = JobStore(Path(tmp))
+            events = asyncio.run(run())
+            types = [e["type"] for e in events]
+            assert types == ["job", "complete", "design_notes"], types
+            assert events[1]["design_notes_pending"] is True
+            job_id = events[1]["job_id"]
+            assert events[2] == {"type": "design_notes", "job_id": job_id,
+                                 "notes": "Consider a 2 mm fillet on the base."}
+            assert main.job_store.get_meta(job_id)["design_notes"].startswith("Consider")
+            print(f"✅ Events: {types}, notes attached to job {job_id}")
+    finally:
+        main.orchestrator, main.job_store = original
+
+
+class NotesDesign:
+    """DesignExpert factice: règles immédiates, commentaire LLM un peu plus tard"""
+
+    notes_mode = "background"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def validate_design(self, analysis):
+        return AgentResult(status=AgentStatus.SUCCESS, data={})
+
+    async def design_notes(self, analysis):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return "Wall thickness is fine."
+
+
+class Constraints:
+    async def validate_constraints(self, analysis):
+        return AgentResult(status=AgentStatus.SUCCESS, data={"violations": []})
+
+
+class Analyst:
+    async def analyze(self, prompt):
+        return {"type": "bracket", "parameters": {}}
+
+
+class Validator:
+    async def validate_and_execute(self, code, app_type="model"):
+        return {"success": True, "mesh": None, "analysis": {}, "stl_path": None, "step_path": None}
+
+
+class LLMAgents:
+    """Architect, Planner et Synthesizer factices"""
+
+    async def analyze_design(self, prompt):
+        return DesignAnalysis("bracket", ["box"], ["extrude"], {}, "simple", "")
+
+    async def create_plan(self, analysis, prompt):
+        return ConstructionPlan([{"operation": "extrude"}], {}, [], 1)
+
+    def fast_path(self, prompt):
+        return None
+
+    async def generate_code(self, plan, analysis, on_token=None):
+        code = "import cadquery as cq\nresult = cq.Workplane('XY').box(10, 10, 10)\n"
+        return GeneratedCode(code, "python", ["box"], 0.8)
+
+
+def test_orchestrator_owns_notes_task():
+    """Pas de Task dans le résultat: l'orchestrateur livre les notes au callback, ou ne les calcule pas"""
+    print("\n" + "=" * 80)
+    print("TEST: design notes delivered by the orchestrator")
+    print("=" * 80)
+
+    async def run(tmp, with_callback):
+        orchestrator = OrchestratorAgent(Analyst(), None, Validator())
+        orchestrator.design_expert = design = NotesDesign()
+        orchestrator.constraint_validator = Constraints()
+        orchestrator.architect = orchestrator.planner = orchestrator.code_synthesizer = LLMAgents()
+        orchestrator.template_cache = TemplateCache(enabled=False)
+        orchestrator.prompt_cache = PromptCache(enabled=False)
+        orchestrator.plan_cache = PlanCache(Path(tmp), enabled=False)
+        orchestrator.few_shot_index = FewShotIndex(Path(tmp) / "history.jsonl")
+
+        received = asyncio.get_running_loop().create_future()
+
+        async def on_design_notes(notes):
+            received.set_result(notes)
+
+        result = await orchestrator.execute_workflow(
+            "a bracket", on_design_notes=on_design_notes if with_callback else None)
+        assert result["success"], result
+        assert not any(isinstance(value, asyncio.Future) for value in result.values())
+        if not with_callback:
+            await asyncio.sleep(0.1)
+            return result, design, None, orchestrator
+
+        notes = await asyncio.wait_for(received, timeout=2)
+        await asyncio.sleep(0)
+        return result, design, notes, orchestrator
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result, design, notes, orchestrator = asyncio.run(run(tmp, True))
+        assert result["design_notes_pending"] is True
+        assert notes == "Wall thickness is fine."
+        assert not orchestrator._notes_tasks
+        print("✅ Notes delivered through on_design_notes, no Task in the result")
+
+        result, design, notes, orchestrator = asyncio.run(run(tmp, False))
+        assert "design_notes_pending" not in result and design.calls == 0
+        print("✅ No callback (batch runner): notes not computed")
+
+
+if __name__ == "__main__":
+    test_rules_do_not_wait_for_llm()
+    test_design_notes_event_after_complete()
+    test_orchestrator_owns_notes_task()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Test du pool de workers d'exécution: le code généré tourne hors de l'event loop,
+avec timeout, recyclage et remplacement des workers.
+"""
+import os
+import sys
+import asyncio
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import exec_pool
+import exec_worker
+from exec_pool import ExecPool
+from exec_worker import run_job
+from agents import ValidatorAgent
+from templates import CodeTemplates
+from stl_io import read_stl
+
+
+def test_pool_runs_code_and_reports_errors():
+    """Succès, stdout capturé et erreurs au format 'Execution: Type: msg'"""
+    print("\n" + "=" * 80)
+    print("TEST: ExecPool success + error propagation")
+    print("=" * 80)
+
+    async def run():
+        pool = ExecPool(size=2, max_jobs_per_worker=50, timeout=30)
+        try:
+            ok = await pool.run("print(sum(range(5)))")
+            assert ok["success"], ok
+            assert ok["stdout"].strip() == "10"
+            print("✅ Code executed in a worker")
+
+            ko = await pool.run("1 / 0")
+            assert not ko["success"]
+            assert ko["errors"][0].startswith("Execution: ZeroDivisionError"), ko
+            print(f"✅ Error propagated: {ko['errors'][0]}")
+
+            results = await asyncio.gather(*(pool.run(f"print({i} * 2)") for i in range(4)))
+            assert [r["stdout"].strip() for r in results] == ["0", "2", "4", "6"]
+            print("✅ Concurrent jobs dispatched to the pool")
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+
+def test_timeout_kills_and_replaces_worker():
+    """Un job trop long tue son worker; le pool reste utilisable"""
+    print("\n" + "=" * 80)
+    print("TEST: ExecPool timeout")
+    print("=" * 80)
+
+    async def run():
+        pool = ExecPool(size=1, timeout=30)
+        try:
+            res = await pool.run("while True:\n    pass\n", timeout=1)
+            assert not res["success"]
+            assert "TimeoutError" in res["errors"][0]
+            print("✅ Runaway job stopped")
+
+            res = await pool.run("print('alive')")
+            assert res["success"] and res["stdout"].strip() == "alive"
+            print("✅ Worker replaced after timeout")
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+
+def test_worker_recycled_after_k_jobs():
+    """Le worker est remplacé après max_jobs_per_worker jobs"""
+    async def run():
+        pool = ExecPool(size=1, max_jobs_per_worker=2, timeout=30)
+        try:
+            code = "import os\nprint(os.getpid())"
+            pids = [(await pool.run(code))["stdout"].strip() for _ in range(4)]
+            assert pids[0] == pids[1]
+            assert pids[2] == pids[3]
+            assert pids[1] != pids[2]
+            print(f"✅ Workers recycled: {pids}")
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+
+def test_exported_files_are_reported():
+    """Le résultat contient exactement les fichiers écrits par le script (pas de glob)"""
+    print("\n" + "=" * 80)
+    print("TEST: execution-result protocol (stl_path / step_path)")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        exec_file = str(Path(tmp) / "temp_exec.py")
+        code = (
+            "out = Path(__file__).parent / 'output'\n"
+            "out.mkdir(exist_ok=True)\n"
+            "(out / 'decoy.stl').write_bytes(b'x')\n"   # hors protocole: ignoré
+            "with open(out / 'first.stl', 'wb') as f:\n"
+            "    f.write(b'solid a')\n"
+            "with open(out / 'part.stl', 'wb') as f:\n"
+            "    f.write(b'solid b')\n"
+            "(out / 'part.step').write_text('ISO')\n"
+            "register_output(out / 'part.step')\n"
+            "with open(out / 'notes.txt', 'w') as f:\n"
+            "    f.write('ok')\n"
+        )
+
+        res = run_job({"code": code, "file": exec_file})
+        assert res["success"], res
+        assert res["stl_path"] == str(Path(tmp) / "output" / "part.stl")
+        assert res["step_path"] == str(Path(tmp) / "output" / "part.step")
+        print(f"✅ Inline: {Path(res['stl_path']).name}, {Path(res['step_path']).name}")
+
+        async def run():
+            pool = ExecPool(size=1, timeout=30)
+            try:
+                return await pool.run(code, exec_file=exec_file)
+            finally:
+                await pool.close()
+
+        res = asyncio.run(run())
+        assert res["stl_path"].endswith("part.stl"), res
+        print("✅ Worker returns the exact exported paths")
+
+        res = run_job({"code": "x = 1", "file": exec_file})
+        assert res["stl_path"] is None and res["step_path"] is None
+        print("✅ No export → no path")
+
+
+def test_oversized_reply_recycles_worker():
+    """Réponse plus longue que la limite de lecture: erreur, worker remplacé, pas d'octets périmés"""
+    print("\n" + "=" * 80)
+    print("TEST: ExecPool oversized reply")
+    print("=" * 80)
+
+    async def run():
+        pool = ExecPool(size=1, timeout=30)
+        try:
+            res = await pool.run("print('x' * 200000)")
+            assert not res["success"] and "WorkerProtocolError" in res["errors"][0], res
+            print(f"✅ {res['errors'][0][:80]}")
+
+            res = await pool.run("print('next')")
+            assert res["success"] and res["stdout"].strip() == "next", res
+            print("✅ Next job gets a fresh worker")
+        finally:
+            await pool.close()
+
+    original = exec_pool._READ_LIMIT
+    exec_pool._READ_LIMIT = 64 * 1024
+    try:
+        asyncio.run(run())
+    finally:
+        exec_pool._READ_LIMIT = original
+
+
+class FlakyPool(ExecPool):
+    """Pool dont le démarrage des workers échoue tant que `broken` est vrai"""
+
+    broken = False
+
+    async def _spawn(self):
+        if self.broken:
+            raise RuntimeError("Execution worker failed to start")
+        return await super()._spawn()
+
+
+def test_failed_respawn_does_not_hang():
+    """Relance impossible: les jobs échouent vite au lieu d'attendre un worker qui ne viendra pas"""
+    print("\n" + "=" * 80)
+    print("TEST: ExecPool respawn failure")
+    print("=" * 80)
+
+    async def run():
+        pool = FlakyPool(size=1, timeout=30)
+        try:
+            await pool.start()
+            pool.broken = True
+            res = await pool.run("while True:\n    pass\n", timeout=1)
+            assert "TimeoutError" in res["errors"][0]
+
+            res = await asyncio.wait_for(pool.run("print('x')"), timeout=10)
+            assert not res["success"] and "WorkerUnavailable" in res["errors"][0], res
+            print(f"✅ Fails fast: {res['errors'][0]}")
+
+            pool.broken = False
+            res = await asyncio.wait_for(pool.run("print('back')"), timeout=30)
+            assert res["success"] and res["stdout"].strip() == "back", res
+            print("✅ Pool recovers once workers start again")
+        finally:
+            await pool.close()
+
+    original = exec_pool._RESPAWN_BACKOFF
+    exec_pool._RESPAWN_BACKOFF = (0.01, 0.01)
+    try:
+        asyncio.run(run())
+    finally:
+        exec_pool._RESPAWN_BACKOFF = original
+
+
+class PartialStartPool(ExecPool):
+    """Pool dont le N-ième démarrage de worker échoue"""
+
+    fail_at = 2
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.spawned = 0
+
+    async def _spawn(self):
+        self.spawned += 1
+        if self.spawned == self.fail_at:
+            await asyncio.sleep(0.5)  # les autres workers ont eu le temps de démarrer
+            raise RuntimeError("Execution worker failed to start")
+        return await super()._spawn()
+
+
+def test_failed_start_stops_started_workers():
+    """Échec au démarrage du pool: les workers déjà lancés sont arrêtés, l'erreur remonte"""
+    print("\n" + "=" * 80)
+    print("TEST: ExecPool partial start")
+    print("=" * 80)
+
+    async def run():
+        pool = PartialStartPool(size=3, timeout=30)
+        try:
+            await pool.start()
+        except RuntimeError as e:
+            error = e
+        else:
+            raise AssertionError("start() should fail")
+        assert "failed to start" in str(error)
+        assert not pool._workers and not pool._started
+        print(f"✅ start() raised ({error}) and left no worker running")
+
+    asyncio.run(run())
+
+
+def test_inline_mode():
+    """EXEC_POOL_SIZE=0: run_job exécute directement avec le même format de résultat"""
+    pool = ExecPool(size=0)
+    assert not pool.enabled
+
+    res = run_job({"code": "x = math.sqrt(16)\nprint(int(x))"})
+    assert res["success"] and res["stdout"].strip() == "4"
+    res = run_job({"code": "raise ValueError('bad')"})
+    assert res["errors"] == ["Execution: ValueError: bad"]
+    print("✅ Inline execution works without the pool")
+
+
+def test_inline_jobs_do_not_mix():
+    """Jobs inline concurrents (asyncio.to_thread): chacun garde son stdout et ses exports"""
+    print("\n" + "=" * 80)
+    print("TEST: concurrent inline jobs")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        code = (
+            "import time\n"
+            "for _ in range(20):\n"
+            "    print(NAME)\n"
+            "    time.sleep(0.001)\n"
+            "with open(Path(__file__).parent / (NAME + '.stl'), 'wb') as f:\n"
+            "    f.write(b'solid')\n"
+        )
+
+        async def run():
+            jobs = [{"code": f"NAME = 'job{i}'\n" + code, "file": str(Path(tmp) / f"job{i}.py")}
+                    for i in range(4)]
+            return await asyncio.gather(*(asyncio.to_thread(run_job, job) for job in jobs))
+
+        for i, res in enumerate(asyncio.run(run())):
+            assert res["success"], res
+            assert set(res["stdout"].split()) == {f"job{i}"}, res["stdout"]
+            assert res["stl_path"] == str(Path(tmp) / f"job{i}.stl")
+        print("✅ 4 concurrent inline jobs kept their own stdout and STL")
+
+
+def test_concurrent_template_runs_keep_their_stl():
+    """Deux exécutions simultanées du même template: chacune son répertoire et son STL"""
+    print("\n" + "=" * 80)
+    print("TEST: concurrent runs of one template")
+    print("=" * 80)
+
+    codes = [CodeTemplates.generate_splint({"total_length_explicit": length}) for length in (150.0, 260.0)]
+
+    async def run(pool_size):
+        validator = ValidatorAgent()
+        validator.pool = ExecPool(size=pool_size, timeout=60)
+        try:
+            return await asyncio.gather(*(validator.validate_and_execute(code, "splint") for code in codes))
+        finally:
+            await validator.close()
+
+    original = exec_worker.RUNS_DIR
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            exec_worker.RUNS_DIR = Path(tmp)
+            for pool_size in (0, 2):
+                short, long = asyncio.run(run(pool_size))
+                assert short["success"] and long["success"], (short, long)
+                assert short["stl_path"] != long["stl_path"]
+                assert Path(short["stl_path"]).name == Path(long["stl_path"]).name == "generated_splint.stl"
+                extent = [float(np.ptp(read_stl(r["stl_path"])[0].reshape(-1, 3), axis=0).max()) for r in (short, long)]
+                assert extent[0] < extent[1], extent
+                print(f"✅ pool size {pool_size}: two STL files, extents {extent[0]:.0f} / {extent[1]:.0f} mm")
+
+            os.utime(Path(short["stl_path"]).parents[1], (0, 0))
+            assert exec_worker.prune_runs() >= 1
+            assert not Path(short["stl_path"]).exists() and Path(long["stl_path"]).exists()
+            print("✅ Old run directories pruned")
+    finally:
+        exec_worker.RUNS_DIR = original
+
+
+if __name__ == "__main__":
+    test_pool_runs_code_and_reports_errors()
+    test_timeout_kills_and_replaces_worker()
+    test_worker_recycled_after_k_jobs()
+    test_exported_files_are_reported()
+    test_oversized_reply_recycles_worker()
+    test_failed_respawn_does_not_hang()
+    test_failed_start_stops_started_workers()
+    test_inline_mode()
+    test_inline_jobs_do_not_mix()
+    test_concurrent_template_runs_keep_their_stl()
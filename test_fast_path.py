@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test du fast path déterministe: formes simples de prompts.json générées sans les agents LLM
+"""
+import sys
+import json
+import time
+import asyncio
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from fast_path import match_fast_path
+from cot_agents import CodeSynthesizerAgent
+from multi_agent_system import OrchestratorAgent, WorkflowContext, CriticAgent, AgentStatus
+
+PROMPTS = {p["name"]: p["prompt"] for p in json.loads((Path(__file__).parent / "prompts.json").read_text(encoding="utf-8"))["prompts"]}
+
+
+def test_prompts_json_shapes():
+    """Table, verre, tuyau et vis reconnus avec leurs cotes; les formes libres non"""
+    print("\n" + "=" * 80)
+    print("TEST: match_fast_path sur prompts.json")
+    print("=" * 80)
+
+    expected = {
+        "Table": ("table", {"length": 200, "width": 100, "thickness": 15, "leg_radius": 6, "leg_height": 120, "inset": 15}),
+        "Drinking Glass": ("glass", {"outer_radius": 35, "inner_radius": 32.5, "height": 100, "bottom": 8, "fillet": 1}),
+        "Pipe": ("pipe", {"outer_radius": 20, "inner_radius": 15, "length": 150, "chamfer": 1}),
+        "Screw": ("screw", {"shaft_radius": 4, "shaft_length": 50, "head_radius": 6, "head_height": 5, "chamfer": 0.5}),
+    }
+    for name, (primitive, params) in expected.items():
+        match = match_fast_path(PROMPTS[name])
+        assert match is not None and match.primitive == primitive, (name, match)
+        assert match.params == params, (name, match.params)
+        assert match.confidence == 1.0, (name, match.reasons)
+        print(f"✅ {name}: {primitive} {match.params}")
+
+    for name in ("Vase", "Helical Spring", "Hemispherical Bowl", "Stanford Bunny"):
+        assert match_fast_path(PROMPTS[name]) is None, name
+    print("✅ Vase, spring, bowl and bunny left to the LLM agents")
+
+
+def test_primitives_and_confidence():
+    """Primitives cotées (mm, cm, diamètre); élément non géré → confiance sous le seuil"""
+    print("\n" + "=" * 80)
+    print("TEST: primitives + confiance")
+    print("=" * 80)
+
+    cases = {
+        "a 50 mm cube": ("box", {"width": 50, "height": 50, "depth": 50}),
+        "box 2 cm x 3 cm x 4 cm": ("box", {"width": 20, "height": 30, "depth": 40}),
+        "100 mm tall cylinder of 20 mm radius": ("cylinder", {"radius": 20, "height": 100}),
+        "sphere diameter 30 mm": ("sphere", {"radius": 15}),
+        "cone base radius 10 mm height 30 mm": ("cone", {"radius1": 10, "radius2": 0.0, "height": 30}),
+        "torus major radius 30 mm minor radius 5 mm": ("torus", {"major_radius": 30, "minor_radius": 5}),
+        "a pipe 40 mm outer diameter, 3 mm wall, 200 mm long": ("pipe", {"outer_radius": 20, "inner_radius": 17, "length": 200, "chamfer": None}),
+    }
+    for prompt, (primitive, params) in cases.items():
+        match = match_fast_path(prompt)
+        assert match is not None and (match.primitive, match.params) == (primitive, params), (prompt, match)
+        assert match.confidence == 1.0
+    print(f"✅ {len(cases)} primitives parsed")
+
+    assert match_fast_path("a cylinder") is None  # cotes manquantes
+    holed = match_fast_path("40 x 40 x 40 mm cube with a 10 mm hole")
+    assert holed.primitive == "box" and holed.confidence < 0.9 and "hole" in holed.reasons[0]
+    mixed = match_fast_path("a sphere of radius 10 mm on a cube 30 x 30 x 30")
+    assert mixed.confidence < 0.9
+    print(f"✅ Unsupported features lower confidence: {holed.reasons + mixed.reasons}")
+
+
+def test_leftover_words_and_invalid_dimensions():
+    """Tout mot non reconnu baisse la confiance; cote nulle → pas de forme"""
+    print("\n" + "=" * 80)
+    print("TEST: mots restants + cotes invalides")
+    print("=" * 80)
+
+    prompts = [
+        "a box 50 mm long 30 mm wide 20 mm high with rounded corners",
+        "a star-shaped box 20x20x20",
+        "two cylinders radius 10 height 20",
+        "a half sphere radius 20",
+        "a sphere radius 10 cut in half",
+        "a cone radius 20 height 40 with a 5 mm tip cut off",
+        "a cylinder radius 10 height 20 then cut a 5 mm square from it",
+        "a vase cylinder radius 30 height 100 with a wavy surface",
+    ]
+    for prompt in prompts:
+        match = match_fast_path(prompt)
+        assert match is None or match.confidence < 0.9, (prompt, match)
+        print(f"   {prompt!r}: {match.reasons if match else None}")
+    print(f"✅ {len(prompts)} prompts left to the LLM agents")
+
+    for prompt in ("a box 0x0x0", "a cylinder radius 0 height 20", "a sphere radius 0 mm"):
+        assert match_fast_path(prompt) is None, prompt
+    assert match_fast_path("cone base radius 10 mm top radius 0 mm height 30 mm").confidence == 1.0
+    print("✅ Zero dimensions rejected")
+
+
+def test_impossible_shapes_rejected():
+    """Fond de verre ≥ hauteur, rayon intérieur ≥ extérieur, pieds au-delà du milieu: pas de fast path"""
+    print("\n" + "=" * 80)
+    print("TEST: formes impossibles")
+    print("=" * 80)
+
+    glass = "glass outer radius 40 mm inner radius {ri} mm height 100 mm bottom {bottom} mm"
+    assert match_fast_path(glass.format(ri=37, bottom=8)).primitive == "glass"
+    for ri, bottom in ((37, 120), (37, 100), (40, 8), (45, 8)):
+        match = match_fast_path(glass.format(ri=ri, bottom=bottom))
+        assert match is None or match.primitive != "glass", (ri, bottom, match)
+    print("✅ Glass with bottom >= height or inner >= outer left to the LLM agents")
+
+    table = ("a table: rectangular top 200 mm × 100 mm × 15 mm, four cylindrical legs "
+             "diameter 12 mm height 120 mm inset {inset} mm from each corner")
+    assert match_fast_path(table.format(inset=15)).primitive == "table"
+    for inset in (50, 80):
+        match = match_fast_path(table.format(inset=inset))
+        assert match is None or match.primitive != "table", (inset, match)
+    print("✅ Table legs inset past the middle of the top rejected")
+
+
+def test_emitted_code_compiles():
+    """Le code émis est du Python valide, contient les cotes du prompt et passe le Critic"""
+    print("\n" + "=" * 80)
+    print("TEST: code émis")
+    print("=" * 80)
+
+    synthesizer = CodeSynthesizerAgent()
+    critic = CriticAgent()
+    prompts = [PROMPTS[name] for name in ("Table", "Drinking Glass", "Pipe", "Screw")]
+    prompts += ["cone base radius 10 mm height 30 mm", "torus major radius 30 mm minor radius 5 mm"]
+    for prompt in prompts:
+        generated = synthesizer.fast_path(prompt)
+        assert generated is not None and generated.confidence >= 0.9
+        compile(generated.code, prompt, "exec")
+        review = asyncio.run(critic.critique_code(generated.code, prompt))
+        assert review.status == AgentStatus.SUCCESS, (prompt, review.errors)
+    screw = synthesizer.fast_path(PROMPTS["Screw"]).code
+    assert "polygon(6, 12.0)" in screw and "translate((0, 0, 50.0))" in screw
+    table = synthesizer.fast_path(PROMPTS["Table"]).code
+    assert "(85.0, 35.0)" in table and "127.5" in table
+    assert "cutBlind(-92.0)" in synthesizer.fast_path(PROMPTS["Drinking Glass"]).code
+    print("✅ Table, glass, pipe, screw, cone and torus code compiles and passes the Critic")
+
+
+def test_orchestrator_skips_llm_agents():
+    """Prompt simple: ni Architect ni Planner ni Synthesizer LLM, réponse en bien moins d'une seconde"""
+    print("\n" + "=" * 80)
+    print("TEST: fast path dans l'orchestrateur")
+    print("=" * 80)
+
+    class NoLLM:
+        async def analyze_design(self, prompt):
+            raise AssertionError("Architect called")
+
+        async def create_plan(self, analysis, prompt):
+            raise AssertionError("Planner called")
+
+    orchestrator = OrchestratorAgent(None, None, None)
+    orchestrator.architect = NoLLM()
+    orchestrator.planner = NoLLM()
+    events = []
+
+    async def progress(event_type, data):
+        events.append((event_type, data))
+
+    context = WorkflowContext(prompt=PROMPTS["Pipe"])
+    start = time.perf_counter()
+    code, app_type, error = asyncio.run(orchestrator._generate_code(context, PROMPTS["Pipe"], True, progress))
+    elapsed = time.perf_counter() - start
+
+    assert error is None and app_type == "cot_generated"
+    assert context.generated_code == code and "outer.cut(inner)" in code
+    assert any("Fast path" in data.get("message", "") for kind, data in events if kind == "status")
+    assert elapsed < 0.5, elapsed
+    print(f"✅ Pipe served by the fast path in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    test_prompts_json_shapes()
+    test_primitives_and_confidence()
+    test_leftover_words_and_invalid_dimensions()
+    test_impossible_shapes_rejected()
+    test_emitted_code_compiles()
+    test_orchestrator_skips_llm_agents()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test de l'index BM25 des exemples few-shot du Synthesizer CoT
+"""
+import sys
+import asyncio
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from few_shot_index import FewShotIndex, tokenize_text
+from cot_agents import CodeSynthesizerAgent, DesignAnalysis, ConstructionPlan
+
+
+def test_retrieval_beyond_substring_match():
+    """Descriptions sans le nom exact de l'exemple (tube, cup, coil, bolt) retrouvent le bon exemple"""
+    print("\n" + "=" * 80)
+    print("TEST: FewShotIndex.search")
+    print("=" * 80)
+
+    assert tokenize_text("makeHelix Hollow tubes") == ["helix", "hollow", "pipe"]
+
+    index = FewShotIndex(load_history=False)
+    expected = {
+        "hollow tube with chamfered ends": "pipe",
+        "coffee cup with a thick bottom": "glass",
+        "helical coil spring": "spring",
+        "hex bolt without threads": "screw",
+        "hemispherical bowl": "bowl",
+        "spur gear with 20 teeth": "gear_simple",
+    }
+    for query, name in expected.items():
+        found = [e.name for e in index.search(query)]
+        assert name in found, (query, found)
+        print(f"✅ '{query}' → {found}")
+
+    assert index.search("stanford bunny") == []
+    limited = index.search("hollow tube cylinder pipe glass", k=5, token_budget=40)
+    assert limited and sum(e.tokens for e in limited) <= 40
+    print("✅ Unrelated query gets no example, token budget respected")
+
+
+def test_history_persisted_and_retrieved():
+    """Génération réussie ajoutée, relue par un nouvel index, un seul exemple par prompt"""
+    print("\n" + "=" * 80)
+    print("TEST: historique des générations")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = Path(tmp) / "history.jsonl"
+        index = FewShotIndex(history, history_max=2)
+        prompt = "Create a dice with rounded corners 16 mm"
+        index.add_generation("Create a brick 20 x 10 x 6 mm", "result = cq.Workplane('XY').box(20, 10, 6)")
+        index.add_generation(prompt, "result = cq.Workplane('XY').box(16, 16, 16).edges().fillet(2)")
+        index.add_generation(prompt, "result = cq.Workplane('XY').box(16, 16, 16).edges().fillet(1.5)")
+        index.add_generation("Create a keycap", "result = cq.Workplane('XY').rect(18, 18).extrude(8)")
+        assert index.stats()["history"] == 2  # brique sortie, dé remplacé par sa dernière version
+        assert "brick" not in history.read_text(encoding="utf-8")
+
+        reloaded = FewShotIndex(history, history_max=2)
+        assert reloaded.stats()["history"] == 2
+        found = reloaded.search("rounded dice")
+        assert found and found[0].source == "history" and "fillet(1.5)" in found[0].code
+        print(f"✅ Past generation retrieved: {found[0].name}")
+
+
+class CapturingPool:
+    """Pool Ollama factice: garde les messages envoyés au modèle"""
+
+    def __init__(self):
+        self.messages = None
+
+    async def cached(self, model, request, options, compute, on_token=None, cache=None):
+        return await compute()
+
+    async def stream_chat(self, model, messages, options, **kwargs):
+        self.messages = messages
+        yield {"message": {"role": "assistant", "content": "```python\nresult = 1\n```"}}
+
+
+def test_synthesizer_prompt_uses_retrieved_examples():
+    """Le prompt système du Synthesizer contient les exemples retrouvés"""
+    print("\n" + "=" * 80)
+    print("TEST: exemples dans le prompt du Synthesizer")
+    print("=" * 80)
+
+    synthesizer = CodeSynthesizerAgent()
+    synthesizer.examples = FewShotIndex(load_history=False)
+    synthesizer.client.use_fallback = False
+    synthesizer.client.pool = pool = CapturingPool()
+
+    analysis = DesignAnalysis("Hollow tube with chamfered rims", ["cylinder"], ["extrude", "cut", "chamfer"],
+                              {}, "simple", "")
+    plan = ConstructionPlan([{"operation": "cut"}], {}, [], 1)
+    asyncio.run(synthesizer.generate_code(plan, analysis))
+
+    system = pool.messages[0]["content"]
+    assert "REFERENCE PATTERN FOR PIPE" in system
+    print(f"✅ {system.count('REFERENCE PATTERN')} example(s) in the system prompt")
+
+
+if __name__ == "__main__":
+    test_retrieval_beyond_substring_match()
+    test_history_persisted_and_retrieved()
+    test_synthesizer_prompt_uses_retrieved_examples()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test du moteur honeycomb (centres vectorisés + maillage NumPy direct)
+"""
+import sys
+import math
+import time
+import asyncio
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from honeycomb import hex_centers, inner_radius, honeycomb_triangles
+from mesh_ops import weld_vertices
+from templates import CodeTemplates
+from agents import AnalystAgent
+from exec_worker import run_job
+from stl_io import read_stl
+
+
+def _reference_centers(w, h, a):
+    """Double boucle de l'ancien honeycomb_field"""
+    dx, dy = 1.5 * a, math.sqrt(3.0) * a
+    half_w, half_h = a, dy / 2.0
+    nx = int(math.ceil((w + 2 * half_w) / dx)) + 2
+    ny = int(math.ceil((h + 2 * half_h) / dy)) + 2
+    centers = []
+    for i in range(nx):
+        col_off = (dy / 2.0) if (i % 2) else 0.0
+        for j in range(ny):
+            cx, cy = i * dx, j * dy + col_off
+            if half_w <= cx <= w - half_w and half_h <= cy <= h - half_h:
+                centers.append((cx, cy))
+    return np.array(centers)
+
+
+def test_hex_centers_match_loop():
+    """Mêmes cellules que la double boucle d'origine"""
+    print("\n" + "=" * 80)
+    print("TEST: hex_centers")
+    print("=" * 80)
+
+    centers = hex_centers(300.0, 380.0, 12.0)
+    reference = _reference_centers(300.0, 380.0, 12.0)
+    assert len(centers) == len(reference)
+    assert np.allclose(np.array(sorted(map(tuple, centers))), np.array(sorted(map(tuple, reference))))
+    print(f"✅ {len(centers)} cells, identical to the nested loop")
+
+
+def test_honeycomb_mesh_closed_with_exact_volume():
+    """Maillage fermé, sans parois internes, volume = cellules x aire de l'anneau x profondeur"""
+    print("\n" + "=" * 80)
+    print("TEST: honeycomb_triangles")
+    print("=" * 80)
+
+    a, wall, depth = 12.0, 2.2, 40.0
+    centers = hex_centers(300.0, 380.0, a)
+
+    start = time.perf_counter()
+    tris = honeycomb_triangles(centers, a, wall, depth)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {len(centers)} cells → {len(tris):,} triangles in {elapsed * 1000:.1f} ms")
+
+    vertices, faces = weld_vertices(tris, tolerance=1e-3)
+    assert len(faces) == len(tris)
+    edges = np.sort(np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]]), axis=1)
+    _, counts = np.unique(edges, axis=0, return_counts=True)
+    assert (counts == 2).all(), np.bincount(counts)
+    print("✅ Watertight: every edge shared by exactly two triangles")
+
+    t = tris.astype(np.float64)
+    volume = np.einsum("ij,ij->i", t[:, 0], np.cross(t[:, 1], t[:, 2])).sum() / 6.0
+    hex_area = lambda r: 1.5 * math.sqrt(3.0) * r * r
+    expected = len(centers) * (hex_area(a) - hex_area(inner_radius(a, wall))) * depth
+    assert abs(volume - expected) / expected < 1e-4, (volume, expected)
+    print(f"✅ Volume {volume:,.0f} mm³ (expected {expected:,.0f})")
+
+
+def test_template_has_no_union_loop():
+    code = CodeTemplates.generate_honeycomb({"parameters": {"mesh_only": True}})
+    compile(code, "<honeycomb>", "exec")
+    assert ".union(" not in code
+    assert "MESH_ONLY = True" in code
+    assert "bulk_fuse(cells, glue=True)" in code
+    print("✅ Honeycomb template: single fuse or direct mesh")
+
+
+def _bounds(stl_path):
+    points = read_stl(stl_path)[0].reshape(-1, 3)
+    return np.stack([points.min(axis=0), points.max(axis=0)])
+
+
+def test_mesh_only_matches_brep_bounds():
+    """Cellules plus profondes que le panneau: STL direct et B-Rep coupés à la même épaisseur"""
+    print("\n" + "=" * 80)
+    print("TEST: honeycomb mesh_only vs B-Rep bounds")
+    print("=" * 80)
+
+    W, H, T, a, depth = 120.0, 90.0, 20.0, 12.0, 35.0
+    params = {"panel_width": W, "panel_height": H, "panel_thickness": T, "cell_size": a, "cell_depth": depth}
+    centers = hex_centers(W, H, a)
+    # Boîte de honey.intersect(panel): cellules en XY, épaisseur du panneau en Z
+    expected = np.array([[centers[:, 0].min() - a, centers[:, 1].min() - a * math.sqrt(3.0) / 2, 0.0],
+                         [centers[:, 0].max() + a, centers[:, 1].max() + a * math.sqrt(3.0) / 2, T]])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("mesh", "brep"):
+            (Path(tmp) / name).mkdir()
+        mesh = run_job({"code": CodeTemplates.generate_honeycomb({"parameters": {**params, "mesh_only": True}}),
+                        "file": str(Path(tmp) / "mesh" / "run.py")})
+        assert mesh["success"], mesh
+        mesh_bounds = _bounds(mesh["stl_path"])
+        assert np.allclose(mesh_bounds, expected, atol=1e-3), (mesh_bounds, expected)
+        print(f"✅ mesh_only clipped to T = {T} mm (cell depth {depth} mm)")
+
+        try:
+            import cadquery  # noqa: F401
+        except ImportError:
+            print("⚠️ cadquery not installed, skipping geometric check")
+            return
+
+        brep = run_job({"code": CodeTemplates.generate_honeycomb({"parameters": params}),
+                        "file": str(Path(tmp) / "brep" / "run.py")})
+        assert brep["success"], brep
+        assert np.allclose(_bounds(brep["stl_path"]), mesh_bounds, atol=1e-2)
+        print("✅ B-Rep and mesh_only bounding boxes agree")
+
+
+def test_analyst_sets_mesh_only():
+    """'STL only' active le maillage direct, sauf si un congé d'angle demande le B-Rep"""
+    analyst = AnalystAgent()
+    prompt = "Honeycomb panel width 300 mm height 380 mm, cell size 12 mm"
+    assert not asyncio.run(analyst.analyze(prompt))["parameters"]["mesh_only"]
+    assert asyncio.run(analyst.analyze(prompt + ", STL only"))["parameters"]["mesh_only"]
+    filleted = asyncio.run(analyst.analyze(prompt + ", corner fillet 5 mm, STL only"))
+    assert not filleted["parameters"]["mesh_only"]
+    print("✅ mesh_only set from the prompt")
+
+
+if __name__ == "__main__":
+    test_hex_centers_match_loop()
+    test_honeycomb_mesh_closed_with_exact_volume()
+    test_template_has_no_union_loop()
+    test_mesh_only_matches_brep_bounds()
+    test_analyst_sets_mesh_only()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test du JobStore: artefacts par job dans un dossier adressé par contenu
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from job_store import JobStore
+
+
+def test_job_artifacts_are_isolated():
+    """Deux jobs concurrents ne se partagent pas leurs fichiers"""
+    print("\n" + "=" * 80)
+    print("TEST: JobStore isolation")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        store = JobStore(root)
+
+        stl_a = root / "a.stl"
+        stl_a.write_bytes(b"solid a")
+        stl_b = root / "b.stl"
+        stl_b.write_bytes(b"solid b")
+
+        job_a, job_b = store.new_job(), store.new_job()
+        meta_a = store.save(job_a, "code_a", stl_path=str(stl_a), app_type="pipe")
+        meta_b = store.save(job_b, "code_b", stl_path=str(stl_b), app_type="glass")
+
+        assert meta_a["hash"] != meta_b["hash"]
+        assert store.artifact_path(job_a, "stl").read_bytes() == b"solid a"
+        assert store.artifact_path(job_b, "stl").read_bytes() == b"solid b"
+        assert store.artifact_path(job_a, "code").read_text() == "code_a"
+        assert store.artifact_path(job_a, "step") is None
+        assert store.artifact_path(job_a, "stl").parent.name == meta_a["hash"]
+        print("✅ Each job resolves to its own artifacts")
+
+        # Un autre processus (nouveau store) retrouve les jobs via les pointeurs
+        other = JobStore(root)
+        assert other.get_meta(job_a)["app_type"] == "pipe"
+        assert other.artifact_path("not-a-job", "stl") is None
+        assert other.artifact_path("../etc", "stl") is None
+        print("✅ Jobs resolved from disk by a fresh store")
+
+
+def test_identical_content_is_deduplicated():
+    """Le même code + STL donne le même dossier"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        store = JobStore(root)
+        stl = root / "m.stl"
+        stl.write_bytes(b"solid m")
+
+        meta_1 = store.save(store.new_job(), "same", stl_path=str(stl))
+        meta_2 = store.save(store.new_job(), "same", stl_path=str(stl))
+        assert meta_1["hash"] == meta_2["hash"]
+        print("✅ Identical artifacts share one content-addressed directory")
+
+
+def test_shared_content_keeps_per_job_metadata():
+    """Deux jobs au même contenu: chacun ses métadonnées, design notes sur le bon job"""
+    print("\n" + "=" * 80)
+    print("TEST: per-job metadata")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        store = JobStore(root)
+        stl = root / "m.stl"
+        stl.write_bytes(b"solid m")
+
+        job_a, job_b = store.new_job(), store.new_job()
+        store.save(job_a, "same", stl_path=str(stl), metadata={"prompt": "a cube"})
+        store.save(job_b, "same", stl_path=str(stl), metadata={"prompt": "a box"})
+        store.update_meta(job_a, {"design_notes": "notes for a"})
+
+        other = JobStore(root)
+        meta_a, meta_b = other.get_meta(job_a), other.get_meta(job_b)
+        assert meta_a["hash"] == meta_b["hash"]
+        assert (meta_a["job_id"], meta_a["metadata"]["prompt"]) == (job_a, "a cube")
+        assert (meta_b["job_id"], meta_b["metadata"]["prompt"]) == (job_b, "a box")
+        assert meta_a["design_notes"] == "notes for a" and "design_notes" not in meta_b
+        assert other.artifact_path(job_b, "stl").read_bytes() == b"solid m"
+        assert other.artifact_path(job_a, "meta") == root / "jobs" / f"{job_a}.json"
+        assert not list(root.glob("*/meta.json"))
+        assert store.update_meta("unknown", {"design_notes": "x"}) is None
+        print("✅ Shared blobs, separate jobs/<job_id>.json")
+
+
+
+def test_export_requires_job_id():
+    """/api/export/stl|step sans job_id: 400, jamais le job d'un autre client"""
+    print("\n" + "=" * 80)
+    print("TEST: export endpoints")
+    print("=" * 80)
+
+    from fastapi.testclient import TestClient
+    import main
+
+    original = main.job_store
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            main.job_store = store = JobStore(root)
+            stl = root / "m.stl"
+            stl.write_bytes(b"solid m")
+            job_id = store.new_job()
+            store.save(job_id, "code", stl_path=str(stl))
+
+            client = TestClient(main.app)
+            assert client.get("/api/export/stl").status_code == 400
+            assert client.get("/api/export/step").status_code == 400
+            assert client.get("/api/export/stl", params={"job_id": "unknown"}).status_code == 404
+            assert client.get("/api/export/step", params={"job_id": job_id}).status_code == 404
+            r = client.get("/api/export/stl", params={"job_id": job_id})
+            assert r.status_code == 200 and r.content == b"solid m"
+            print("✅ Missing job_id rejected, known job served")
+    finally:
+        main.job_store = original
+
+
+if __name__ == "__main__":
+    test_job_artifacts_are_isolated()
+    test_identical_content_is_deduplicated()
+    test_shared_content_keeps_per_job_metadata()
+    test_export_requires_job_id()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test du générateur de lattice vectorisé (poutres uniques + cylindres broadcastés)
+"""
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from lattice import CELL_TYPES, lattice_struts, strut_triangles
+from stl_io import read_stl
+from templates import CodeTemplates
+from exec_worker import run_job
+
+
+def test_unique_struts_per_cell_type():
+    """Arêtes partagées entre cellules générées une seule fois"""
+    print("\n" + "=" * 80)
+    print("TEST: lattice_struts")
+    print("=" * 80)
+
+    # Grille cubique 2x2x2: 3 directions x 2 x 3 x 3 arêtes
+    cubic = lattice_struts("cubic", 10.0, (2, 2, 2))
+    assert len(cubic) == 54
+    lengths = np.linalg.norm(cubic[:, 1] - cubic[:, 0], axis=1)
+    assert np.allclose(lengths, 10.0)
+    assert cubic.min() == 0.0 and cubic.max() == 20.0
+    print("✅ cubic 2x2x2 → 54 unique struts")
+
+    per_cell = {"cubic": 12, "bcc": 8, "fcc": 24, "octet": 36, "kelvin": 36, "diamond": 16}
+    for cell_type in CELL_TYPES:
+        single = lattice_struts(cell_type, 4.0, (1, 1, 1))
+        assert len(single) == per_cell[cell_type], (cell_type, len(single))
+        grid = lattice_struts(cell_type, 4.0, (3, 3, 3))
+        keys = {tuple(np.round(s.ravel(), 4)) for s in grid}
+        assert len(keys) == len(grid)
+        print(f"✅ {cell_type}: {len(single)} struts/cell, {len(grid)} unique in 3x3x3")
+
+    # Types non poutres (gyroid): repli cubique comme avant
+    assert len(lattice_struts("gyroid", 10.0, (1, 1, 1))) == 12
+
+
+def test_strut_triangles_closed_and_outward():
+    """Cylindre orienté le long de la poutre, normales vers l'extérieur, bouchons"""
+    strut = np.array([[[0, 0, 0], [3, 4, 12]]], dtype=np.float32)
+    tris = strut_triangles(strut, 0.5, segments=12)
+    assert tris.shape == (4 * 12, 3, 3)
+
+    axis = strut[0, 1] - strut[0, 0]
+    axis /= np.linalg.norm(axis)
+    centroid = tris.mean(axis=1)
+    normals = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+    outward = centroid - strut[0].mean(axis=0)
+    assert (np.einsum("ij,ij->i", normals, outward) > 0).all()
+
+    # Sommets latéraux à distance r de l'axe
+    side = tris[:24].reshape(-1, 3)
+    radial = side - np.outer(side @ axis, axis)
+    assert np.allclose(np.linalg.norm(radial, axis=1), 0.5, atol=1e-4)
+    print("✅ Strut cylinder oriented, closed and outward-facing")
+
+
+def test_lattice_template_runs_fast():
+    """Le template lattice utilise le générateur vectorisé pour tous les types"""
+    print("\n" + "=" * 80)
+    print("TEST: lattice template (octet, 20x20x20 cells)")
+    print("=" * 80)
+
+    analysis = {"parameters": {"cell_type": "octet", "cell_size": 5.0, "strut_diameter": 1.0,
+                               "length": 100.0, "width": 100.0, "height": 100.0}}
+    code = CodeTemplates.generate_lattice(analysis)
+    assert "make_cyl" not in code
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        res = run_job({"code": code, "file": str(Path(tmp) / "temp_exec.py")})
+        elapsed = time.perf_counter() - start
+        assert res["success"], res
+        tris, _ = read_stl(res["stl_path"])
+        assert len(tris) % 32 == 0 and len(tris) > 1_000_000
+        print(f"✅ {len(tris):,} triangles in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    test_unique_struts_per_cell_type()
+    test_strut_triangles_closed_and_outward()
+    test_lattice_template_runs_fast()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test du cache des réponses LLM: clé (modèle, requête, options), température, éviction, pool
+"""
+import sys
+import random
+import string
+import asyncio
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from llm_cache import LLMCache, llm_cache_key
+from llm_pool import OllamaPool
+
+MESSAGES = [{"role": "system", "content": "You are a CadQuery code generator."},
+            {"role": "user", "content": "Generate a 10 mm cube"}]
+OPTIONS = {"num_predict": 2000, "temperature": 0.3, "top_p": 0.9}
+
+
+def test_key_and_temperature_policy():
+    """Même requête → même clé; options ou modèle différents → autre clé; bypass au-dessus du seuil"""
+    print("\n" + "=" * 80)
+    print("TEST: llm_cache_key / accepts")
+    print("=" * 80)
+
+    request = {"messages": MESSAGES, "stop": "FenceClosed"}
+    key = llm_cache_key("deepseek-coder:33b", request, OPTIONS)
+    assert key == llm_cache_key("deepseek-coder:33b", dict(reversed(list(request.items()))), dict(OPTIONS))
+    assert key != llm_cache_key("deepseek-coder:6.7b", request, OPTIONS)
+    assert key != llm_cache_key("deepseek-coder:33b", request, {**OPTIONS, "num_predict": 1000})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMCache(Path(tmp), max_temperature=0.3, enabled=True)
+        assert cache.accepts({"temperature": 0.1}) and cache.accepts({"temperature": 0.3})
+        assert not cache.accepts({"temperature": 0.7})
+        assert cache.accepts({"temperature": 0.7}, cache=True)
+        assert not cache.accepts({"temperature": 0.1}, cache=False)
+        assert cache.stats()["bypassed"] == 1
+    print("✅ Canonical keys, high-temperature calls bypassed unless forced")
+
+
+def test_roundtrip_and_size_eviction():
+    """Réponse compressée relue à l'identique; LRU par taille compressée"""
+    print("\n" + "=" * 80)
+    print("TEST: LLMCache put/get/evict")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMCache(Path(tmp), enabled=True)
+        text = "```python\nimport cadquery as cq\nresult = cq.Workplane('XY').box(10, 10, 10)\n```\n" * 20
+        assert cache.get("k1") is None
+        cache.put("k1", "deepseek-coder:33b", text)
+        assert cache.get("k1") == text
+        stats = cache.stats()
+        assert stats["entries"] == 1 and stats["bytes"] < len(text) / 4
+        print(f"✅ {len(text)} chars stored in {stats['bytes']} bytes")
+
+        small = LLMCache(Path(tmp) / "small", max_mb=0.001, enabled=True)  # ~1 Ko
+        rng = random.Random(0)
+        noise = lambda: "".join(rng.choice(string.printable) for _ in range(900))
+        small.put("a", "m", noise())
+        small.put("b", "m", noise())
+        assert small.get("a") is None and small.get("b") is not None
+        assert small.stats()["evictions"] == 1
+        print("✅ Least recently used response evicted past the size limit")
+
+
+def test_pool_serves_hits_without_calling_ollama():
+    """Deuxième appel identique servi par le cache (et transmis à on_token), compute non rappelé"""
+    print("\n" + "=" * 80)
+    print("TEST: OllamaPool.cached")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = OllamaPool("http://localhost:1", cache=LLMCache(Path(tmp), enabled=True))
+        calls, tokens = [], []
+
+        async def compute():
+            calls.append(1)
+            return "```python\nresult = 1\n```"
+
+        async def on_token(piece):
+            tokens.append(piece)
+
+        async def scenario():
+            request = {"messages": MESSAGES, "stop": "FenceClosed"}
+            first = await pool.cached("m:7b", request, OPTIONS, compute)
+            second = await pool.cached("m:7b", request, OPTIONS, compute, on_token=on_token)
+            hot = await pool.cached("m:7b", request, {**OPTIONS, "temperature": 0.7}, compute)
+            return first, second, hot
+
+        first, second, hot = asyncio.run(scenario())
+        assert first == second == hot
+        assert len(calls) == 2  # miss + appel à haute température
+        assert tokens == [first]
+        print("✅ Cached response replayed, Ollama called only on miss / bypass")
+
+
+def test_replay_mode_caches_architect_calls():
+    """Mode replay (batch_runner): un appel à la température de l'Architect (0.7) est mis en cache"""
+    print("\n" + "=" * 80)
+    print("TEST: LLMCache replay mode")
+    print("=" * 80)
+
+    architect = {**OPTIONS, "temperature": 0.7}
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMCache(Path(tmp), max_temperature=0.3, enabled=True, replay=True)
+        assert cache.accepts(architect) and not cache.accepts(architect, cache=False)
+        pool = OllamaPool("http://localhost:1", cache=cache)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return '{"design_type": "pipe"}'
+
+        async def scenario():
+            request = {"messages": MESSAGES, "stop": "JsonClosed"}
+            return [await pool.cached("m:7b", request, architect, compute) for _ in range(2)]
+
+        first, second = asyncio.run(scenario())
+        assert first == second and len(calls) == 1
+        stats = cache.stats()
+        assert stats["replay"] and stats["hits"] == 1 and stats["bypassed"] == 0
+    print("✅ Temperature 0.7 call served from the cache on the second run")
+
+
+if __name__ == "__main__":
+    test_key_and_temperature_policy()
+    test_roundtrip_and_size_eviction()
+    test_pool_serves_hits_without_calling_ollama()
+    test_replay_mode_caches_architect_calls()
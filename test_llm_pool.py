@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test du client Ollama partagé: un seul client, limites par modèle, file à priorités,
+conditions d'arrêt du stream
+"""
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from llm_pool import (OllamaPool, PrioritySemaphore, JsonClosed, FenceClosed, collect,
+                      get_pool, model_priority, parse_model_limits)
+
+
+def test_config_parsing():
+    """Priorité lue dans le tag du modèle, limites 'défaut,modèle=n'"""
+    print("\n" + "=" * 80)
+    print("TEST: model priority / limits")
+    print("=" * 80)
+
+    assert model_priority("qwen2.5-coder:7b") == 7.0
+    assert model_priority("deepseek-coder:33b") == 33.0
+    assert model_priority("deepseek-coder:6.7b") == 6.7
+    assert model_priority("llama3") == 0.0
+    assert parse_model_limits("2,deepseek-coder:33b=1") == (2, {"deepseek-coder:33b": 1})
+    print("✅ Priorities and limits parsed")
+
+
+def test_priority_order_and_cancellation():
+    """À capacité saturée, la plus petite priorité passe; une attente annulée ne bloque rien"""
+    print("\n" + "=" * 80)
+    print("TEST: PrioritySemaphore")
+    print("=" * 80)
+
+    async def scenario():
+        sem = PrioritySemaphore(1)
+        order = []
+        await sem.acquire()
+
+        async def waiter(name, priority):
+            await sem.acquire(priority)
+            order.append(name)
+            sem.release()
+
+        tasks = [asyncio.create_task(waiter(n, p)) for n, p in (("33b-a", 33), ("33b-b", 33), ("7b", 7))]
+        cancelled = asyncio.create_task(waiter("cancelled", 1))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        sem.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    order = asyncio.run(scenario())
+    assert order == ["7b", "33b-a", "33b-b"], order
+    print(f"✅ Served in order: {order}")
+
+
+def test_pool_limits():
+    """Concurrence bornée par modèle et globalement; un seul pool par serveur"""
+    print("\n" + "=" * 80)
+    print("TEST: OllamaPool limits")
+    print("=" * 80)
+
+    async def scenario():
+        pool = OllamaPool("http://localhost:1", max_concurrency=3, model_concurrency="2,big:33b=1")
+        peak = {"small:7b": 0, "big:33b": 0, "total": 0}
+        current = {"small:7b": 0, "big:33b": 0, "total": 0}
+
+        async def call(model):
+            async with pool.slot(model):
+                for key in (model, "total"):
+                    current[key] += 1
+                    peak[key] = max(peak[key], current[key])
+                await asyncio.sleep(0.01)
+                for key in (model, "total"):
+                    current[key] -= 1
+
+        await asyncio.gather(*(call(m) for m in ["big:33b"] * 4 + ["small:7b"] * 6))
+        return pool, peak
+
+    pool, peak = asyncio.run(scenario())
+    assert peak == {"small:7b": 2, "big:33b": 1, "total": 3}, peak
+    assert pool.stats()["waiting"] == 0 and pool.stats()["in_flight"] == {}
+    assert get_pool("http://localhost:2") is get_pool("http://localhost:2")
+    print(f"✅ Peak concurrency: {peak}")
+
+
+def _feed(stop, pieces):
+    """Index du fragment qui déclenche l'arrêt (None si jamais)"""
+    for i, piece in enumerate(pieces):
+        if stop(piece):
+            return i
+    return None
+
+
+def test_stop_conditions():
+    """JSON refermé (accolades dans les chaînes ignorées), bloc de code refermé même à cheval sur deux fragments"""
+    print("\n" + "=" * 80)
+    print("TEST: JsonClosed / FenceClosed")
+    print("=" * 80)
+
+    json_pieces = ['Here is the plan:\n```json\n{"steps": [{"op": "box"}]', ', "note": "use } and \\" ok"', '}\n```', "\nExplanation..."]
+    assert _feed(JsonClosed(), json_pieces) == 2
+    assert _feed(JsonClosed(), ['{"a": {"b": 1}', ", "]) is None
+
+    code_pieces = ["Sure!\n``", "`python\nresult = 1\n`", "``\nThis code creates", " a box."]
+    assert _feed(FenceClosed(), code_pieces) == 2
+    assert _feed(FenceClosed(), ["```python\n", "x = 1\n"]) is None
+    print("✅ Stop conditions fire on the fragment that closes the block")
+
+
+def test_collect_stops_and_closes_stream():
+    """collect s'arrête à la condition et ferme le stream (plus de tokens décodés)"""
+    print("\n" + "=" * 80)
+    print("TEST: collect early stop")
+    print("=" * 80)
+
+    state = {"produced": 0, "closed": False}
+
+    async def stream():
+        try:
+            for piece in ["```python\n", "result = 1\n", "```", "\nThe code above", " creates..."] * 50:
+                state["produced"] += 1
+                yield {"response": piece}
+        finally:
+            state["closed"] = True
+
+    async def scenario():
+        received = []
+
+        async def on_token(piece):
+            received.append(piece)
+
+        text = await collect(stream(), lambda c: c["response"], on_token=on_token, stop=FenceClosed())
+        return text, received
+
+    text, received = asyncio.run(scenario())
+    assert text == "```python\nresult = 1\n```"
+    assert received == ["```python\n", "result = 1\n", "```"]
+    assert state["produced"] == 3 and state["closed"]
+    print(f"✅ Stream closed after {state['produced']} of 250 fragments")
+
+
+if __name__ == "__main__":
+    test_config_parsing()
+    test_priority_order_and_cancellation()
+    test_pool_limits()
+    test_stop_conditions()
+    test_collect_stops_and_closes_stream()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test des opérations de maillage de l'aperçu (fusion des sommets, décimation)
+"""
+import sys
+import json
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from mesh_ops import weld_vertices, cluster_decimate, encode_mesh, decode_mesh
+
+
+def _grid_soup(n=60, noise=0.0):
+    """Surface z = sin(x)cos(y) en soupe de triangles (3 sommets non partagés par triangle)"""
+    x, y = np.meshgrid(np.linspace(0, 10, n), np.linspace(0, 10, n), indexing="ij")
+    pts = np.stack([x, y, np.sin(x) * np.cos(y)], axis=-1).astype(np.float32)
+    a, b = pts[:-1, :-1].reshape(-1, 3), pts[1:, :-1].reshape(-1, 3)
+    c, d = pts[1:, 1:].reshape(-1, 3), pts[:-1, 1:].reshape(-1, 3)
+    tris = np.concatenate([np.stack([a, b, c], 1), np.stack([a, c, d], 1)])
+    if noise:
+        tris = tris + np.random.default_rng(0).uniform(-noise, noise, tris.shape).astype(np.float32)
+    return tris
+
+
+def test_weld_shares_vertices():
+    """Une grille n x n donne n² sommets partagés, géométrie inchangée"""
+    print("\n" + "=" * 80)
+    print("TEST: weld_vertices")
+    print("=" * 80)
+
+    tris = _grid_soup()
+    vertices, indices = weld_vertices(tris)
+    assert vertices.dtype == np.float32 and indices.dtype == np.uint32
+    assert len(vertices) == 60 * 60
+    assert len(indices) == len(tris)
+    assert np.array_equal(vertices[indices], tris)
+    print(f"✅ {len(tris) * 3:,} soup vertices → {len(vertices):,} shared vertices")
+
+    soup = json.dumps({"vertices": tris.ravel().tolist(), "faces": list(range(len(tris) * 3))})
+    indexed = json.dumps({"vertices": vertices.ravel().tolist(), "faces": indices.ravel().tolist()})
+    ratio = len(indexed) / len(soup)
+    assert ratio < 0.5
+    print(f"✅ JSON payload: {len(soup):,} → {len(indexed):,} bytes ({ratio:.0%})")
+
+
+def test_weld_tolerance():
+    """Bruit sous la tolérance: fusionné; tolérance 0: fusion exacte seulement"""
+    noisy = _grid_soup(n=20, noise=1e-6)
+
+    exact_v, _ = weld_vertices(noisy, tolerance=0)
+    assert len(exact_v) > 20 * 20 * 3
+    welded_v, welded_i = weld_vertices(noisy, tolerance=1e-3)
+    assert len(welded_v) == 20 * 20
+    assert len(welded_i) == len(noisy)
+    print("✅ Tolerance controls welding")
+
+    # Triangle écrasé par la fusion → supprimé
+    sliver = np.array([[[0, 0, 0], [1, 0, 0], [1, 1e-5, 0]]], dtype=np.float32)
+    _, idx = weld_vertices(sliver, tolerance=1e-3)
+    assert len(idx) == 0
+    _, idx = weld_vertices(sliver, tolerance=1e-3, drop_degenerate=False)
+    assert len(idx) == 1
+    print("✅ Degenerate triangles dropped")
+
+
+def _sphere(radius=10.0, n_lat=200, n_lon=400):
+    """Sphère UV fermée (soupe de triangles)"""
+    theta = np.linspace(0, np.pi, n_lat + 1)
+    phi = np.linspace(0, 2 * np.pi, n_lon + 1)
+    t, p = np.meshgrid(theta, phi, indexing="ij")
+    pts = radius * np.stack([np.sin(t) * np.cos(p), np.sin(t) * np.sin(p), np.cos(t)], axis=-1)
+    pts[:, -1] = pts[:, 0]          # couture en longitude
+    pts[0, :], pts[-1, :] = pts[0, 0], pts[-1, 0]  # pôles
+    pts = pts.astype(np.float32)
+    a, b = pts[:-1, :-1].reshape(-1, 3), pts[1:, :-1].reshape(-1, 3)
+    c, d = pts[1:, 1:].reshape(-1, 3), pts[:-1, 1:].reshape(-1, 3)
+    return np.concatenate([np.stack([a, b, c], 1), np.stack([a, c, d], 1)])
+
+
+def _edge_counts(indices):
+    """Nombre de triangles par arête"""
+    edges = np.concatenate([indices[:, [0, 1]], indices[:, [1, 2]], indices[:, [2, 0]]])
+    _, counts = np.unique(np.sort(edges, axis=1), axis=0, return_counts=True)
+    return counts
+
+
+def _boundary_edges(indices):
+    """Nombre d'arêtes utilisées par un seul triangle (0 pour un maillage fermé)"""
+    return int((_edge_counts(indices) == 1).sum())
+
+
+def test_cluster_decimate_budget_and_shape():
+    """Budget respecté, sphère décimée sans trou, forme conservée"""
+    print("\n" + "=" * 80)
+    print("TEST: cluster_decimate")
+    print("=" * 80)
+
+    vertices, indices = weld_vertices(_sphere())
+    assert _boundary_edges(indices) == 0
+    budget = 5000
+
+    dec_v, dec_i = cluster_decimate(vertices, indices, budget)
+    assert dec_i.dtype == np.uint32
+    assert budget // 2 < len(dec_i) <= budget, len(dec_i)
+    assert dec_i.max() < len(dec_v)
+    print(f"✅ {len(indices):,} → {len(dec_i):,} triangles (budget {budget:,})")
+
+    assert _boundary_edges(dec_i) == 0
+    print("✅ No holes on the sphere: every edge still shared")
+
+    radii = np.linalg.norm(dec_v, axis=1)
+    assert np.abs(radii - 10.0).max() < 0.2, radii.min()
+    print(f"✅ Shape kept: radius {radii.min():.3f}..{radii.max():.3f}")
+
+    # Sous le budget: inchangé
+    same_v, same_i = cluster_decimate(vertices, indices, len(indices))
+    assert len(same_i) == len(indices)
+
+    # Coque plus fine qu'un voxel: budget et index valides, mais pas de garantie manifold
+    sphere = _sphere(n_lat=100, n_lon=200)
+    shell_v, shell_i = weld_vertices(np.concatenate([sphere, (sphere * 0.99)[:, ::-1]]))
+    dec_v, dec_i = cluster_decimate(shell_v, shell_i, 800)
+    assert len(dec_i) <= 800 and dec_i.max() < len(dec_v)
+    non_manifold = int((_edge_counts(dec_i) != 2).sum())
+    print(f"✅ Thin shell decimated to {len(dec_i)} triangles ({non_manifold} non-manifold edges, preview only)")
+
+
+def test_mesh_binary_roundtrip():
+    """mesh.bin: en-tête 40 octets, float32 + uint32, gzip"""
+    vertices, indices = weld_vertices(_grid_soup())
+    raw = encode_mesh(vertices, indices, compress=False)
+    assert raw[:4] == b"CMSH"
+    assert len(raw) == 40 + vertices.nbytes + indices.nbytes
+
+    packed = encode_mesh(vertices, indices)
+    v, i = decode_mesh(packed)
+    assert np.array_equal(v, vertices) and np.array_equal(i, indices)
+
+    as_json = json.dumps({"vertices": vertices.ravel().tolist(), "faces": indices.ravel().tolist()})
+    print(f"✅ mesh.bin {len(packed):,} bytes (gzip) vs JSON {len(as_json):,} bytes")
+    assert len(packed) < len(as_json) / 3
+
+
+if __name__ == "__main__":
+    test_weld_shares_vertices()
+    test_weld_tolerance()
+    test_cluster_decimate_budget_and_shape()
+    test_mesh_binary_roundtrip()
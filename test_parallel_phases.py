@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test du graphe de phases: design, contraintes et génération en parallèle
+"""
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from multi_agent_system import OrchestratorAgent, AgentResult, AgentStatus
+from prompt_cache import PromptCache
+from template_cache import TemplateCache
+
+DESIGN_DELAY = 0.6
+CONSTRAINT_DELAY = 0.2
+
+
+class FakeAnalyst:
+    async def analyze(self, prompt):
+        return {"type": "heatsink", "parameters": {"plate_w": 40.0}}
+
+
+class FakeGenerator:
+    def __init__(self, timeline):
+        self.timeline = timeline
+
+    async def generate(self, analysis):
+        self.timeline.append("generate")
+        return "import cadquery as cq\nresult = cq.Workplane('XY').box(1, 1, 1)\n", "heatsink"
+
+
+class FakeValidator:
+    def __init__(self, timeline):
+        self.timeline = timeline
+
+    async def validate_and_execute(self, code, app_type="model"):
+        self.timeline.append("execute")
+        return {"success": True, "mesh": None, "analysis": {}, "stl_path": None, "step_path": None}
+
+
+class SlowDesignExpert:
+    notes_mode = "off"
+
+    def __init__(self, timeline, delay=DESIGN_DELAY):
+        self.timeline = timeline
+        self.delay = delay
+
+    async def validate_design(self, analysis):
+        await asyncio.sleep(self.delay)
+        self.timeline.append("design")
+        return AgentResult(status=AgentStatus.SUCCESS, data={"llm_feedback": "ok"})
+
+
+class Constraints:
+    def __init__(self, timeline, ok=True):
+        self.timeline = timeline
+        self.ok = ok
+
+    async def validate_constraints(self, analysis):
+        await asyncio.sleep(CONSTRAINT_DELAY)
+        self.timeline.append("constraints")
+        if self.ok:
+            return AgentResult(status=AgentStatus.SUCCESS, data={"violations": []})
+        return AgentResult(status=AgentStatus.FAILED, errors=["Wall too thin"])
+
+
+def _orchestrator(timeline, constraints_ok=True):
+    orchestrator = OrchestratorAgent(FakeAnalyst(), FakeGenerator(timeline), FakeValidator(timeline))
+    orchestrator.design_expert = SlowDesignExpert(timeline)
+    orchestrator.constraint_validator = Constraints(timeline, ok=constraints_ok)
+    orchestrator.template_cache = TemplateCache(enabled=False)
+    orchestrator.prompt_cache = PromptCache(enabled=False)
+    return orchestrator
+
+
+def test_design_llm_off_critical_path():
+    """Génération et exécution avant la fin du design; durée ≈ max des phases, pas leur somme"""
+    print("\n" + "=" * 80)
+    print("TEST: concurrent phases")
+    print("=" * 80)
+
+    timeline = []
+    orchestrator = _orchestrator(timeline)
+
+    start = time.perf_counter()
+    result = asyncio.run(orchestrator.execute_workflow("heatsink"))
+    elapsed = time.perf_counter() - start
+
+    assert result["success"], result
+    assert timeline.index("generate") < timeline.index("constraints")
+    assert timeline.index("execute") < timeline.index("design")
+    assert result["metadata"]["design_validation"] == {"llm_feedback": "ok"}
+    assert elapsed < DESIGN_DELAY + CONSTRAINT_DELAY - 0.1, elapsed
+    print(f"✅ Workflow in {elapsed:.2f}s (sequential phases: ≥ {DESIGN_DELAY + CONSTRAINT_DELAY:.2f}s)")
+    print(f"   Order: {' → '.join(timeline)}")
+
+
+def test_constraint_failure_discards_generation():
+    """Contraintes en échec: code spéculatif jeté, rien n'est exécuté, design annulé"""
+    print("\n" + "=" * 80)
+    print("TEST: constraint failure")
+    print("=" * 80)
+
+    timeline = []
+    orchestrator = _orchestrator(timeline, constraints_ok=False)
+    orchestrator.design_expert = SlowDesignExpert(timeline, delay=30.0)
+    start = time.perf_counter()
+    result = asyncio.run(orchestrator.execute_workflow("heatsink"))
+    elapsed = time.perf_counter() - start
+
+    assert not result["success"]
+    assert "Constraint validation failed" in result["errors"][0]
+    assert "execute" not in timeline
+    assert "design" not in timeline and elapsed < 30.0
+    print("✅ Speculative code discarded, pending design validation cancelled")
+
+
+if __name__ == "__main__":
+    test_design_llm_off_critical_path()
+    test_constraint_failure_discards_generation()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Test du cache paramétrique des programmes CoT: même design, autres cotes, sans appel LLM
+"""
+import sys
+import asyncio
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from plan_cache import PlanCache, prompt_signature, parametrize_code, render_skeleton
+from cot_agents import GeneratedCode, DesignAnalysis, ConstructionPlan
+from multi_agent_system import OrchestratorAgent, AgentResult, AgentStatus
+from prompt_cache import PromptCache
+from template_cache import TemplateCache
+from few_shot_index import FewShotIndex
+
+PIPE = "Make a tube: inner radius {ri} mm, outer radius {ro} mm, length {l} mm, both ends cut square"
+PIPE_CODE = """import cadquery as cq
+
+outer = cq.Workplane("XY").circle({ro}).extrude({l})
+inner = cq.Workplane("XY").circle({ri}).extrude({l})
+result = outer.cut(inner).translate((0, 0, -{half}))
+result = result.rotate((0, 0, 0), (0, 0, 1), 90)
+"""
+
+
+def test_skeleton_roundtrip_and_rebinding():
+    """Littéraux reliés aux cotes (directement ou dérivés), reconstruits avec d'autres cotes"""
+    print("\n" + "=" * 80)
+    print("TEST: prompt_signature / parametrize_code")
+    print("=" * 80)
+
+    prompt = PIPE.format(ri=15, ro=20, l=150)
+    signature, numbers, classes = prompt_signature(prompt)
+    assert signature == prompt_signature(PIPE.format(ri=18, ro=25, l=200))[0]
+    assert numbers == [15, 20, 150] and classes == [0, 1, 2]
+
+    code = PIPE_CODE.format(ri=15, ro=20, l=150, half=75)
+    skeleton = parametrize_code(code, numbers, classes)
+    assert skeleton is not None and skeleton["used"] == [0, 1, 2]
+    assert render_skeleton(skeleton["parts"], numbers) == code
+    rebound = render_skeleton(skeleton["parts"], [18, 25, 200])
+    assert rebound == PIPE_CODE.format(ri=18, ro=25, l=200, half=100)  # 75 = 150/2 → 100
+    print("✅ Derived literal 75 rebound as length/2, axes and angles untouched")
+
+    # polygon(6, ...) reste un hexagone même si le prompt contient "6 mm"
+    hexagon = "head = cq.Workplane('XY').polygon(6, 12).extrude(5)\n"
+    skeleton = parametrize_code(hexagon, [6.0, 5.0], [0, 1])
+    assert render_skeleton(skeleton["parts"], [7.0, 4.0]) == "head = cq.Workplane('XY').polygon(6, 14).extrude(4)\n"
+
+    # 85 = 200/2 - 15 ou 100 - 15: ambigu → pas de squelette
+    assert parametrize_code("leg = leg.translate((85, 35, 0))\n", [200.0, 100.0, 15.0], [0, 1, 2]) is None
+    # 37 n'est relié à aucune cote
+    assert parametrize_code("result = cq.Workplane('XY').box(10, 37, 5)\n", [10.0, 5.0], [0, 1]) is None
+    print("✅ Structural literals kept, ambiguous or unexplained literals rejected")
+
+
+def test_divisors_stay_structural():
+    """H / 2 et 2 * W restent des facteurs même si le prompt cite "2 mm" (pas H / 5)"""
+    print("\n" + "=" * 80)
+    print("TEST: diviseurs et multiplicateurs structurels")
+    print("=" * 80)
+
+    code = ("L = 40\nW = 30\nH = 2\n"
+            "result = cq.Workplane('XY').box(L, 2 * W, H).translate((L / 2, 0, H / 2))\n"
+            "for i in range(2):\n    result = result.translate((0, 0, H))\n")
+    _, numbers, classes = prompt_signature("box length 40 mm width 30 mm height 2 mm")
+    skeleton = parametrize_code(code, numbers, classes)
+    assert skeleton is not None and skeleton["used"] == [0, 1, 2]
+    rebound = render_skeleton(skeleton["parts"], [60.0, 35.0, 5.0])
+    assert "H = 5\n" in rebound and "L = 60\n" in rebound
+    assert "(L / 2, 0, H / 2)" in rebound and "2 * W" in rebound and "range(2)" in rebound
+    print("✅ Divisors, multipliers and range bounds untouched by the 2 mm dimension")
+
+
+def test_cache_matching_rules():
+    """Motif d'égalité et nombres non utilisés par le programme doivent correspondre"""
+    print("\n" + "=" * 80)
+    print("TEST: PlanCache lookup")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PlanCache(Path(tmp), enabled=True)
+        key = cache.put(PIPE.format(ri=15, ro=20, l=150), PIPE_CODE.format(ri=15, ro=20, l=150, half=75))
+        assert key
+
+        hit = cache.lookup(PIPE.format(ri=18, ro=25, l=200))
+        assert hit["key"] == key and "circle(25)" in hit["code"] and "extrude(200)" in hit["code"]
+        assert cache.lookup(PIPE.format(ri=18, ro=18, l=200)) is None  # 18 = 18: autre motif
+        assert cache.lookup("Make a tube: inner radius 15 mm, outer radius 20 mm") is None
+
+        legs = "table top {l} x {w} x 10 mm on 4 legs"
+        assert cache.put(legs.format(l=200, w=100), "result = cq.Workplane('XY').box(200, 100, 10)\n")
+        assert cache.lookup(legs.format(l=300, w=120)) is not None
+        assert cache.lookup("table top 300 x 120 x 10 mm on 6 legs") is None  # 4 fixe: absent du code
+
+        cache.invalidate(key)
+        assert cache.lookup(PIPE.format(ri=18, ro=25, l=200)) is None
+        stats = cache.stats()
+        assert stats["hits"] == 2 and stats["invalidated"] == 1 and stats["entries"] == 1
+    print("✅ Equality pattern and unused numbers part of the match, invalidation works")
+
+
+class FakeAnalyst:
+    async def analyze(self, prompt):
+        return {"type": "tube", "parameters": {}}
+
+
+class FakeValidator:
+    """Exécution factice: échoue pour le code qui contient `poison`"""
+
+    def __init__(self, poison=None):
+        self.poison = poison
+        self.codes = []
+
+    async def validate_and_execute(self, code, app_type="model"):
+        self.codes.append(code)
+        if self.poison and self.poison in code:
+            raise RuntimeError("BRep_API: command not done")
+        return {"success": True, "mesh": None, "analysis": {}, "stl_path": None, "step_path": None}
+
+
+class Design:
+    notes_mode = "off"
+
+    async def validate_design(self, analysis):
+        return AgentResult(status=AgentStatus.SUCCESS, data={})
+
+
+class Constraints:
+    async def validate_constraints(self, analysis):
+        return AgentResult(status=AgentStatus.SUCCESS, data={"violations": []})
+
+
+class CountingLLMAgents:
+    """Architect, Planner et Synthesizer factices: le Synthesizer écrit le tuyau du prompt"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def analyze_design(self, prompt):
+        self.calls += 1
+        return DesignAnalysis("tube", ["cylinder"], ["cut"], {}, "simple", "")
+
+    async def create_plan(self, analysis, prompt):
+        self.calls += 1
+        return ConstructionPlan([{"operation": "cut"}], {}, [], 1)
+
+    def fast_path(self, prompt):
+        return None
+
+    async def generate_code(self, plan, analysis, on_token=None):
+        self.calls += 1
+        ri, ro, l = self.dims
+        return GeneratedCode(PIPE_CODE.format(ri=ri, ro=ro, l=l, half=l / 2), "python", ["cylinder"], 0.8)
+
+
+def _orchestrator(tmp, validator):
+    agents = CountingLLMAgents()
+    orchestrator = OrchestratorAgent(FakeAnalyst(), None, validator)
+    orchestrator.design_expert = Design()
+    orchestrator.constraint_validator = Constraints()
+    orchestrator.architect = orchestrator.planner = orchestrator.code_synthesizer = agents
+    orchestrator.template_cache = TemplateCache(enabled=False)
+    orchestrator.prompt_cache = PromptCache(enabled=False)
+    orchestrator.plan_cache = PlanCache(Path(tmp), enabled=True)
+    orchestrator.few_shot_index = FewShotIndex(Path(tmp) / "history.jsonl")
+    return orchestrator, agents
+
+
+def test_workflow_reuses_and_falls_back():
+    """2e prompt servi sans LLM; programme reconstruit qui échoue → chaîne complète, entrée supprimée"""
+    print("\n" + "=" * 80)
+    print("TEST: plan cache dans le workflow")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        validator = FakeValidator(poison="-45)")  # 90/2 reconstruit; le Synthesizer écrit -45.0
+        orchestrator, agents = _orchestrator(tmp, validator)
+
+        agents.dims = (15, 20, 150)
+        first = asyncio.run(orchestrator.execute_workflow(PIPE.format(ri=15, ro=20, l=150)))
+        assert first["success"] and agents.calls == 3
+        assert first["metadata"]["code_source"] == "llm"
+
+        second = asyncio.run(orchestrator.execute_workflow(PIPE.format(ri=18, ro=25, l=200)))
+        assert second["success"] and agents.calls == 3  # aucun appel LLM
+        assert second["metadata"]["code_source"] == "plan_cache"
+        assert "circle(25)" in validator.codes[-1] and "translate((0, 0, -100))" in validator.codes[-1]
+        print("✅ Same design with new numbers served from the plan cache")
+
+        agents.dims = (22, 30, 90)
+        third = asyncio.run(orchestrator.execute_workflow(PIPE.format(ri=22, ro=30, l=90)))
+        assert third["success"] and agents.calls == 6
+        assert third["metadata"]["code_source"] == "llm"
+        assert orchestrator.plan_cache.stats()["invalidated"] == 1
+        print("✅ Rebuilt program failing execution falls back to the full CoT chain")
+
+
+if __name__ == "__main__":
+    test_skeleton_roundtrip_and_rebinding()
+    test_divisors_stay_structural()
+    test_cache_matching_rules()
+    test_workflow_reuses_and_falls_back()
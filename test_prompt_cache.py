@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test du cache par prompt: normalisation, TTL, invalidation par version, bypass
+"""
+import sys
+import time
+import sqlite3
+import asyncio
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import prompt_cache
+from prompt_cache import PromptCache, normalize_prompt
+
+
+def _result(code="result = 1\n"):
+    mesh = {
+        "vertices": np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=np.float32),
+        "faces": np.array([[0, 1, 2]], dtype=np.uint32),
+        "normals": [],
+    }
+    return {"success": True, "mesh": mesh, "analysis": {"dimensions": {}}, "code": code,
+            "app_type": "cot_generated", "stl_path": None, "step_path": None,
+            "metadata": {"retry_count": 0, "cache": "miss"}}
+
+
+def test_normalization():
+    """Casse, espaces, orthographe des unités et écriture des nombres"""
+    print("\n" + "=" * 80)
+    print("TEST: normalize_prompt")
+    print("=" * 80)
+
+    same = [
+        "Create a pipe 100 mm long with 20 mm outer diameter",
+        "  create a PIPE 100.0 millimeters long with 20mm outer diameter. ",
+        "Create a pipe 100 Millimetres long with 20.00 mm outer  diameter!",
+    ]
+    forms = {normalize_prompt(p) for p in same}
+    assert len(forms) == 1, forms
+    assert normalize_prompt("bend 45°") == normalize_prompt("bend 45 degrees")
+    assert normalize_prompt("pipe 2 cm") != normalize_prompt("pipe 20 mm")  # pas de conversion
+    assert normalize_prompt("M3 screw v2.4.0") == "m3 screw v2.4.0"
+    print(f"✅ {len(same)} variants → {forms.pop()!r}")
+
+
+def test_roundtrip_ttl_and_version():
+    """Hit après put, expiration TTL, invalidation quand un modèle change"""
+    print("\n" + "=" * 80)
+    print("TEST: PromptCache")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        cache = PromptCache(root, enabled=True)
+        assert cache.get("Create a cube 10 mm") is None
+        entry = cache.put("Create a cube 10 mm", _result())
+        assert entry["mesh_bin"] is not None
+
+        cached = cache.get("create a CUBE 10 millimeters")
+        assert cached["code"] == "result = 1\n"
+        assert cached["metadata"]["workflow"] == {"retry_count": 0}
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+        print("✅ Variant prompt served from cache")
+
+        # TTL: entrée vieillie artificiellement
+        with sqlite3.connect(root / "prompt_cache.sqlite3") as db:
+            db.execute("UPDATE prompt_cache SET created_at = ?", (time.time() - 3 * 3600,))
+        assert PromptCache(root, ttl_hours=1, enabled=True).get("Create a cube 10 mm") is None
+        print("✅ Expired entry ignored")
+
+        # Version: autre modèle de synthèse → anciennes entrées purgées
+        cache.put("Create a cube 10 mm", _result())
+        original = prompt_cache.os.environ.get("COT_SYNTHESIZER_MODEL")
+        prompt_cache.os.environ["COT_SYNTHESIZER_MODEL"] = "another-model:1b"
+        try:
+            assert PromptCache(root, enabled=True).get("Create a cube 10 mm") is None
+        finally:
+            if original is None:
+                del prompt_cache.os.environ["COT_SYNTHESIZER_MODEL"]
+            else:
+                prompt_cache.os.environ["COT_SYNTHESIZER_MODEL"] = original
+        assert PromptCache(root, enabled=True).stats()["entries"] == 0
+        print("✅ Model change invalidates the cache")
+
+
+def test_orchestrator_bypass():
+    """Second appel servi par le cache; cache='bypass' relance le workflow"""
+    print("\n" + "=" * 80)
+    print("TEST: execute_workflow cache / bypass")
+    print("=" * 80)
+
+    from multi_agent_system import OrchestratorAgent
+    from template_cache import TemplateCache
+
+    async def scenario(root):
+        orchestrator = OrchestratorAgent(None, None, None)
+        orchestrator.prompt_cache = PromptCache(root, enabled=True)
+        orchestrator.template_cache = TemplateCache(root / "templates", enabled=False)
+        runs = []
+
+        async def fake_run(prompt, progress_callback=None, use_template_cache=True, use_plan_cache=True,
+                           on_design_notes=None):
+            runs.append(use_template_cache)
+            return _result(code=f"run = {len(runs)}\n")
+
+        orchestrator._run_workflow = fake_run
+        first = await orchestrator.execute_workflow("Create a vase 80mm tall")
+        second = await orchestrator.execute_workflow("create a vase 80 mm tall.")
+        third = await orchestrator.execute_workflow("Create a vase 80mm tall", cache="bypass")
+        fourth = await orchestrator.execute_workflow("Create a vase 80mm tall")
+        return runs, first, second, third, fourth
+
+    with tempfile.TemporaryDirectory() as tmp:
+        runs, first, second, third, fourth = asyncio.run(scenario(Path(tmp)))
+
+    assert runs == [True, False]
+    assert first["metadata"]["cache"] == "miss"
+    assert second["metadata"]["cache"] == "hit" and second["code"] == "run = 1\n"
+    assert third["metadata"]["cache"] == "bypass" and third["code"] == "run = 2\n"
+    assert fourth["code"] == "run = 2\n"  # le bypass a rafraîchi l'entrée
+    print("✅ One workflow run per distinct prompt, bypass refreshes the entry")
+
+
+if __name__ == "__main__":
+    test_normalization()
+    test_roundtrip_ttl_and_version()
+    test_orchestrator_bypass()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Test du streaming SSE de /api/generate: les événements doivent arriver
+pendant que le workflow tourne, pas seulement à la fin.
+"""
+import sys
+import json
+import asyncio
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import main
+from main import GenerateRequest, generate_endpoint
+from job_store import JobStore
+from mesh_ops import decode_mesh
+
+
+class FakeRequest:
+    """Remplace la requête Starlette (client toujours connecté)"""
+
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+class SlowOrchestrator:
+    """Orchestrateur factice qui attend un signal avant de terminer"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.cancelled = False
+
+    async def execute_workflow(self, prompt, progress_callback=None, cache="use", on_design_notes=None):
+        await progress_callback("status", {"message": "📊 Analyzing prompt...", "progress": 10})
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        await progress_callback("code", {"code": "print('hi')\n", "app_type": "model", "progress": 70})
+        return {"success": True, "mesh": None, "analysis": {}, "code": "print('hi')\n", "app_type": "model"}
+
+
+def _parse(event: str) -> dict:
+    assert event.startswith("data: ")
+    return json.loads(event[6:])
+
+
+def test_events_are_streamed_live():
+    """Le premier événement arrive avant la fin du workflow"""
+    print("\n" + "=" * 80)
+    print("TEST: SSE events streamed live")
+    print("=" * 80)
+
+    async def run():
+        fake = SlowOrchestrator()
+        main.orchestrator = fake
+        response = await generate_endpoint(GenerateRequest(prompt="a cube"), FakeRequest())
+        stream = response.body_iterator
+
+        job = _parse(await asyncio.wait_for(stream.__anext__(), timeout=2))
+        assert job["type"] == "job" and job["job_id"]
+        first = await asyncio.wait_for(stream.__anext__(), timeout=2)
+        assert _parse(first)["type"] == "status"
+        print("✅ Status event received while workflow still running")
+
+        fake.release.set()
+        rest = [_parse(e) async for e in stream]
+        types = [e["type"] for e in rest]
+        assert types == ["code", "complete"], types
+        assert rest[-1]["job_id"] == job["job_id"]
+        assert rest[-1]["code_url"] == f"/api/jobs/{job['job_id']}/code"
+        print(f"✅ Remaining events: {types}")
+
+    original = main.orchestrator, main.job_store
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            main.job_store = JobStore(Path(tmp))
+            asyncio.run(run())
+    finally:
+        main.orchestrator, main.job_store = original
+
+
+def test_heartbeat_and_cancellation():
+    """Heartbeat pendant l'attente, puis annulation du workflow si le client part"""
+    print("\n" + "=" * 80)
+    print("TEST: SSE heartbeat + cancellation on disconnect")
+    print("=" * 80)
+
+    async def run():
+        fake = SlowOrchestrator()
+        main.orchestrator = fake
+        main.SSE_HEARTBEAT_INTERVAL = 0.05
+        request = FakeRequest()
+        response = await generate_endpoint(GenerateRequest(prompt="a cube"), request)
+        stream = response.body_iterator
+
+        await stream.__anext__()  # job
+        await stream.__anext__()  # status
+        heartbeat = await asyncio.wait_for(stream.__anext__(), timeout=2)
+        assert heartbeat.startswith(":")
+        print("✅ Heartbeat comment received")
+
+        request.disconnected = True
+        remaining = [e async for e in stream if not e.startswith(":")]
+        assert remaining == []
+        await asyncio.sleep(0)
+        assert fake.cancelled
+        print("✅ Workflow cancelled after client disconnect")
+
+    original = main.orchestrator
+    try:
+        asyncio.run(run())
+    finally:
+        main.orchestrator = original
+        main.SSE_HEARTBEAT_INTERVAL = 15.0
+
+
+class MeshOrchestrator:
+    """Orchestrateur factice qui renvoie un mesh d'aperçu"""
+
+    mesh = {
+        "vertices": np.array([[0, 0, 0], [1, 0, 0], [0, 2, 0], [0, 0, 3]], dtype=np.float32),
+        "faces": np.array([[0, 1, 2], [0, 1, 3]], dtype=np.uint32),
+        "normals": [],
+    }
+
+    async def execute_workflow(self, prompt, progress_callback=None, cache="use", on_design_notes=None):
+        return {"success": True, "mesh": self.mesh, "analysis": {}, "code": "x = 1\n", "app_type": "model"}
+
+
+def test_complete_event_links_binary_mesh():
+    """Le complete ne contient plus les floats: URL mesh.bin + bounds, mesh servi en gzip"""
+    print("\n" + "=" * 80)
+    print("TEST: binary mesh transport")
+    print("=" * 80)
+
+    async def run():
+        main.orchestrator = MeshOrchestrator()
+        response = await generate_endpoint(GenerateRequest(prompt="a cube"), FakeRequest())
+        return [_parse(e) async for e in response.body_iterator]
+
+    original = main.orchestrator, main.job_store
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            main.job_store = JobStore(Path(tmp))
+            events = asyncio.run(run())
+            complete = events[-1]
+            assert complete["type"] == "complete"
+            assert "mesh" not in complete
+            assert complete["mesh_url"] == f"/api/jobs/{complete['job_id']}/mesh.bin"
+            assert complete["mesh_bounds"] == {"min": [0, 0, 0], "max": [1, 2, 3]}
+            print(f"✅ complete event: {complete['mesh_url']} bounds={complete['mesh_bounds']}")
+
+            client = TestClient(main.app)
+            r = client.get(complete["mesh_url"])
+            assert r.status_code == 200
+            assert r.headers["content-encoding"] == "gzip"
+            vertices, faces = decode_mesh(r.content)  # httpx a déjà décompressé
+            assert np.array_equal(vertices, MeshOrchestrator.mesh["vertices"])
+            assert np.array_equal(faces, MeshOrchestrator.mesh["faces"])
+            print("✅ mesh.bin served and decoded")
+
+            assert client.get("/api/jobs/unknown/mesh.bin").status_code == 404
+    finally:
+        main.orchestrator, main.job_store = original
+
+
+if __name__ == "__main__":
+    test_events_are_streamed_live()
+    test_heartbeat_and_cancellation()
+    test_complete_event_links_binary_mesh()
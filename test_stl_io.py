@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test de la lecture / écriture STL vectorisées (binaire mappé en mémoire + ASCII)
+"""
+import sys
+import time
+import struct
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from stl_io import read_stl, is_ascii_stl, write_stl
+from agents import ValidatorAgent
+from templates import CodeTemplates
+from exec_worker import run_job
+from mesh_ops import MESH_PREVIEW_MAX_TRIANGLES
+
+
+def _write_binary_reference(path, tris, header=b"solid binary header"):
+    """Écriture triangle par triangle (format de référence)"""
+    with open(path, "wb") as f:
+        f.write(header.ljust(80, b"\0"))
+        f.write(struct.pack("<I", len(tris)))
+        for i, t in enumerate(tris):
+            f.write(struct.pack("<3f", 0.0, 0.0, float(i)))
+            for v in t:
+                f.write(struct.pack("<3f", *v))
+            f.write(struct.pack("<H", 0))
+
+
+def _write_ascii_reference(path, tris):
+    lines = ["solid test"]
+    for t in tris:
+        lines.append("  facet normal 0 0 1")
+        lines.append("    outer loop")
+        for v in t:
+            lines.append(f"      vertex {v[0]:.6e} {v[1]:.6e} {v[2]:.6e}")
+        lines.append("    endloop")
+        lines.append("  endfacet")
+    lines.append("endsolid test")
+    Path(path).write_text("\n".join(lines))
+
+
+def test_binary_and_ascii_match():
+    """Binaire (même avec 'solid' dans l'en-tête) et ASCII donnent les mêmes float32"""
+    print("\n" + "=" * 80)
+    print("TEST: read_stl binary / ASCII")
+    print("=" * 80)
+
+    rng = np.random.default_rng(0)
+    tris = rng.uniform(-50, 50, size=(200, 3, 3)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        binary = Path(tmp) / "b.stl"
+        ascii_ = Path(tmp) / "a.stl"
+        _write_binary_reference(binary, tris)
+        _write_ascii_reference(ascii_, tris)
+
+        assert not is_ascii_stl(binary)
+        assert is_ascii_stl(ascii_)
+        print("✅ Format detection ('solid' binary header handled)")
+
+        got, normals = read_stl(binary)
+        assert got.dtype == np.float32 and got.shape == (200, 3, 3)
+        assert np.array_equal(got, tris)
+        assert np.array_equal(normals[:, 2], np.arange(200, dtype=np.float32))
+        print("✅ Binary STL read exactly")
+
+        got, normals = read_stl(ascii_)
+        assert got.shape == (200, 3, 3)
+        assert np.allclose(got, tris, rtol=1e-5)
+        assert np.array_equal(normals, np.tile([0, 0, 1], (200, 1)).astype(np.float32))
+        print("✅ ASCII STL read")
+
+
+def test_validator_mesh_from_large_stl():
+    """Le mesh d'aperçu garde le format {vertices, faces} et respecte le budget"""
+    print("\n" + "=" * 80)
+    print("TEST: ValidatorAgent._create_mesh_from_stl on 200k triangles")
+    print("=" * 80)
+
+    n = 200_000
+    tris = np.random.default_rng(1).uniform(-1, 1, size=(n, 3, 3)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "big.stl"
+        records = np.zeros(n, dtype=[("n", "<f4", 3), ("v", "<f4", (3, 3)), ("a", "<u2")])
+        records["v"] = tris
+        with open(path, "wb") as f:
+            f.write(b"\0" * 80 + struct.pack("<I", n))
+            records.tofile(f)
+
+        validator = ValidatorAgent.__new__(ValidatorAgent)
+        start = time.perf_counter()
+        mesh = validator._create_mesh_from_stl(str(path))
+        elapsed = time.perf_counter() - start
+
+        assert mesh["vertices"].dtype == np.float32 and mesh["faces"].dtype == np.uint32
+        assert 0 < len(mesh["faces"]) <= MESH_PREVIEW_MAX_TRIANGLES
+        assert mesh["faces"].max() < len(mesh["vertices"])
+        print(f"✅ {n:,} triangles → {len(mesh['faces']):,} preview triangles in {elapsed * 1000:.1f} ms")
+
+
+def test_write_stl_roundtrip():
+    """write_stl binaire (un seul tofile) et ASCII relus à l'identique"""
+    print("\n" + "=" * 80)
+    print("TEST: write_stl")
+    print("=" * 80)
+
+    tris = np.random.default_rng(2).uniform(-5, 5, size=(1000, 3, 3)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        binary = Path(tmp) / "w.stl"
+        assert write_stl(binary, tris, header="solid-looking header") == 1000
+        assert binary.stat().st_size == 84 + 50 * 1000
+        assert not binary.read_bytes().startswith(b"solid")
+        got, normals = read_stl(binary)
+        assert np.array_equal(got, tris)
+        assert np.allclose(np.linalg.norm(normals, axis=1), 1.0, atol=1e-5)
+        print("✅ Binary write/read roundtrip")
+
+        ascii_ = Path(tmp) / "w_ascii.stl"
+        write_stl(ascii_, tris, header="part", ascii=True)
+        assert is_ascii_stl(ascii_)
+        got, _ = read_stl(ascii_)
+        assert np.allclose(got, tris, rtol=1e-5)
+        print("✅ ASCII write/read roundtrip")
+
+
+def test_numpy_template_uses_shared_writer():
+    """Les templates NumPy importent write_stl; le fichier est remonté par le worker"""
+    code = CodeTemplates.generate_gripper({"parameters": {}})
+    assert "def write_stl" not in code and "from stl_io import write_stl" in code
+
+    with tempfile.TemporaryDirectory() as tmp:
+        res = run_job({"code": code, "file": str(Path(tmp) / "temp_exec.py")})
+        assert res["success"], res
+        assert res["stl_path"] == str(Path(tmp) / "output" / "generated_gripper.stl")
+        tris, _ = read_stl(res["stl_path"])
+        assert len(tris) > 0
+        print(f"✅ Gripper template: {len(tris)} triangles via stl_io.write_stl")
+
+
+if __name__ == "__main__":
+    test_binary_and_ascii_match()
+    test_validator_mesh_from_large_stl()
+    test_write_stl_roundtrip()
+    test_numpy_template_uses_shared_writer()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Test du cache des templates: clé canonique, LRU, limites de taille, court-circuit du workflow
+"""
+import sys
+import asyncio
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from template_cache import TemplateCache, cache_key
+from mesh_ops import decode_mesh
+
+
+def _mesh():
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float32)
+    faces = np.array([[0, 2, 1], [0, 1, 3], [0, 3, 2], [1, 2, 3]], dtype=np.uint32)
+    return {"vertices": vertices, "faces": faces, "normals": []}
+
+
+def test_key_is_canonical():
+    """Ordre des clés, 3 vs 3.0 et prompt d'origine n'influencent pas la clé"""
+    print("\n" + "=" * 80)
+    print("TEST: cache_key")
+    print("=" * 80)
+
+    a = {"type": "heatsink", "parameters": {"plate_w": 40, "plate_h": 40.0}, "raw_prompt": "heatsink"}
+    b = {"raw_prompt": "Create a heatsink please", "parameters": {"plate_h": 40, "plate_w": 40.0}, "type": "heatsink"}
+    c = {"type": "heatsink", "parameters": {"plate_w": 41.0, "plate_h": 40.0}}
+    assert cache_key(a) == cache_key(b)
+    assert cache_key(a) != cache_key(c)
+    assert cache_key(a, version="v1") != cache_key(a, version="v2")
+    print("✅ Same parameters → same key, template version changes the key")
+
+
+def test_put_get_and_counters():
+    """Aller-retour des artefacts + compteurs hit/miss"""
+    print("\n" + "=" * 80)
+    print("TEST: TemplateCache put/get")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        stl = root / "out.stl"
+        stl.write_bytes(b"\0" * 84)
+        cache = TemplateCache(root / "cache", enabled=True)
+
+        key = cache_key({"type": "splint", "parameters": {}})
+        assert cache.get(key) is None
+        cache.put(key, "print('hi')", "splint", stl_path=str(stl), mesh=_mesh(), metadata={"analysis": {"ok": 1}})
+        stl.unlink()  # le fichier de sortie du worker peut être écrasé ensuite
+
+        entry = cache.get(key)
+        assert entry["code"] == "print('hi')"
+        assert Path(entry["stl_path"]).read_bytes() == b"\0" * 84
+        assert entry["step_path"] is None
+        vertices, faces = decode_mesh(entry["mesh_bin"])
+        assert len(vertices) == 4 and len(faces) == 4
+        assert entry["mesh_bounds"]["max"] == [1.0, 1.0, 1.0]
+        assert entry["metadata"]["analysis"] == {"ok": 1}
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+        # Index reconstruit depuis le disque au redémarrage
+        assert TemplateCache(root / "cache", enabled=True).get(key) is not None
+        print("✅ Artifacts round-trip, hits/misses counted")
+
+
+def test_lru_eviction():
+    """Limite en nombre d'entrées puis en taille: la moins récemment utilisée part"""
+    print("\n" + "=" * 80)
+    print("TEST: TemplateCache eviction")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TemplateCache(Path(tmp), max_entries=2, enabled=True)
+        cache.put("a", "a", "splint")
+        cache.put("b", "b", "splint")
+        assert cache.get("a") is not None      # a devient la plus récente
+        cache.put("c", "c", "splint")
+        assert cache.get("b") is None
+        assert cache.get("a") is not None and cache.get("c") is not None
+        assert cache.stats()["evictions"] == 1
+
+        big = Path(tmp) / "big.stl"
+        big.write_bytes(b"\0" * 700_000)
+        sized = TemplateCache(Path(tmp) / "sized", max_mb=1.0, enabled=True)
+        sized.put("x", "x", "lattice", stl_path=str(big))
+        sized.put("y", "y", "lattice", stl_path=str(big))
+        assert sized.get("x") is None and sized.get("y") is not None
+        print("✅ LRU eviction by count and by size")
+
+
+def test_workflow_served_from_cache():
+    """Un prompt de template déjà exécuté ne repasse ni par la génération ni par CadQuery"""
+    print("\n" + "=" * 80)
+    print("TEST: OrchestratorAgent cache hit")
+    print("=" * 80)
+
+    from agents import AnalystAgent
+    from multi_agent_system import OrchestratorAgent
+    from prompt_cache import PromptCache
+
+    class _Unused:
+        async def generate(self, *args):
+            raise AssertionError("generator called on a cache hit")
+
+        async def validate_and_execute(self, *args):
+            raise AssertionError("validator called on a cache hit")
+
+    async def scenario(root):
+        analyst = AnalystAgent()
+        orchestrator = OrchestratorAgent(analyst, _Unused(), _Unused())
+        orchestrator.template_cache = TemplateCache(root, enabled=True)
+        orchestrator.prompt_cache = PromptCache(enabled=False)
+
+        prompt = "Create a heatsink with plate width 40 mm"
+        analysis = await analyst.analyze(prompt)
+        key = orchestrator.template_cache.key(analysis)
+        orchestrator.template_cache.put(key, "# heatsink", analysis["type"], mesh=_mesh(),
+                                        metadata={"workflow": {"retry_count": 0}})
+
+        events = []
+
+        async def progress(event_type, data):
+            events.append(event_type)
+
+        return await orchestrator.execute_workflow(prompt, progress_callback=progress), events
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result, events = asyncio.run(scenario(Path(tmp)))
+
+    assert result["success"] and result["code"] == "# heatsink"
+    assert result["metadata"]["cache"] == "hit"
+    assert result["mesh_bin"] is not None
+    assert "code" in events
+    print("✅ Cached template result returned without generation or execution")
+
+
+def test_bypass_refreshes_entry():
+    """cache="bypass" recalcule et remplace l'entrée: le hit suivant sert le nouveau résultat"""
+    print("\n" + "=" * 80)
+    print("TEST: bypass then hit")
+    print("=" * 80)
+
+    from agents import AnalystAgent
+    from multi_agent_system import OrchestratorAgent, AgentResult, AgentStatus
+    from prompt_cache import PromptCache
+
+    class Generator:
+        def __init__(self):
+            self.calls = 0
+
+        async def generate(self, analysis):
+            self.calls += 1
+            return f"# heatsink v{self.calls + 1}\n", "heatsink"
+
+    class Validator:
+        async def validate_and_execute(self, code, app_type="model"):
+            return {"success": True, "mesh": _mesh(), "analysis": {}, "stl_path": None, "step_path": None}
+
+    class Approve:
+        notes_mode = "off"
+
+        async def critique_code(self, code, prompt):
+            return AgentResult(status=AgentStatus.SUCCESS, data={})
+
+        async def validate_design(self, analysis):
+            return AgentResult(status=AgentStatus.SUCCESS, data={})
+
+        async def validate_constraints(self, analysis):
+            return AgentResult(status=AgentStatus.SUCCESS, data={"violations": []})
+
+    async def scenario(root):
+        analyst, generator = AnalystAgent(), Generator()
+        orchestrator = OrchestratorAgent(analyst, generator, Validator())
+        orchestrator.critic = orchestrator.design_expert = orchestrator.constraint_validator = Approve()
+        orchestrator.template_cache = TemplateCache(root, enabled=True)
+        orchestrator.prompt_cache = PromptCache(enabled=False)
+
+        prompt = "Create a heatsink with plate width 40 mm"
+        key = orchestrator.template_cache.key(await analyst.analyze(prompt))
+        orchestrator.template_cache.put(key, "# heatsink v1\n", "heatsink", mesh=_mesh())
+
+        bypassed = await orchestrator.execute_workflow(prompt, cache="bypass")
+        hit = await orchestrator.execute_workflow(prompt)
+        return bypassed, hit, generator.calls
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bypassed, hit, calls = asyncio.run(scenario(Path(tmp)))
+        assert not [p for p in Path(tmp).iterdir() if p.name.startswith(".")]
+
+    assert bypassed["success"] and bypassed["code"] == "# heatsink v2\n" and calls == 1
+    assert hit["metadata"]["cache"] == "hit" and hit["code"] == "# heatsink v2\n", hit["code"]
+    print("✅ Bypass refreshed the stale entry, next request served the new result")
+
+
+if __name__ == "__main__":
+    test_key_is_canonical()
+    test_put_get_and_counters()
+    test_lru_eviction()
+    test_workflow_served_from_cache()
+    test_bypass_refreshes_entry()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test du streaming des tokens Ollama jusqu'aux events SSE code_delta (chemin CoT)
+"""
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from cot_agents import OllamaCoTClient, DesignAnalysis, ConstructionPlan
+from multi_agent_system import OrchestratorAgent, WorkflowContext
+
+PIECES = ["```python\n", "import cadquery as cq\n", "result = cq.Workplane('XY')", ".box(10, 10, 10)\n", "```"]
+
+
+class FakePool:
+    """Pool Ollama factice: renvoie la réponse en fragments"""
+
+    def __init__(self, pieces=PIECES):
+        self.pieces = pieces
+
+    async def cached(self, model, request, options, compute, on_token=None, cache=None):
+        return await compute()
+
+    async def stream_chat(self, model, messages, options, **kwargs):
+        for piece in self.pieces:
+            await asyncio.sleep(0)
+            yield {"message": {"role": "assistant", "content": piece}}
+
+
+def test_client_streams_tokens():
+    """on_token reçoit chaque fragment, la réponse complète est renvoyée"""
+    print("\n" + "=" * 80)
+    print("TEST: OllamaCoTClient streaming")
+    print("=" * 80)
+
+    client = OllamaCoTClient(model="fake:7b")
+    client.use_fallback = False
+    client.pool = FakePool()
+    received = []
+
+    async def on_token(piece):
+        received.append(piece)
+
+    response = asyncio.run(client.generate([{"role": "user", "content": "cube"}], on_token=on_token))
+    assert received == PIECES
+    assert response == "".join(PIECES).strip()
+    print(f"✅ {len(received)} fragments forwarded")
+
+
+def test_orchestrator_forwards_code_delta():
+    """Le synthétiseur CoT relaie ses fragments en events code_delta avant l'event code"""
+    print("\n" + "=" * 80)
+    print("TEST: code_delta events")
+    print("=" * 80)
+
+    class FakeArchitect:
+        async def analyze_design(self, prompt):
+            return DesignAnalysis("Simple box", ["box"], ["create_box"], {"width": 10}, "simple", "")
+
+    class FakePlanner:
+        async def create_plan(self, analysis, prompt):
+            return ConstructionPlan([{"operation": "box"}], {}, [], 1)
+
+    orchestrator = OrchestratorAgent(None, None, None)
+    orchestrator.architect = FakeArchitect()
+    orchestrator.planner = FakePlanner()
+    orchestrator.code_synthesizer.client.use_fallback = False
+    orchestrator.code_synthesizer.client.pool = FakePool()
+
+    events = []
+
+    async def progress(event_type, data):
+        events.append((event_type, data))
+
+    context = WorkflowContext(prompt="a box")
+    code, app_type, error = asyncio.run(orchestrator._generate_code(context, "a box", True, progress))
+
+    assert error is None and app_type == "cot_generated"
+    deltas = [data["delta"] for kind, data in events if kind == "code_delta"]
+    assert deltas == PIECES
+    assert "result = cq.Workplane('XY').box(10, 10, 10)" in code
+    print(f"✅ {len(deltas)} code_delta events, final code {len(code)} chars")
+
+
+if __name__ == "__main__":
+    test_client_streams_tokens()
+    test_orchestrator_forwards_code_delta()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test du pré-chargement des modèles Ollama au démarrage et de la readiness sur /
+"""
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from fastapi import Response
+
+import main
+from llm_pool import parse_keep_alive
+from multi_agent_system import OrchestratorAgent
+
+
+class FakeOllamaClient:
+    """Client Ollama factice: chargement lent, un modèle introuvable"""
+
+    def __init__(self, delay=0.2, missing=()):
+        self.delay = delay
+        self.missing = set(missing)
+        self.calls = []
+
+    async def generate(self, model, prompt, options, keep_alive=None, **kwargs):
+        self.calls.append((model, options["num_predict"], keep_alive))
+        await asyncio.sleep(self.delay)
+        if model in self.missing:
+            raise RuntimeError(f"model '{model}' not found")
+        return {"response": "ok"}
+
+
+def test_keep_alive_parsing():
+    """Durées Ollama: nombre de secondes, chaîne avec unité, -1 = toujours"""
+    print("\n" + "=" * 80)
+    print("TEST: parse_keep_alive")
+    print("=" * 80)
+
+    assert parse_keep_alive("-1") == -1
+    assert parse_keep_alive("600") == 600
+    assert parse_keep_alive("30m") == "30m"
+    assert parse_keep_alive("") is None
+    print("✅ keep_alive values parsed")
+
+
+def test_warmup_and_readiness():
+    """Tous les modèles chargés en parallèle; / répond 503 puis 200 avec l'état de chaque modèle"""
+    print("\n" + "=" * 80)
+    print("TEST: warm-up + readiness")
+    print("=" * 80)
+
+    original_orchestrator = main.orchestrator
+    main.orchestrator = OrchestratorAgent(None, None, None)
+    pools = list(main._llm_pools())
+    originals = [(pool, pool.client, dict(pool.warmup)) for pool in pools]
+    models = sorted({m for ms in main._llm_pools().values() for m in ms})
+    fake = FakeOllamaClient(missing=[models[0]])
+    for pool in pools:
+        pool.client = fake
+        pool.warmup.clear()
+
+    async def scenario():
+        main._warmup_task = asyncio.create_task(main._warm_up_models())
+        await asyncio.sleep(0.05)
+        during = Response()
+        body = await main.root(during)
+        assert during.status_code == 503 and body["status"] == "warming" and not body["ready"]
+
+        await main._warmup_task
+        after = Response()
+        body = await main.root(after)
+        assert after.status_code == 200 and body["ready"]
+        return body
+
+    try:
+        start = time.perf_counter()
+        body = asyncio.run(scenario())
+        elapsed = time.perf_counter() - start
+    finally:
+        main._warmup_task = None
+        main.orchestrator = original_orchestrator
+        for pool, client, warmup in originals:
+            pool.client = client
+            pool.warmup.clear()
+            pool.warmup.update(warmup)
+
+    assert sorted(m for m, _, _ in fake.calls) == models  # un appel par modèle distinct
+    assert all(n == 1 and keep_alive == pools[0].keep_alive for _, n, keep_alive in fake.calls)
+    assert elapsed < fake.delay * len(models), elapsed
+    assert body["status"] == "degraded"
+    assert body["models"][models[0]] == "failed"
+    assert all(body["models"][m] == "ready" for m in models[1:])
+    print(f"✅ {len(models)} models warmed in parallel, / reports {body['status']}: {body['models']}")
+
+
+if __name__ == "__main__":
+    test_keep_alive_parsing()
+    test_warmup_and_readiness()